@@ -1,6 +1,61 @@
 document.addEventListener("DOMContentLoaded", () => {
     const mapDropdown = document.getElementById("mapDropdown");
     const graphsContainer = document.getElementById("graphsContainer");
+    const statsContainer = document.getElementById("statsContainer");
+    const kartStatsUrl = "kart_stats.json";
+    let kartStats = null;
+
+    // Show an estimate with its confidence interval, e.g. "162.62 (162.03 - 166.72)"
+    const formatInterval = (interval, scale = 1, digits = 2) => {
+        if (!interval) return "-";
+        const [estimate, lower, upper] = interval.map(value => value === null ? null : (value * scale).toFixed(digits));
+        return lower === null ? estimate : `${estimate} (${lower} - ${upper})`;
+    };
+
+    // Render the selected map's kart stats, strongest kart first
+    const renderKartStats = (mapName) => {
+        statsContainer.innerHTML = ""; // Clear previous table
+        const mapStats = kartStats?.["Maps"]?.[mapName];
+        if (!mapStats) {
+            const noDataMessage = document.createElement("p");
+            noDataMessage.textContent = "No kart stats available for the selected map.";
+            statsContainer.appendChild(noDataMessage);
+            return;
+        }
+
+        const confidence = Math.round(kartStats["Confidence Level"] * 100);
+        const table = document.createElement("table");
+        const thead = document.createElement("thead");
+        thead.innerHTML = `
+            <tr>
+                <th>Kart</th>
+                <th>Times</th>
+                <th>Median Time (${confidence}% CI)</th>
+                <th>Games</th>
+                <th>Win Rate % (${confidence}% CI)</th>
+                <th>Strength (${confidence}% CI)</th>
+            </tr>
+        `;
+        table.appendChild(thead);
+
+        const tbody = document.createElement("tbody");
+        Object.entries(mapStats)
+            .sort(([, a], [, b]) => (b["Strength"]?.[0] ?? -1) - (a["Strength"]?.[0] ?? -1))
+            .forEach(([kart, stats]) => {
+                const row = document.createElement("tr");
+                row.innerHTML = `
+                    <td>${kart}</td>
+                    <td>${stats["Times"]}</td>
+                    <td>${formatInterval(stats["Median Time"])}</td>
+                    <td>${stats["Games"]}</td>
+                    <td>${formatInterval(stats["Win Rate"], 100, 1)}</td>
+                    <td>${formatInterval(stats["Strength"])}</td>
+                `;
+                tbody.appendChild(row);
+            });
+        table.appendChild(tbody);
+        statsContainer.appendChild(table);
+    };
 
     // Define the available maps and corresponding graph paths
     const mapGraphs = {
@@ -55,5 +110,15 @@ document.addEventListener("DOMContentLoaded", () => {
                 graphsContainer.appendChild(img);
             });
         }
+        renderKartStats(selectedMap);
     });
+
+    // Fetch the kart stats once; the table is rendered when a map is selected
+    fetch(kartStatsUrl)
+        .then(response => response.json())
+        .then(data => {
+            kartStats = data;
+            if (mapDropdown.value) renderKartStats(mapDropdown.value);
+        })
+        .catch(err => console.error("Error fetching kart stats:", err));
 });
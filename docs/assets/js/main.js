@@ -348,16 +348,16 @@ document.addEventListener("DOMContentLoaded", () => {
 });
 
 document.addEventListener("DOMContentLoaded", () => {
-    const resultsUrl = "results.json";
+    const racesTogetherUrl = "races_together.json";
 
-    // Fetch results data
-    let resultsData = [];
-    fetch(resultsUrl)
+    // Fetch the precomputed Races Together data (head-to-head pairs and totals per lineup)
+    let racesTogetherData = { "Players": [], "Races Together": [], "Wins": [], "Groups": [] };
+    fetch(racesTogetherUrl)
         .then((response) => response.json())
         .then((data) => {
-            resultsData = data;
+            racesTogetherData = data;
         })
-        .catch((err) => console.error("Error fetching results data:", err));
+        .catch((err) => console.error("Error fetching races together data:", err));
 
     // Utility function to display messages
     function displayMessage(message, isError = false) {
@@ -400,34 +400,39 @@ document.addEventListener("DOMContentLoaded", () => {
             return;
         }
 
-        // Find races where all valid players participated
-        const racesTogether = resultsData.filter((race) =>
-            validPlayers.every((player) => race[`${player} Placement`] && race[`${player} Placement`] !== "DNR")
-        );
-
-        if (racesTogether.length === 0) {
-            displayMessage(`Players (${validPlayers.join(", ")}) have not raced together.`, true);
-            return;
-        }
-
-        displayMessage(`Found ${racesTogether.length} races together for (${validPlayers.join(", ")})`, false);
-
-        // Calculate player stats
+        // Sum every lineup that included all of the selected players
+        const playerIndexes = validPlayers.map((player) => racesTogetherData["Players"].indexOf(player));
         const playerStats = validPlayers.reduce((stats, player) => {
             stats[player] = { Points: 0, Races: 0, TotalPlacement: 0 };
             return stats;
         }, {});
-
-        const pointsAllocation = [25, 18, 15, 12, 10, 8, 6, 4];
-        racesTogether.forEach((race) => {
-            validPlayers.forEach((player) => {
-                const placement = parseInt(race[`${player} Placement`], 10);
-                playerStats[player].Races += 1;
-                playerStats[player].Points += pointsAllocation[placement - 1] || 0;
-                playerStats[player].TotalPlacement += placement;
+        let racesTogetherCount = 0;
+        racesTogetherData["Groups"].forEach((group) => {
+            const positions = playerIndexes.map((index) => group["Players"].indexOf(index));
+            if (positions.includes(-1)) {
+                return;
+            }
+            racesTogetherCount += group["Races"];
+            validPlayers.forEach((player, i) => {
+                playerStats[player].Races += group["Races"];
+                playerStats[player].Points += group["Points"][positions[i]];
+                playerStats[player].TotalPlacement += group["Positions"][positions[i]];
             });
         });
 
+        if (racesTogetherCount === 0) {
+            displayMessage(`Players (${validPlayers.join(", ")}) have not raced together.`, true);
+            return;
+        }
+
+        let message = `Found ${racesTogetherCount} races together for (${validPlayers.join(", ")})`;
+        if (validPlayers.length === 2) {
+            const [a, b] = playerIndexes;
+            const wins = racesTogetherData["Wins"];
+            message += `. Head to head: ${validPlayers[0]} ${wins[a][b]} - ${wins[b][a]} ${validPlayers[1]}`;
+        }
+        displayMessage(message, false);
+
         // Add PPR (Points Per Race) and Avg Position to stats
         Object.values(playerStats).forEach((stats) => {
             stats.PPR = (stats.Points / stats.Races).toFixed(2);
@@ -102,6 +102,16 @@ function addProfilePictures() {
 document.addEventListener("DOMContentLoaded", () => {
     const postAnalysisUrl = "elo_post_analysis.json"; // Path to elo_post_analysis.json
     const playerGraphsBasePath = "assets/player_graphs/"; // Path to player graphs
+    const personalBestsUrl = "personal_bests.json"; // Path to personal_bests.json
+    let personalBests = {}; // Player -> map -> best time, with a best time per kart
+
+    // Fetch personal bests (kept up to date by the loggers)
+    fetch(personalBestsUrl)
+        .then(response => response.json())
+        .then(data => {
+            personalBests = data["Personal Bests"] || {};
+        })
+        .catch(err => console.error("Error fetching personal bests:", err));
 
     // Fetch JSON data
     fetch(postAnalysisUrl)
@@ -206,6 +216,14 @@ document.addEventListener("DOMContentLoaded", () => {
                 mapTitle.textContent = `${player}'s most used karts on ${map}`;
                 container.appendChild(mapTitle);
 
+                // Personal best on this map, and per kart in the table below
+                const mapBest = personalBests[player]?.[map];
+                if (mapBest) {
+                    const bestTime = document.createElement("p");
+                    bestTime.textContent = `Personal best: ${mapBest["Racetime"]} in ${mapBest["Kart"]} (${mapBest["Date"]})`;
+                    container.appendChild(bestTime);
+                }
+
                 const table = document.createElement("table");
                 table.classList.add("kart-usage-table");
 
@@ -217,6 +235,7 @@ document.addEventListener("DOMContentLoaded", () => {
                         <th>Points</th>
                         <th>PPR</th>
                         <th>Avg Position</th>
+                        <th>Best Time</th>
                     </tr>
                 `;
                 table.appendChild(thead);
@@ -230,6 +249,7 @@ document.addEventListener("DOMContentLoaded", () => {
                         <td>${kartStat["Points"]}</td>
                         <td>${kartStat["PPR"]}</td>
                         <td>${kartStat["Avg Position"]}</td>
+                        <td>${mapBest?.["Karts"]?.[kartStat["Kart"]]?.["Racetime"] ?? "-"}</td>
                     `;
                     tbody.appendChild(row);
                 });
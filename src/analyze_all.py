@@ -1,36 +1,69 @@
 import os
+import sys
 import shutil
-import subprocess
 import csv
 import json
 import re
+import io
+import time
+import argparse
+import contextlib
+import filecmp
+import glob
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 # Base directory
-base_dir = os.path.dirname(os.path.dirname(__file__))
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Make the analysis modules importable so every stage runs in-process (or in a worker process)
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+
+# One non-interactive matplotlib backend shared by all stages (set before pyplot is imported)
+import matplotlib
+matplotlib.use("Agg")
+
+import results_store
+import build_manifest
+import analysis
+import elo_analysis
+import kart_analysis
 
 # Define file paths
 players_csv_path = os.path.join(base_dir, "data", "players.csv")
+maps_csv_path = os.path.join(base_dir, "data", "maps.csv")
+karts_csv_path = os.path.join(base_dir, "data", "karts.csv")
+results_csv_path = os.path.join(base_dir, "output", "results.csv")
 main_js_path = os.path.join(base_dir, "docs", "assets", "js", "main.js")
 player_stats_js_path = os.path.join(base_dir, "docs", "assets", "js", "player_stats.js")
 
-def run_script(script_path):
-    """Run a Python script."""
-    subprocess.run(["python", script_path], check=True)
+# Source of the analysis modules; editing any of them invalidates the analysis stages
+calculations_code = sorted(glob.glob(os.path.join(base_dir, "src", "calculations", "*.py")))
+
+def output_path(*parts):
+    return os.path.join(base_dir, "output", *parts)
+
+def docs_path(*parts):
+    return os.path.join(base_dir, "docs", *parts)
 
 def copy_file(src, dest):
-    """Copy a file from src to dest."""
+    """Copy a file from src to dest, unless dest already has the same contents."""
     os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if os.path.exists(dest) and filecmp.cmp(src, dest, shallow=False):
+        return False
     shutil.copy(src, dest)
+    return True
 
 def copy_directory(src, dest):
-    """Copy all files from src directory to dest directory."""
+    """Copy all changed files from src directory to dest directory."""
     if os.path.exists(src):
         os.makedirs(dest, exist_ok=True)
+        copied = 0
         for item in os.listdir(src):
             s = os.path.join(src, item)
             d = os.path.join(dest, item)
-            if os.path.isfile(s):
-                shutil.copy(s, d)
+            if os.path.isfile(s) and copy_file(s, d):
+                copied += 1
+        print(f"Copied {copied} changed file(s) from {src} to {dest}")
 
 def update_js_with_players(js_path, players):
     """Update the players array in the specified JS file."""
@@ -48,11 +81,11 @@ def update_js_with_players(js_path, players):
     except Exception as e:
         print(f"Error updating {js_path}: {e}")
 
-def main():
-    # Load players from CSV
+def load_players():
+    """Load player names from players.csv. Returns None if the file can't be read."""
     if not os.path.exists(players_csv_path):
         print(f"Players CSV file not found at {players_csv_path}")
-        return
+        return None
 
     try:
         with open(players_csv_path, "r") as file:
@@ -61,50 +94,288 @@ def main():
             players.pop(0)  # Remove the header
     except Exception as e:
         print(f"Error reading players CSV: {e}")
+        return None
+    return players
+
+# Worker processes a stage may use for its own work (set by _run_stage; 1 inside the stage pool)
+_stage_jobs = 1
+
+# Results shared by every stage that runs in this process (loaded on first use)
+_shared_results = None
+
+def shared_results():
+    """Return this process's RaceStore of the results, loading it through the results cache once."""
+    global _shared_results
+    if _shared_results is None:
+        _shared_results = results_store.load_results(results_csv_path)
+    return _shared_results
+
+def run_update_js():
+    players = load_players()
+    if players is None:
         return
- 
-    # Update JS files
     players_js_array = json.dumps(players, indent=4)
     update_js_with_players(main_js_path, players_js_array)
     update_js_with_players(player_stats_js_path, players_js_array)
 
-    # 1. Run src/calculations/analysis.py
-    analysis_script = os.path.join(base_dir, "src", "calculations", "analysis.py")
-    run_script(analysis_script)
+def run_analysis():
+    analysis.main(shared_results())
+
+def run_elo_analysis():
+    elo_analysis.main(shared_results(), graph_jobs=_stage_jobs)
+
+def run_kart_analysis():
+    kart_analysis.main(shared_results())
+
+def publish_analysis():
+    copy_file(output_path("post_analysis.json"), docs_path("post_analysis.json"))
+    copy_file(output_path("races_together.json"), docs_path("races_together.json"))
+    copy_file(output_path("personal_bests.json"), docs_path("personal_bests.json"))
+
+def publish_elo_analysis():
+    copy_file(output_path("elo_post_analysis.json"), docs_path("elo_post_analysis.json"))
+    copy_directory(output_path("player_graphs"), docs_path("assets", "player_graphs"))
+
+def publish_kart_analysis():
+    copy_directory(output_path("kart_graphs"), docs_path("assets", "kart_graphs"))
+    copy_file(output_path("kart_stats.json"), docs_path("kart_stats.json"))
+
+# Pipeline stages in their default (sequential) order. A stage depends on every stage
+# that produces one of its inputs; stages with no path between them may run concurrently.
+# A stage is skipped when its inputs, code and outputs all match the last successful build.
+STAGES = {
+    "update_js": {
+        "run": run_update_js,
+        "inputs": [players_csv_path],
+        "outputs": [main_js_path, player_stats_js_path],
+    },
+    "analysis": {
+        "run": run_analysis,
+        "inputs": [results_csv_path, players_csv_path, maps_csv_path, karts_csv_path],
+        "outputs": [output_path("post_analysis.json"), output_path("results.json"), output_path("personal_bests.json"),
+                    output_path("races_together.json")],
+        "code": calculations_code,
+    },
+    "publish_analysis": {
+        "run": publish_analysis,
+        "inputs": [output_path("post_analysis.json"), output_path("races_together.json"), output_path("personal_bests.json")],
+        "outputs": [docs_path("post_analysis.json"), docs_path("races_together.json"), docs_path("personal_bests.json")],
+    },
+    "elo": {
+        "run": run_elo_analysis,
+        "inputs": [results_csv_path, players_csv_path, maps_csv_path],
+        "outputs": [output_path("elo_tracker.csv"), output_path("elo_post_analysis.json"), output_path("player_graphs")],
+        "code": calculations_code,
+    },
+    "publish_elo": {
+        "run": publish_elo_analysis,
+        "inputs": [output_path("elo_post_analysis.json"), output_path("player_graphs")],
+        "outputs": [docs_path("elo_post_analysis.json"), docs_path("assets", "player_graphs")],
+    },
+    "kart": {
+        "run": run_kart_analysis,
+        "inputs": [results_csv_path, maps_csv_path, karts_csv_path],
+        "outputs": [output_path("kart_post_analysis.json"), output_path("kart_graphs"), output_path("kart_stats.json"),
+                    output_path("kart_player_strengths.json")],
+        "code": calculations_code,
+    },
+    "publish_kart": {
+        "run": publish_kart_analysis,
+        "inputs": [output_path("kart_graphs"), output_path("kart_stats.json")],
+        "outputs": [docs_path("assets", "kart_graphs"), docs_path("kart_stats.json")],
+    },
+}
+
+def stage_dependencies(stages=None):
+    """Map each stage to the stages that produce one of its inputs."""
+    stages = STAGES if stages is None else stages
+    producers = {}
+    for name, stage in stages.items():
+        for path in stage["outputs"]:
+            producers[path] = name
+    return {
+        name: sorted({producers[path] for path in stage["inputs"] if path in producers} - {name},
+                     key=list(stages).index)
+        for name, stage in stages.items()
+    }
+
+def select_stages(requested, stages=None):
+    """Return the requested stages plus everything downstream of them, in declaration order."""
+    stages = STAGES if stages is None else stages
+    dependencies = stage_dependencies(stages)
+    selected = set(requested)
+    changed = True
+    while changed:
+        changed = False
+        for name, needs in dependencies.items():
+            if name not in selected and selected.intersection(needs):
+                selected.add(name)
+                changed = True
+    return [name for name in stages if name in selected]
+
+def stage_input_digest(name):
+    """Digest of everything a stage reads: its input files/directories and its source code."""
+    stage = STAGES[name]
+    paths = stage["inputs"] + stage.get("code", [])
+    return build_manifest.digest([build_manifest.file_digest(path) for path in paths])
+
+def stage_output_digest(name):
+    return build_manifest.digest([build_manifest.file_digest(path) for path in STAGES[name]["outputs"]])
+
+def stage_is_up_to_date(manifest, name, input_digest):
+    """True if the stage last ran on the same inputs and its outputs haven't been touched since."""
+    recorded = manifest.get(name)
+    if recorded is None or recorded["inputs"] != input_digest:
+        return False
+    if not all(os.path.exists(path) for path in STAGES[name]["outputs"]):
+        return False
+    return recorded["outputs"] == stage_output_digest(name)
+
+def _run_stage(name, force=False, jobs=1):
+    """Run one stage, capturing its printed output. Returns (name, log, seconds)."""
+    global _stage_jobs
+    _stage_jobs = jobs
+    build_manifest.set_force(force)
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        STAGES[name]["run"]()
+    return name, log.getvalue(), time.perf_counter() - start
+
+def run_stages(names, jobs=1, force=False):
+    """
+    Run stages respecting their dependencies. With jobs > 1 independent stages run
+    concurrently in a process pool, one worker each; a stage with nothing to run alongside it
+    runs in this process instead and may use the jobs workers for its own work. Stage logs are printed in declaration order,
+    so the console output is the same however the stages were scheduled.
+    Stages whose inputs are unchanged since their last build are skipped unless force is set.
+    :return: Dict of stage name -> wall time in seconds.
+    """
+    dependencies = {name: [dep for dep in needs if dep in names] for name, needs in stage_dependencies().items()}
+    pending = list(names)
+    done = set()
+    logs = {}
+    timings = {}
+    next_to_print = 0
+
+    # Only this (parent) process reads and writes the stage manifest
+    manifest = build_manifest.load_manifest("stages")
+    input_digests = {}
+
+    def flush_logs():
+        nonlocal next_to_print
+        while next_to_print < len(names) and names[next_to_print] in logs:
+            print(logs.pop(names[next_to_print]), end="")
+            next_to_print += 1
+
+    def finish(result):
+        name, log, seconds = result
+        done.add(name)
+        logs[name] = log
+        timings[name] = seconds
+        if name in input_digests:
+            manifest[name] = {"inputs": input_digests.pop(name), "outputs": stage_output_digest(name)}
+            build_manifest.save_manifest("stages", manifest)
+        flush_logs()
+
+    def ready_stages():
+        """Pop the stages whose dependencies are done, finishing the up-to-date ones on the spot."""
+        while True:
+            ready = [name for name in pending if all(dep in done for dep in dependencies[name])]
+            skipped = False
+            for name in ready:
+                input_digest = stage_input_digest(name)
+                if not force and stage_is_up_to_date(manifest, name, input_digest):
+                    pending.remove(name)
+                    finish((name, f"Skipping {name}: inputs unchanged since the last build\n", 0.0))
+                    skipped = True
+                else:
+                    input_digests[name] = input_digest
+            if not skipped:
+                for name in ready:
+                    pending.remove(name)
+                return ready
+
+    if jobs <= 1:
+        while pending:
+            for name in ready_stages():
+                finish(_run_stage(name, force))
+        return timings
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        while pending or running:
+            ready = ready_stages()
+            if len(ready) == 1 and not running:
+                # Nothing else to run: run it here so its own pool isn't nested inside a worker
+                finish(_run_stage(ready[0], force, jobs))
+                continue
+            for name in ready:
+                running[executor.submit(_run_stage, name, force)] = name
+            if not running and not pending:
+                break
+            if not running:
+                raise RuntimeError(f"Stages have unmet dependencies: {pending}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    raise RuntimeError(f"Stage '{name}' failed: {e}") from e
+    return timings
 
-    # 2. Copy output/post_analysis.json to docs/post_analysis.json
-    post_analysis_src = os.path.join(base_dir, "output", "post_analysis.json")
-    post_analysis_dest = os.path.join(base_dir, "docs", "post_analysis.json")
-    copy_file(post_analysis_src, post_analysis_dest)
+def print_profile(timings, total):
+    """Print the wall time of each pipeline step."""
+    print("\nStage timings:")
+    for name, seconds in timings.items():
+        print(f"  {name:<18} {seconds:8.2f}s")
+    print(f"  {'total (wall)':<18} {total:8.2f}s")
 
-    # 3. Copy output/results.json to docs/results.json
-    results_src = os.path.join(base_dir, "output", "results.json")
-    results_dest = os.path.join(base_dir, "docs", "results.json")
-    copy_file(results_src, results_dest)
+def run_pipeline(stages=None, jobs=1, profile=False, force=False):
+    """
+    Run analysis stages and everything downstream of them.
+    :param stages: Stage names from STAGES to run (default: all).
+    :param jobs: Number of worker processes; 1 runs every stage in this process.
+    :param profile: Print per-stage wall times when done.
+    :param force: Rebuild every stage and artifact even if its inputs are unchanged.
+    :return: Dict of step name -> wall time in seconds.
+    """
+    stages = list(STAGES) if stages is None else list(stages)
+    unknown_stages = [stage for stage in stages if stage not in STAGES]
+    if unknown_stages:
+        raise ValueError(f"Unknown stages: {unknown_stages}. Available: {list(STAGES)}")
+    names = select_stages(stages)
 
-    # 4. Run src/calculations/elo_analysis.py
-    elo_analysis_script = os.path.join(base_dir, "src", "calculations", "elo_analysis.py")
-    run_script(elo_analysis_script)
+    pipeline_start = time.perf_counter()
+    timings = {}
 
-    # 5. Copy output/elo_post_analysis.json to docs/elo_post_analysis.json
-    elo_post_analysis_src = os.path.join(base_dir, "output", "elo_post_analysis.json")
-    elo_post_analysis_dest = os.path.join(base_dir, "docs", "elo_post_analysis.json")
-    copy_file(elo_post_analysis_src, elo_post_analysis_dest)
+    # Parse results.csv (or refresh its cache) once up front; worker processes then read the cache
+    start = time.perf_counter()
+    shared_results()
+    timings["load results"] = time.perf_counter() - start
 
-    # 6. Copy all graphs from output/player_graphs/ to docs/assets/player_graphs/
-    player_graphs_src = os.path.join(base_dir, "output", "player_graphs")
-    player_graphs_dest = os.path.join(base_dir, "docs", "assets", "player_graphs")
-    copy_directory(player_graphs_src, player_graphs_dest)
+    build_manifest.set_force(force)
+    timings.update(run_stages(names, jobs=jobs, force=force))
 
-    # 7. Run src/calculations/kart_analysis.py
-    kart_analysis_script = os.path.join(base_dir, "src", "calculations", "kart_analysis.py")
-    run_script(kart_analysis_script)
+    if profile:
+        print_profile(timings, time.perf_counter() - pipeline_start)
+    return timings
 
-    # 8. Copy all graphs from output/kart_graphs/ to docs/assets/kart_graphs/
-    kart_graphs_src = os.path.join(base_dir, "output", "kart_graphs")
-    kart_graphs_dest = os.path.join(base_dir, "docs", "assets", "kart_graphs")
-    copy_directory(kart_graphs_src, kart_graphs_dest)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run all NemoKart analysis and update the website data.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Stages to run, plus the stages that depend on them (default: all).")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for independent stages (default: CPU count, 1 = sequential).")
+    parser.add_argument("--profile", action="store_true", help="Report wall time per stage.")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild everything, ignoring the build manifest in output/cache/manifest.")
+    return parser.parse_args(argv)
 
+def main(argv=None):
+    args = parse_args(argv)
+    run_pipeline(args.stages, jobs=args.jobs, profile=args.profile, force=args.force)
     print("All analysis tasks completed successfully.")
 
 if __name__ == "__main__":
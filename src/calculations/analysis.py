@@ -2,6 +2,12 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import results_store
+import build_manifest
+import leaderboards
+import personal_bests
+import results_json
+import head_to_head
 
 # Base directory
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -10,11 +16,15 @@ base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 results_file = os.path.join(base_dir, "output/results.csv")
 results_json_file = os.path.join(base_dir, "output/results.json")
 post_analysis_file = os.path.join(base_dir, "output/post_analysis.json")
+races_together_file = os.path.join(base_dir, "output/races_together.json")
 #post_analysis_file2 = os.path.join(base_dir, "docs/post_analysis.json")
 players_file = os.path.join(base_dir, "data/players.csv")
 maps_file = os.path.join(base_dir, "data/maps.csv")
 karts_file = os.path.join(base_dir, "data/karts.csv")
 
+# results.json is written without whitespace (see results_json.FORMATS)
+RESULTS_JSON_FORMAT = "compact"
+
 # Load CSV files
 def load_csv(file_path, default_columns=None):
     if not os.path.exists(file_path):
@@ -27,8 +37,9 @@ def load_csv(file_path, default_columns=None):
     return pd.read_csv(file_path)
 
 # Load required data
-def load_data():
-    results = load_csv(results_file)
+def load_data(results=None):
+    if results is None:
+        results = results_store.load_results(results_file)
     players = load_csv(players_file, default_columns=["Player Name"])
     maps = load_csv(maps_file, default_columns=["Map Name"])
     karts = load_csv(karts_file, default_columns=["Kart Name"])
@@ -39,46 +50,65 @@ def calculate_points(placement):
     points_table = {1: 25, 2: 18, 3: 15, 4: 12, 5: 10, 6: 8, 7: 6, 8: 4}
     return points_table.get(placement, 0)
 
+# calculate_points() as a lookup table indexed by placement
+POINTS_BY_PLACEMENT = np.array([calculate_points(placement) for placement in range(9)])
+
+def placement_points(placements):
+    """Vectorized calculate_points() for an array of placements."""
+    placements = np.asarray(placements, dtype=np.int64)
+    in_table = (placements >= 0) & (placements < len(POINTS_BY_PLACEMENT))
+    return np.where(in_table, POINTS_BY_PLACEMENT[np.where(in_table, placements, 0)], 0)
+
 def calculate_daily_stats(df, players):
     """Calculate daily stats for players who raced on a given day."""
+    player_names = players["Player Name"].tolist()
+    store = results_store.as_store(df, player_names)
+    entries = store.entries
+
+    # Dates are numbered in the order they first appear, players in players.csv order
+    date_codes, dates = pd.factorize(store.races["Date"])
+    placements = entries["placement"].to_numpy(dtype=np.int64)
+    participations = pd.DataFrame({
+        "date": date_codes[entries["race_id"].to_numpy()],
+        "player_id": entries["player_id"].to_numpy(),
+        "placement": placements,
+        "points": placement_points(placements),
+    })
+    stats = participations.groupby(["date", "player_id"]).agg(
+        Races=("placement", "size"),
+        Points=("points", "sum"),
+        Positions=("placement", "sum"),
+    )
+    ppr = np.round(stats["Points"] / stats["Races"], 2)
+    avg_position = np.round(stats["Positions"] / stats["Races"], 2)
+
+    # Only players who raced on a date (and only dates with players) appear
     daily_stats = {}
-    for date in df["Date"].unique():
-        daily_df = df[df["Date"] == date]
-        stats_for_date = {}
-
-        for player in players["Player Name"]:
-            player_column = f"{player} Placement"
-            pd.set_option('future.no_silent_downcasting', True)
-            valid_placements = daily_df[player_column].replace("DNR", np.nan).dropna().astype(int)
-            total_races = valid_placements.count()
-            
-            if total_races > 0:  # Only include players who raced
-                total_points = valid_placements.apply(calculate_points).sum()
-                ppr = total_points / total_races
-                avg_position = valid_placements.mean()
-                stats_for_date[player] = {
-                    "Races": total_races,
-                    "Points": total_points,
-                    "PPR": round(ppr, 2),
-                    "Avg Race Position": round(avg_position, 2)
-                }
-
-        # Only add the stats for this date if there are any players
-        if stats_for_date:
-            daily_stats[date] = stats_for_date
+    for (date, player_id), races, points, player_ppr, player_avg in zip(
+            stats.index, stats["Races"], stats["Points"], ppr, avg_position):
+        daily_stats.setdefault(dates[date], {})[player_names[player_id]] = {
+            "Races": races,
+            "Points": points,
+            "PPR": player_ppr,
+            "Avg Race Position": player_avg
+        }
 
     return daily_stats
 
 # Generate all-time stats
 def calculate_all_time_stats(df, players):
+    player_names = players["Player Name"].tolist()
+    entries = results_store.as_store(df, player_names).entries
+    player_ids = entries["player_id"].to_numpy()
+    placements = entries["placement"].to_numpy(dtype=np.int64)
+    races = np.bincount(player_ids, minlength=len(player_names))
+    points = np.bincount(player_ids, weights=placement_points(placements), minlength=len(player_names)).astype(np.int64)
+    positions = np.bincount(player_ids, weights=placements, minlength=len(player_names))
+
     all_time_stats = {}
-    for player in players["Player Name"]:
-        player_column = f"{player} Placement"
-        valid_placements = df[player_column].replace("DNR", np.nan).dropna().astype(int)
-        total_races = valid_placements.count()
-        total_points = valid_placements.apply(calculate_points).sum()
+    for player, total_races, total_points, total_positions in zip(player_names, races, points, positions):
         ppr = total_points / total_races if total_races > 0 else 0
-        avg_position = valid_placements.mean() if total_races > 0 else None
+        avg_position = total_positions / total_races if total_races > 0 else None
         all_time_stats[player] = {
             "Races": total_races,
             "Points": total_points,
@@ -87,100 +117,122 @@ def calculate_all_time_stats(df, players):
         }
     return all_time_stats
 
+def calculate_races_together(df, players):
+    """
+    Precompute the website's "Races Together" table: for every pair of players the races they
+    both finished and how often each came out ahead, plus Races/Points/Positions per lineup
+    (set of players who finished a race) so any group of players can be summed up client-side.
+    """
+    player_names = players["Player Name"].tolist()
+
+    # (races x players) participation, placement and points
+    placement_matrix, racetime_ms = head_to_head.race_matrices(df, player_names)
+    participated = placement_matrix > 0
+    points_matrix = np.where(participated, placement_points(placement_matrix), 0)
+
+    # Pairs: races both finished, and races the row player finished ahead of the column player
+    pair_totals = head_to_head.pairwise_totals(placement_matrix, racetime_ms, np.zeros(len(placement_matrix), dtype=np.int64), 1)[0]
+    races_together = pair_totals[head_to_head.TOTALS.index("Races")]
+    wins = pair_totals[head_to_head.TOTALS.index("Wins")]
+
+    # Lineups: races with exactly the same finishers are summed together
+    lineups, lineup_ids = np.unique(participated, axis=0, return_inverse=True)
+    lineup_ids = lineup_ids.reshape(-1)
+    lineup_races = np.bincount(lineup_ids, minlength=len(lineups))
+    lineup_points = np.zeros(lineups.shape, dtype=np.int64)
+    np.add.at(lineup_points, lineup_ids, points_matrix)
+    lineup_positions = np.zeros(lineups.shape, dtype=np.int64)
+    np.add.at(lineup_positions, lineup_ids, placement_matrix)
+
+    groups = []
+    for lineup, races, points, positions in zip(lineups, lineup_races, lineup_points, lineup_positions):
+        members = np.flatnonzero(lineup)
+        if len(members) < 2:
+            continue
+        groups.append({
+            "Players": members.tolist(),
+            "Races": int(races),
+            "Points": points[members].tolist(),
+            "Positions": positions[members].tolist(),
+        })
+
+    return {
+        "Players": player_names,
+        "Races Together": races_together.tolist(),
+        "Wins": wins.tolist(),
+        "Groups": groups,
+    }
+
+def build_leaderboards(df, maps, players):
+    """Leaderboards built from every race in df (no checkpoint)."""
+    boards = leaderboards.Leaderboards(maps["Map Name"].tolist())
+    boards.add_races(df, players["Player Name"].tolist())
+    return boards
+
 # Generate leaderboard for best race times
-def calculate_best_race_times(df, maps, players):
-    leaderboard = {}
-    for map_name in maps["Map Name"]:
-        map_df = df[df["Map Name"] == map_name]
-        race_entries = []
-        for _, row in map_df.iterrows():
-            for player in players["Player Name"]:
-                race_time_col = f"{player} Racetime"
-                kart_col = f"{player} Kart"
-                race_time = row.get(race_time_col)
-                if race_time != "DNR" and pd.notna(race_time):
-                    race_entries.append((race_time, f"{race_time} by {player} in {row.get(kart_col)}"))
-        # Sort entries by race time (convert MM:SS.xx to seconds for sorting)
-        race_entries.sort(key=lambda x: tuple(map(float, x[0].split(":"))))
-        leaderboard[map_name] = [entry[1] for entry in race_entries[:10]]  # Top 10 times
-    return leaderboard
-
-def calculate_individual_best_times(df, maps, players):
+def calculate_best_race_times(df, maps, players, boards=None):
+    """Top 10 race times on each map, fastest first."""
+    if boards is None:
+        boards = build_leaderboards(df, maps, players)
+    return boards.best_race_times()
+
+def calculate_individual_best_times(df, maps, players, pb_index=None):
     """Calculate each player's individual best time for each map, ordered from best to worst."""
-    individual_best_times = {}
-    for map_name in maps["Map Name"]:
-        map_df = df[df["Map Name"] == map_name]
-        player_best_times = {}
-
-        for _, row in map_df.iterrows():
-            for player in players["Player Name"]:
-                race_time_col = f"{player} Racetime"
-                kart_col = f"{player} Kart"
-                race_time = row.get(race_time_col)
-
-                if race_time != "DNR" and pd.notna(race_time):
-                    time_in_seconds = sum(float(x) * 60 ** i for i, x in enumerate(reversed(race_time.split(":"))))
-                    if player not in player_best_times or time_in_seconds < player_best_times[player]["time"]:
-                        player_best_times[player] = {
-                            "time": time_in_seconds,
-                            "record": f"{race_time} by {player} in {row.get(kart_col)}"
-                        }
-
-        # Sort the best times from best to worst and save only the records
-        sorted_best_times = sorted(player_best_times.values(), key=lambda x: x["time"])
-        individual_best_times[map_name] = [data["record"] for data in sorted_best_times]
-
-    return individual_best_times
-
-def convert_results_to_json():
-    """Convert results.csv to results.json while removing DNR rows."""
+    player_names = players["Player Name"].tolist()
+    if pb_index is None:
+        pb_index = personal_bests.build_index(df, player_names)
+    return personal_bests.individual_best_times(pb_index, maps["Map Name"].tolist(), player_names)
+
+def convert_results_to_json(results_format=RESULTS_JSON_FORMAT):
+    """Convert results.csv to results.json while removing DNR fields (streamed, see results_json.py)."""
     
     if not os.path.exists(results_file):
         print(f"{results_file} not found. Ensure the file exists and try again.")
         return
     
     try:
-        # Read the CSV file
-        results_df = pd.read_csv(results_file)
-        
-        # Function to filter out "DNR" entries in each row
-        def filter_dnr(row):
-            filtered_row = {
-                key: value
-                for key, value in row.items()
-                if not (isinstance(value, str) and value == "DNR")
-            }
-            return filtered_row
-
-        # Apply the filtering to each row
-        filtered_results = [filter_dnr(row) for row in results_df.to_dict(orient="records")]
-        
-        # Write the filtered results to JSON
-        with open(results_json_file, "w") as json_file:
-            json.dump(filtered_results, json_file, indent=4)
-        
-        print(f"Results successfully converted to JSON and saved to {results_json_file}.")
+        # Write results.json (skipped if nothing changed)
+        if results_json.convert_results_to_json(results_file, results_json_file, results_format):
+            print(f"Results successfully converted to JSON and saved to {results_json_file}.")
+        else:
+            print(f"{results_json_file} is already up to date.")
     except Exception as e:
         print(f"An error occurred while converting results to JSON: {e}")
 
 
 # Main function to generate post_analysis.json
-def main():
-    results, players, maps, karts = load_data()
-    if results.empty:
+def main(results=None):
+    results, players, maps, karts = load_data(results)
+    if results_store.num_races(results) == 0:
         print("No results found. Exiting analysis.")
         return
 
+    # Leaderboards pick up from the last run and only read the races logged since (times shown as M:SS.xx from ms)
+    boards = leaderboards.load_leaderboards(results, players["Player Name"].tolist(), maps["Map Name"].tolist(),
+                                            results_file)
+
+    # The loggers keep the personal-best index up to date; it's only rebuilt if results.csv changed behind their back
+    pb_index = personal_bests.load_index(results, players["Player Name"].tolist(), results_file,
+                                         force=build_manifest.forced())
+
     post_analysis = {
         "Daily Stats": calculate_daily_stats(results, players),
         "All Time Stats": calculate_all_time_stats(results, players),
         "Legend": {1: 25, 2: 18, 3: 15, 4: 12, 5: 10, 6: 8, 7: 6, 8: 4},
-        "Best Race Times": calculate_best_race_times(results, maps, players),
-        "Individual Player Best Times": calculate_individual_best_times(results, maps, players)
+        "Best Race Times": calculate_best_race_times(results, maps, players, boards),
+        "Individual Player Best Times": calculate_individual_best_times(results, maps, players, pb_index),
+        "Head to Head": head_to_head.calculate_head_to_head(results, players, maps)
     }
 
     convert_results_to_json()
 
+    # Races Together table for the website (compact, like results.json)
+    races_together_json = json.dumps(calculate_races_together(results, players), separators=(",", ":"))
+    if build_manifest.write_text_if_changed(races_together_file, races_together_json):
+        print(f"Races Together saved to {races_together_file}")
+    else:
+        print(f"{races_together_file} is already up to date.")
+
     # Ensure JSON serializable
     def convert_to_serializable(obj):
         if isinstance(obj, (np.integer, int)):
@@ -191,11 +243,12 @@ def main():
             return str(obj)
         return obj
 
-    # Write to post_analysis.json
-    with open(post_analysis_file, "w") as json_file:
-        json.dump(post_analysis, json_file, indent=4, default=convert_to_serializable)
-
-    print(f"Post analysis saved to {post_analysis_file}")
+    # Write to post_analysis.json (skipped if nothing changed)
+    post_analysis_json = json.dumps(post_analysis, indent=4, default=convert_to_serializable)
+    if build_manifest.write_text_if_changed(post_analysis_file, post_analysis_json):
+        print(f"Post analysis saved to {post_analysis_file}")
+    else:
+        print(f"{post_analysis_file} is already up to date.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,36 @@
+import os
+import stat
+
+def _default_mode():
+    """Permissions a plain open(path, "w") would give a new file (0666 minus the umask)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def line_terminator(path, default=os.linesep):
+    """
+    How the lines of an existing text file end ("\r\n" for a file written on Windows), taken from
+    its first line, so rewritten or appended lines can match. default if it has no complete line yet.
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "rb") as file:
+        first_line = file.readline()
+    if first_line.endswith(b"\r\n"):
+        return "\r\n"
+    if first_line.endswith(b"\n"):
+        return "\n"
+    return default
+
+def replace(temp_path, path):
+    """
+    Swap a finished temporary file in for path with os.replace.
+    tempfile.mkstemp creates files as 0600 and os.replace keeps that, so the temporary file first
+    gets path's current permission bits (or the default for a new file).
+    """
+    if os.path.exists(path):
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    else:
+        mode = _default_mode()
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
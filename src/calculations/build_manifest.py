@@ -0,0 +1,123 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import hashlib
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+manifest_dir = os.path.join(base_dir, "output/cache/manifest")
+
+# When set, every artifact is treated as out of date (analyze_all.py --force)
+_force = False
+
+def set_force(force):
+    """Rebuild every artifact regardless of the manifest."""
+    global _force
+    _force = bool(force)
+
+def forced():
+    """True when --force asked for everything to be rebuilt."""
+    return _force
+
+def _update(hasher, part):
+    """Feed one value into a hash in a type-stable way."""
+    if isinstance(part, bytes):
+        hasher.update(part)
+    elif isinstance(part, str):
+        hasher.update(part.encode("utf-8"))
+    elif isinstance(part, (pd.DataFrame, pd.Series)):
+        hasher.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode("utf-8"))
+        hasher.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    elif isinstance(part, np.ndarray):
+        hasher.update(str(part.dtype).encode("utf-8"))
+        hasher.update(repr(part.shape).encode("utf-8"))
+        hasher.update(part.tobytes() if part.dtype != object else repr(part.tolist()).encode("utf-8"))
+    else:
+        hasher.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    hasher.update(b"\x00")
+
+def digest(*parts):
+    """Hash any mix of bytes, strings, DataFrames, arrays and JSON-able values into a hex digest."""
+    hasher = hashlib.sha1()
+    for part in parts:
+        _update(hasher, part)
+    return hasher.hexdigest()
+
+def file_digest(path):
+    """Hash a file's contents, or every file in a directory (by relative name). Missing paths hash as None."""
+    if os.path.isdir(path):
+        hasher = hashlib.sha1()
+        for name in sorted(os.listdir(path)):
+            item = os.path.join(path, name)
+            if os.path.isfile(item):
+                hasher.update(name.encode("utf-8"))
+                hasher.update(file_digest(item).encode("utf-8"))
+        return hasher.hexdigest()
+    if not os.path.exists(path):
+        return None
+    hasher = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _manifest_file(name):
+    return os.path.join(manifest_dir, f"{name}.json")
+
+def _artifact_key(artifact):
+    """Store artifacts relative to the repo so the manifest survives moving the checkout."""
+    path = os.path.abspath(artifact)
+    try:
+        return os.path.relpath(path, base_dir).replace(os.sep, "/")
+    except ValueError:
+        return path
+
+def load_manifest(name):
+    """
+    Load the named manifest (artifact -> digests of its inputs and of the file built from them).
+    One file per writer avoids concurrent writes.
+    """
+    path = _manifest_file(name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable build manifest {path}: {e}")
+        return {}
+
+def save_manifest(name, manifest):
+    os.makedirs(manifest_dir, exist_ok=True)
+    write_text_if_changed(_manifest_file(name), json.dumps(manifest, indent=4, sort_keys=True))
+
+def needs_build(manifest, artifact, input_digest):
+    """
+    True if the artifact is missing, was built from different inputs, was changed on disk since
+    it was built (overwritten, or checked out from git), or --force is set.
+    """
+    if _force or not os.path.exists(artifact):
+        return True
+    recorded = manifest.get(_artifact_key(artifact))
+    if not isinstance(recorded, dict) or recorded.get("inputs") != input_digest:
+        return True
+    return recorded.get("output") != file_digest(artifact)
+
+def record(manifest, artifact, input_digest):
+    """Remember which inputs the artifact was last built from, and the file that was built."""
+    manifest[_artifact_key(artifact)] = {"inputs": input_digest, "output": file_digest(artifact)}
+
+def write_text_if_changed(path, text):
+    """
+    Write text to path unless the file already has exactly that content. Returns True if written.
+    Text mode is used both ways, so line endings follow the platform like a plain open(path, "w").
+    """
+    if not _force and os.path.exists(path):
+        with open(path, "r") as file:
+            if file.read() == text:
+                return False
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+    return True
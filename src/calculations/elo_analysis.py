@@ -1,7 +1,17 @@
 import pandas as pd
+import numpy as np
 import os
-import matplotlib.pyplot as plt
+import matplotlib
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import json
+import time
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+import results_store
+import build_manifest
+import atomic_file
 
 # Base directory and file paths
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -10,12 +20,14 @@ players_file = os.path.join(base_dir, "data/players.csv")
 elo_tracker_file = os.path.join(base_dir, "output/elo_tracker.csv")
 maps_file = os.path.join(base_dir, "data/maps.csv")
 player_graphs_dir = os.path.join(base_dir, "output/player_graphs")
+elo_checkpoint_file = os.path.join(base_dir, "output/cache/elo_checkpoint.json")
 
 # Constants
 UNKNOWN_PLAYER_ELO = 2000
 BASE_ELO = 1000
 K_FACTOR_INITIAL = 24  # Initial K-factor for the first 10 races
 K_FACTOR_AFTER = 8  # Lower K-factor for subsequent races
+INITIAL_K_RACES = 10  # Race counts up to this use K_FACTOR_INITIAL
 MAX_RACERS = 8
 
 # Create the player_graphs directory if it doesn't exist
@@ -35,221 +47,349 @@ def calculate_points(placement):
     points_table = {1: 25, 2: 18, 3: 15, 4: 12, 5: 10, 6: 8, 7: 6, 8: 4}
     return points_table.get(placement, 0)
 
-def process_kart_usage(player, results):
-    """Calculate the top 5 karts used by a player for each map."""
-    player_kart_stats = {}
-
-    maps_list = load_csv(maps_file)
-    for map_name in maps_list["Map Name"]:
-        map_results = results[results["Map Name"] == map_name]
-        kart_usage = {}
-
-        for _, row in map_results.iterrows():
-            placement_col = f"{player} Placement"
-            kart_col = f"{player} Kart"
-            racetime_col = f"{player} Racetime"
-
-            if placement_col in row and kart_col in row and racetime_col in row:
-                placement = row[placement_col]
-                kart = row[kart_col]
-                racetime = row[racetime_col]
-
-                if placement != "DNR" and kart != "DNR" and racetime != "DNR":
-                    # Initialize kart stats
-                    if kart not in kart_usage:
-                        kart_usage[kart] = {"Races": 0, "Points": 0, "Positions": [], "Times": []}
-                    
-                    # Update stats
-                    kart_usage[kart]["Races"] += 1
-                    kart_usage[kart]["Points"] += calculate_points(int(placement))
-                    kart_usage[kart]["Positions"].append(int(placement))
-                    
-                    # Convert racetime to seconds
-                    time_parts = racetime.split(":")
-                    kart_time = float(time_parts[0]) * 60 + float(time_parts[1])
-                    kart_usage[kart]["Times"].append(kart_time)
-
-        # Compute aggregated stats for each kart
-        kart_stats = []
-        for kart, stats in kart_usage.items():
-            avg_position = sum(stats["Positions"]) / len(stats["Positions"])
-            ppr = stats["Points"] / stats["Races"]  # Points per race
-            kart_stats.append({
-                "Kart": kart,
-                "Races": stats["Races"],
-                "Points": stats["Points"],
-                "PPR": round(ppr, 2),
-                "Avg Position": round(avg_position, 2),
-            })
-
-        # Sort by PPR and take the top 5
-        kart_stats = sorted(kart_stats, key=lambda x: x["Races"], reverse=True)[:5]
-        player_kart_stats[map_name] = kart_stats
-
-    return player_kart_stats
-
-def initialize_elo_tracker(results, default_players):
-    """Initialize the Elo tracker file if it doesn't exist."""
-    if not os.path.exists(elo_tracker_file):
-        # Create a new DataFrame with the correct headers
-        columns = ["Date", "Time", "Map Name"] + default_players
-        elo_tracker = pd.DataFrame(columns=columns)
-        elo_tracker.to_csv(elo_tracker_file, index=False)
-        print(f"Initialized elo_tracker.csv with columns: {columns}")
+# calculate_points() as a lookup table indexed by placement
+POINTS_BY_PLACEMENT = np.array([calculate_points(placement) for placement in range(MAX_RACERS + 1)])
 
-def calculate_expected_score(elo_a, elo_b):
-    """Calculate the expected score between two players."""
-    return 1 / (1 + 10 ** ((elo_b - elo_a) / 400))
-
-def determine_k_factor(player_race_count):
-    """Determine the K-factor based on the player's number of races."""
-    return K_FACTOR_INITIAL if player_race_count <= 10 else K_FACTOR_AFTER
-
-def update_elo_ratings(elo_ratings, race_results, race_counts):
+def process_kart_usage(results, default_players):
     """
-    Update Elo ratings for a single race with dynamic K-factor scaling and proportional adjustments.
-    Assumes unknown players have a default rating and accounts for their placements.
-    :param elo_ratings: Current Elo ratings (dict).
-    :param race_results: DataFrame of players and their placements in a race.
-    :param race_counts: Current number of races for each player (dict).
-    :return: Updated Elo ratings (dict).
+    Calculate the top 5 karts used by every player on each map, in one pass over the participations.
+    :param results: RaceStore (or wide results DataFrame).
+    :param default_players: Player names.
+    :return: {player: {map name: [kart stats]}} for every map in maps.csv.
     """
-    participants = race_results["Player"].tolist()
-    placements = race_results["Placement"].tolist()
-
-    # Calculate the number of known players
-    num_known = len(participants)
-
-    all_racers_list = [f"Unknown_{i}" for i in range(MAX_RACERS)]
-    all_placements_list = list(range(1, MAX_RACERS + 1))
-
-    for i in range(len(participants)):
-        placement = placements[i]
-        all_racers_list[placement-1] = participants[i]
-
-    # Add unknown players to participants and placements
-    participants = all_racers_list
-    placements = all_placements_list
+    map_list = load_csv(maps_file, default_columns=["Map Name"])["Map Name"].tolist()
+    kart_usage = {player: {map_name: [] for map_name in map_list} for player in default_players}
+
+    # Only races with a logged kart and racetime count
+    store = results_store.as_store(results, default_players)
+    entries = results_store.entries_with_names(store)
+    entries = entries[(entries["kart_id"] != results_store.MISSING_ID) & (entries["racetime_ms"] != results_store.MISSING_ID)]
+    entries = entries.assign(
+        Points=POINTS_BY_PLACEMENT[entries["placement"].to_numpy()],
+        first_seen=np.arange(len(entries)),
+    )
+
+    kart_stats = entries.groupby(["Player", "Map Name", "Kart"], observed=True).agg(
+        Races=("placement", "size"),
+        Points=("Points", "sum"),
+        Positions=("placement", "sum"),
+        first_seen=("first_seen", "min"),
+    ).reset_index()
+
+    # Most used first; ties keep the order the karts were first used on the map
+    kart_stats = kart_stats.sort_values(["Races", "first_seen"], ascending=[False, True], kind="stable")
+    kart_stats = kart_stats.groupby(["Player", "Map Name"], observed=True).head(5)
+
+    for player, map_name, kart, races, points, positions, _ in kart_stats.itertuples(index=False, name=None):
+        if map_name not in kart_usage[player]:
+            continue  # Map isn't in maps.csv
+        races, points = int(races), int(points)
+        kart_usage[player][map_name].append({
+            "Kart": kart,
+            "Races": races,
+            "Points": points,
+            "PPR": round(points / races, 2),  # Points per race
+            "Avg Position": round(int(positions) / races, 2),
+        })
+
+    return kart_usage
 
-    # Increment race counts for known participants
-    for player in participants:
-        if player in elo_ratings:
-            race_counts[player] += 1
-
-    # Temporary structure to hold Elo changes
-    elo_changes = {player: 0 for player in participants}
-    unknown_elo = UNKNOWN_PLAYER_ELO
+def calculate_expected_score(elo_a, elo_b):
+    """Calculate the expected score between two players."""
+    return 1 / (1 + 10 ** ((elo_b - elo_a) / 400))
 
-    # Define proportionality factors based on the number of known players
+def proportional_factor(num_known):
+    """Scale Elo adjustments by how many of the racers are known players."""
     if num_known == 1:
-        proportional_factor = 0.3  # Single known player -> very low Elo adjustment
+        return 0.3  # Single known player -> very low Elo adjustment
     elif num_known == 2:
-        proportional_factor = 0.65  # Two known players -> moderate adjustment
+        return 0.65  # Two known players -> moderate adjustment
     elif num_known == 3:
-        proportional_factor = 0.95  # Three known players -> stronger adjustment
+        return 0.95  # Three known players -> stronger adjustment
     elif 4 <= num_known <= 7:
-        proportional_factor = 0.997  # Five to seven known players -> high adjustment
+        return 0.997  # Five to seven known players -> high adjustment
     else:
-        proportional_factor = 1.0  # All players are known -> full adjustment
+        return 1.0  # All players are known -> full adjustment
+
+# proportional_factor() as a lookup table indexed by the number of known players
+PROPORTIONAL_FACTORS = np.array([proportional_factor(num_known) for num_known in range(MAX_RACERS + 1)])
+
+# WIN_MATRIX[i, j] is 1 if finishing slot i beat slot j (slots are placements, so i < j)
+WIN_MATRIX = np.triu(np.ones((MAX_RACERS, MAX_RACERS)), k=1)
+DIAGONAL = np.arange(MAX_RACERS)
+
+def _pow10(exponents):
+    """
+    10 ** exponents, element-wise. np.power's SIMD pow can differ from the C library's pow in
+    the last bit, so the powers go through float.__pow__ to match calculate_expected_score exactly.
+    """
+    return np.power(10.0, np.asarray(exponents).astype(object)).astype(np.float64)
 
-    # Pairwise comparisons based on placements
-    for i, player_a in enumerate(participants):
-        for j, player_b in enumerate(participants):
-            if i != j:
-                # Determine Elo values for each participant
-                elo_a = elo_ratings[player_a] if player_a in elo_ratings else unknown_elo
-                elo_b = elo_ratings[player_b] if player_b in elo_ratings else unknown_elo
+def pairwise_elo_changes(slot_elos, slot_scales):
+    """
+    Elo change for every racer in a race from all 8x8 pairwise comparisons at once.
+    Leading axes are treated as a batch of independent races.
+    :param slot_elos: Ratings by finishing slot, shape (..., MAX_RACERS); unknown racers hold UNKNOWN_PLAYER_ELO.
+    :param slot_scales: proportional_factor * k_factor by slot, 0 for racers whose rating isn't updated.
+    :return: Array of Elo changes by slot, shape (..., MAX_RACERS).
+    """
+    slot_elos = np.asarray(slot_elos, dtype=np.float64)
+    slot_scales = np.asarray(slot_scales, dtype=np.float64)
 
-                # Calculate expected score and actual score
-                expected_a = calculate_expected_score(elo_a, elo_b)
-                actual_a = 1 if placements[i] < placements[j] else 0  # Player A wins if placement is better (lower)
+    # expected[..., i, j]: expected score of slot i against slot j
+    expected = 1 / (1 + _pow10((slot_elos[..., None, :] - slot_elos[..., :, None]) / 400))
+    terms = slot_scales[..., :, None] * (WIN_MATRIX - expected)
+    terms[..., DIAGONAL, DIAGONAL] = 0.0  # No comparison against yourself
 
-                # Apply K-factor scaling for known players
-                if player_a in elo_ratings:
-                    k_factor = determine_k_factor(race_counts[player_a])
-                    elo_changes[player_a] += (
-                        proportional_factor * k_factor * (actual_a - expected_a)
-                    )
+    # cumsum adds opponents left to right like the original loop (np.sum's pairwise order would not)
+    return np.cumsum(terms, axis=-1)[..., -1]
 
-    # Apply Elo changes simultaneously
-    for player in elo_changes:
-        if player in elo_ratings:
-            elo_ratings[player] += elo_changes[player]
+def race_tensor(results, default_players, first_race=0):
+    """
+    Encode races as player ids by finishing slot for replay_elo().
+    :param results: RaceStore (or wide results DataFrame).
+    :param default_players: Player names; a player's id is their index in this list.
+    :param first_race: Encode the races from this one on.
+    :return: (slots, participated): (races x MAX_RACERS) int16 array of player ids with -1 for
+             unknown racers, and (races x players) bool array of who raced.
+    """
+    store = results_store.as_store(results, default_players)
+    num_races = max(store.num_races - first_race, 0)
+    slots = np.full((num_races, MAX_RACERS), -1, dtype=np.int16)
+    participated = np.zeros((num_races, len(default_players)), dtype=bool)
+    entries = store.entries[store.entries["race_id"] >= first_race]
+    race_ids = entries["race_id"].to_numpy() - first_race
+    player_ids = entries["player_id"].to_numpy()
+    participated[race_ids, player_ids] = True
+    slots[race_ids, entries["placement"].to_numpy() - 1] = player_ids
+    return slots, participated
+
+def replay_elo(slots, race_counts, start_elo, participated=None,
+               k_factor_initial=K_FACTOR_INITIAL, k_factor_after=K_FACTOR_AFTER,
+               unknown_player_elo=UNKNOWN_PLAYER_ELO, proportional_factors=PROPORTIONAL_FACTORS):
+    """
+    Replay races in order over integer-encoded racers and return the ratings after every race.
+    The settings can be arrays with a common leading (batch) shape to replay many parameter sets at once.
+    :param slots: (races x MAX_RACERS) int array of player ids by finishing slot, -1 for unknown racers.
+    :param race_counts: Int array of races per player before the first race; updated in place.
+    :param start_elo: Ratings per player before the first race, shape (..., players).
+    :param participated: (races x players) bool array of who raced; defaults to the players in slots.
+    :param k_factor_initial: K-factor while a player's race count is at most INITIAL_K_RACES.
+    :param k_factor_after: K-factor after that.
+    :param unknown_player_elo: Rating used for unknown racers.
+    :param proportional_factors: Adjustment scale by number of known racers, shape (..., MAX_RACERS + 1).
+    :return: Array of ratings after each race, shape (races, ..., players).
+    """
+    slots = np.asarray(slots)
+    num_races = len(slots)
+    known = slots >= 0
+    player_ids = np.where(known, slots, 0).astype(np.intp)
+    race_rows = np.nonzero(known)[0]
+    if participated is None:
+        participated = np.zeros((num_races, len(race_counts)), dtype=bool)
+        participated[race_rows, player_ids[known]] = True
+
+    # Race counts go up once for racing and once more for holding a slot in the rating update,
+    # so the K-factor of each slot is known up front
+    increments = participated.astype(np.int64)
+    increments[race_rows, player_ids[known]] += 1
+    counts_after = race_counts + np.cumsum(increments, axis=0)
+    initial_k = np.take_along_axis(counts_after, player_ids, axis=1) <= INITIAL_K_RACES
+    num_known = participated.sum(axis=1)
+
+    k_factor_initial = np.asarray(k_factor_initial, dtype=np.float64)[..., None]
+    k_factor_after = np.asarray(k_factor_after, dtype=np.float64)[..., None]
+    unknown_player_elo = np.asarray(unknown_player_elo, dtype=np.float64)[..., None]
+    proportional_factors = np.asarray(proportional_factors, dtype=np.float64)
+    start_elo = np.asarray(start_elo, dtype=np.float64)
+    batch_shape = np.broadcast_shapes(k_factor_initial.shape[:-1], k_factor_after.shape[:-1],
+                                      unknown_player_elo.shape[:-1], proportional_factors.shape[:-1],
+                                      start_elo.shape[:-1])
+
+    ratings = np.broadcast_to(start_elo, batch_shape + start_elo.shape[-1:]).copy()
+    history = np.empty((num_races,) + ratings.shape)
+    for race in range(num_races):
+        if num_known[race]:
+            race_known = known[race]
+            ids = player_ids[race]
+            slot_elos = np.where(race_known, ratings[..., ids], unknown_player_elo)
+            k_factors = np.where(initial_k[race], k_factor_initial, k_factor_after)
+            slot_scales = np.where(race_known, proportional_factors[..., num_known[race], None] * k_factors, 0.0)
+            elo_changes = pairwise_elo_changes(slot_elos, slot_scales)
+            ratings[..., ids[race_known]] += elo_changes[..., race_known]
+        history[race] = ratings
+
+    race_counts += increments.sum(axis=0)
+    return history
+
+def initial_elo_state(default_players):
+    """Rating state before any race: everyone at BASE_ELO with no races."""
+    return {
+        "races_processed": 0,  # Rows of results.csv already applied
+        "current_elo": {player: BASE_ELO for player in default_players},
+        "race_counts": {player: 0 for player in default_players},  # Tracks the number of races per player
+        "peak_elo": {player: BASE_ELO for player in default_players},
+    }
+
+def elo_settings():
+    """Everything besides the results that affects the replay; a change forces a full replay."""
+    return {
+        "UNKNOWN_PLAYER_ELO": UNKNOWN_PLAYER_ELO,
+        "BASE_ELO": BASE_ELO,
+        "K_FACTOR_INITIAL": K_FACTOR_INITIAL,
+        "K_FACTOR_AFTER": K_FACTOR_AFTER,
+        "MAX_RACERS": MAX_RACERS,
+        "INITIAL_K_RACES": INITIAL_K_RACES,
+        "code": build_manifest.digest(*(inspect.getsource(function) for function in (
+            proportional_factor, _pow10, pairwise_elo_changes, race_tensor, replay_elo, replay_races))),
+    }
 
-    return elo_ratings
+def history_digest(store, num_races):
+    """Digest of what the Elo replay reads (races and placements) for the first num_races races of a RaceStore."""
+    races = store.races[results_store.RACE_COLUMNS].iloc[:num_races].astype(str).reset_index(drop=True)
+    entries = store.entries[store.entries["race_id"] < num_races][["race_id", "player_id", "placement"]]
+    return build_manifest.digest(races, entries.reset_index(drop=True))
 
+def load_elo_checkpoint(store, default_players):
+    """
+    Load the saved rating state if it is still valid for these results (a RaceStore of default_players).
+    Returns None (full replay) if the settings or players changed, already-processed rows
+    were edited, or elo_tracker.csv no longer matches what was written with the checkpoint.
+    """
+    if build_manifest.forced() or not os.path.exists(elo_checkpoint_file):
+        return None
+    try:
+        with open(elo_checkpoint_file, "r") as json_file:
+            checkpoint = json.load(json_file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable Elo checkpoint: {e}")
+        return None
+
+    if checkpoint.get("settings") != elo_settings():
+        print("Elo settings changed since the last run. Replaying all races.")
+        return None
+    if checkpoint.get("players") != default_players:
+        print("Players changed since the last run. Replaying all races.")
+        return None
+    state = checkpoint["state"]
+    if state["races_processed"] > store.num_races or \
+            checkpoint["history_digest"] != history_digest(store, state["races_processed"]):
+        print("Previously processed races were edited. Replaying all races.")
+        return None
+    if checkpoint["tracker_digest"] != build_manifest.file_digest(elo_tracker_file):
+        print(f"{elo_tracker_file} changed since the last run. Replaying all races.")
+        return None
+    return state
+
+def save_elo_checkpoint(state, store, default_players):
+    """Save the rating state after the last processed race, along with what it was computed from."""
+    checkpoint = {
+        "settings": elo_settings(),
+        "players": default_players,
+        "history_digest": history_digest(store, state["races_processed"]),
+        "tracker_digest": build_manifest.file_digest(elo_tracker_file),
+        "state": state,
+    }
+    os.makedirs(os.path.dirname(elo_checkpoint_file), exist_ok=True)
+    with open(elo_checkpoint_file, "w") as json_file:
+        json.dump(checkpoint, json_file, indent=4)
 
+def replay_races(results, default_players, state):
+    """
+    Apply the races in results (a RaceStore or wide results DataFrame) that come after
+    state["races_processed"], updating state in place.
+    :return: DataFrame of Elo tracker rows for the newly processed races.
+    """
+    store = results_store.as_store(results, default_players)
+    first_race = state["races_processed"]
+    slots, participated = race_tensor(store, default_players, first_race)
+
+    race_counts = np.array([state["race_counts"][player] for player in default_players], dtype=np.int64)
+    start_elo = np.array([state["current_elo"][player] for player in default_players], dtype=np.float64)
+    ratings = replay_elo(slots, race_counts, start_elo, participated)
+
+    # Races without known participants don't get a tracker row
+    has_row = participated.any(axis=1)
+    for column, player in enumerate(default_players):
+        state["race_counts"][player] = int(race_counts[column])
+        if has_row.any():
+            state["current_elo"][player] = float(ratings[has_row, column][-1])
+            state["peak_elo"][player] = max(state["peak_elo"][player], float(ratings[has_row, column].max()))
+    state["races_processed"] = store.num_races
+
+    # Build the tracker rows once
+    new_races = store.races[results_store.RACE_COLUMNS].iloc[first_race:]
+    elo_tracker = new_races[has_row].astype(str).reset_index(drop=True)
+    for column, player in enumerate(default_players):
+        elo_tracker[player] = ratings[has_row, column]
+    return elo_tracker
+
+def append_tracker_rows(tracker_file, rows):
+    """
+    Append rows to an existing Elo tracker CSV, ending them the way the file's lines already end
+    (a tracker written on Windows is CRLF), so the file never mixes line endings.
+    """
+    lineterminator = atomic_file.line_terminator(tracker_file)
+    with open(tracker_file, "a", newline="") as file:
+        file.write(rows.to_csv(index=False, header=False, lineterminator=lineterminator))
 
-def process_races():
-    """Process all races in results.csv and update Elo ratings in elo_tracker.csv."""
-    # Load results
-    results = load_csv(results_file)
+def process_races(results=None, graph_jobs=1):
+    """
+    Update Elo ratings in elo_tracker.csv for the races in results.csv.
+    Resumes from the saved checkpoint when only new races were appended; otherwise replays everything.
+    :param graph_jobs: Worker processes for rendering the Elo graphs.
+    """
+    # Load results (parsed once and cached)
+    if results is None:
+        results = results_store.load_results(results_file)
     players = load_csv(players_file, default_columns=["Player Name"])
     maps = load_csv(maps_file, default_columns=["Map Name"])
     default_players = players["Player Name"].tolist()
     map_list = maps["Map Name"].tolist()
+    store = results_store.as_store(results, default_players)
 
-    # Clear and initialize the elo_tracker
-    columns = ["Date", "Time", "Map Name"] + default_players
-    elo_tracker = pd.DataFrame(columns=columns)
-    elo_tracker.to_csv(elo_tracker_file, index=False)  # Save the cleared file
-
-    # Initialize Elo ratings with BASE_ELO and race counts
-    current_elo = {player: BASE_ELO for player in default_players}
-    race_counts = {player: 0 for player in default_players}  # Tracks the number of races per player
-    peak_elo = {player: BASE_ELO for player in default_players}
-
-    # Process each race
-    for _, race in results.iterrows():
-        race_date = race["Date"]
-        race_time = race["Time"]
-        map_name = race["Map Name"]
-
-        # Extract race participants and their placements
-        race_results = []
-        for player in default_players:
-            placement_col = f"{player} Placement"
-            if placement_col in race and race[placement_col] != "DNR":
-                race_results.append({"Player": player, "Placement": int(race[placement_col])})
-                race_counts[player] += 1  # Increment race count
-
-        if not race_results:  # Skip if no participants
-            continue
-
-        # Update Elo ratings based on this race
-        race_results_df = pd.DataFrame(race_results)
-        current_elo = update_elo_ratings(current_elo, race_results_df, race_counts)
+    # Resume from the last checkpoint, or start over with BASE_ELO and no races
+    state = load_elo_checkpoint(store, default_players)
+    resumed = state is not None
+    if resumed:
+        print(f"Resuming Elo from race {state['races_processed']} of {store.num_races}.")
+    else:
+        state = initial_elo_state(default_players)
 
-        # Update peak Elo for each player
-        for player in default_players:
-            peak_elo[player] = max(peak_elo[player], current_elo[player])
+    new_rows = replay_races(store, default_players, state)
+    current_elo = state["current_elo"]
+    peak_elo = state["peak_elo"]
 
-        # Create a new row for this race in the Elo tracker
-        new_row = {
-            "Date": race_date,
-            "Time": race_time,
-            "Map Name": map_name,
-            **{player: current_elo[player] for player in default_players}
-        }
-        if elo_tracker.empty:
-            elo_tracker = pd.DataFrame([new_row])
+    if resumed:
+        # Append only the new races to the Elo tracker
+        if not new_rows.empty:
+            append_tracker_rows(elo_tracker_file, new_rows)
+            print(f"Appended {len(new_rows)} race(s) to {elo_tracker_file}")
         else:
-            elo_tracker = pd.concat([elo_tracker, pd.DataFrame([new_row])], ignore_index=True)
+            print(f"{elo_tracker_file} is already up to date.")
+        save_elo_checkpoint(state, store, default_players)
+        elo_tracker = None  # Only the new rows are in memory; the graphs read the whole tracker from disk
+    else:
+        elo_tracker = new_rows
 
-    # Save updated Elo tracker
-    elo_tracker.to_csv(elo_tracker_file, index=False)
-    print(f"Elo tracker updated and saved to {elo_tracker_file}")
+        # Save updated Elo tracker (skipped if nothing changed)
+        if build_manifest.write_text_if_changed(elo_tracker_file, elo_tracker.to_csv(index=False, lineterminator="\n")):
+            print(f"Elo tracker updated and saved to {elo_tracker_file}")
+        else:
+            print(f"{elo_tracker_file} is already up to date.")
+        save_elo_checkpoint(state, store, default_players)
 
     # Generate Elo graphs
-    generate_elo_graphs(default_players)
+    generate_elo_graphs(default_players, store, elo_tracker, jobs=graph_jobs)
 
     # Generate Elo post-analysis JSON
+    kart_usage = process_kart_usage(store, default_players)
     elo_post_analysis = {
         "Player Ratings": {
             player: {
                 "Peak Rating": round(peak_elo[player]),
                 "Current Rating": round(current_elo[player]),
-                "Kart Usage": process_kart_usage(player, results)  # Add kart usage stats here
+                "Kart Usage": kart_usage[player]
             }
             for player in default_players
         }
@@ -257,38 +397,116 @@ def process_races():
 
     # Save Elo post-analysis to JSON file
     elo_post_analysis_file = os.path.join(base_dir, "output/elo_post_analysis.json")
-    with open(elo_post_analysis_file, "w") as json_file:
-        json.dump(elo_post_analysis, json_file, indent=4)
-    print(f"Elo post-analysis saved to {elo_post_analysis_file}")
+    if build_manifest.write_text_if_changed(elo_post_analysis_file, json.dumps(elo_post_analysis, indent=4)):
+        print(f"Elo post-analysis saved to {elo_post_analysis_file}")
+    else:
+        print(f"{elo_post_analysis_file} is already up to date.")
+
+
+
+# Matplotlib's default margins, restored before each graph is laid out
+DEFAULT_SUBPLOT_PARAMS = {side: matplotlib.rcParams[f"figure.subplot.{side}"]
+                          for side in ("left", "bottom", "right", "top", "wspace", "hspace")}
+
+# The Elo graph figure of this process, created on first use and reused for every player
+_elo_figure = None
+
+def _get_elo_figure():
+    """Build the figure, artists and labels shared by every Elo graph once per process."""
+    global _elo_figure
+    if _elo_figure is None:
+        figure = Figure(figsize=(8, 5))  # Adjusted size for smaller graph
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.xaxis_date()
+
+        # Plot all Elo points for the player in blue triangles
+        all_races, = axes.plot([], [], marker="^", linestyle="--", color="blue", label="All Races")
+
+        # Highlight the last Elo point of each day in red
+        end_of_day = axes.scatter([], [], color="red", label="End of Day Rating", zorder=5)
+
+        # Add a red dotted line connecting the end-of-day ratings
+        progression, = axes.plot([], [], linestyle=":", color="red", linewidth=2, label="Day-to-Day Progression")
 
+        title = axes.set_title("", fontsize=14, fontweight='bold', color='black')
+        axes.set_xlabel("Date", fontsize=12, fontweight='bold', color='black')
+        axes.set_ylabel("Elo Rating", fontsize=12, fontweight='bold', color='black')
+        axes.tick_params(axis="x", labelrotation=45, labelsize=10, labelcolor='black')
+        axes.tick_params(axis="y", labelsize=10, labelcolor='black')
+        axes.grid(True, linestyle="--", alpha=0.7)
+        axes.legend(loc="best")
 
+        _elo_figure = {"figure": figure, "axes": axes, "title": title, "all_races": all_races,
+                       "end_of_day": end_of_day, "progression": progression}
+    return _elo_figure
 
-def generate_elo_graphs(default_players):
-    """Generate Elo progression graphs for each player, with the most recent 5 race days."""
+def render_elo_graph(player, graph_path, all_dates, all_elos, last_dates, last_elos):
+    """
+    Draw one player's Elo graph on this process's shared figure and save it.
+    :return: Seconds spent rendering.
+    """
+    start = time.perf_counter()
+    graph = _get_elo_figure()
+    all_x = mdates.date2num(all_dates)
+    last_x = mdates.date2num(last_dates)
+
+    graph["all_races"].set_data(all_x, all_elos)
+    graph["end_of_day"].set_offsets(np.column_stack([last_x, last_elos]))
+    graph["progression"].set_data(last_x, last_elos)
+    graph["title"].set_text(f"Elo Progression: {player}")
+
+    axes = graph["axes"]
+    axes.relim()
+    axes.autoscale_view()
+
+    # Lay out from the default margins, not the previous player's, so every graph comes out the same as on a fresh figure
+    graph["figure"].subplots_adjust(**DEFAULT_SUBPLOT_PARAMS)
+    graph["figure"].tight_layout()
+
+    # Save the graph to player_graphs directory
+    graph["figure"].savefig(graph_path, dpi=150)  # High-resolution graph
+    return time.perf_counter() - start
+
+def generate_elo_graphs(default_players, results=None, elo_tracker=None, jobs=1):
+    """
+    Generate Elo progression graphs for each player, with the most recent 5 race days.
+    :param elo_tracker: The Elo tracker DataFrame; read from elo_tracker.csv if not given.
+    :param jobs: Worker processes to render graphs in (1 renders in this process).
+    """
     # Load elo_tracker and results
-    elo_tracker = load_csv(elo_tracker_file)
-    results = load_csv(results_file)
+    if elo_tracker is None:
+        elo_tracker = pd.read_csv(elo_tracker_file, float_precision="round_trip") if os.path.exists(elo_tracker_file) else pd.DataFrame()
+    if results is None:
+        results = results_store.load_results(results_file)
+    elo_tracker = elo_tracker.copy()
+    store = results_store.as_store(results, default_players)
+    player_ids = store.entries["player_id"].to_numpy()
+    race_ids = store.entries["race_id"].to_numpy()
 
     # Ensure Date columns are treated as datetime objects
     elo_tracker["Date"] = pd.to_datetime(elo_tracker["Date"])
-    results["Date"] = pd.to_datetime(results["Date"])
+    race_dates = pd.to_datetime(store.races["Date"]).to_numpy()
 
-    for player in default_players:
+    # Graphs are only re-rendered when their data (or this script) changed
+    manifest = build_manifest.load_manifest("elo_graphs")
+    code_digest = build_manifest.file_digest(__file__)
+    renders = []
+
+    for player_id, player in enumerate(default_players):
         # Skip if player column is not in the tracker
         if player not in elo_tracker.columns:
             continue
 
         # Determine the player's participation days
-        player_column = f"{player} Placement"
-        valid_results = results.dropna(subset=[player_column])  # Drop rows where player did not participate
-        valid_results = valid_results[valid_results[player_column] != "DNR"]  # Exclude "DNR"
+        player_races = race_ids[player_ids == player_id]
 
-        if valid_results.empty:
+        if not len(player_races):
             # Skip graph generation if the player never participated
             continue
 
         # Get the participation dates
-        participation_dates = valid_results["Date"].unique()
+        participation_dates = np.unique(race_dates[player_races])
 
         # Filter Elo tracker for the player's participation days only
         player_elo = elo_tracker[elo_tracker["Date"].isin(participation_dates)][["Date", player]]
@@ -312,37 +530,31 @@ def generate_elo_graphs(default_players):
             last_dates.append(group["Date"].iloc[-1])  # Last entry for the day
             last_elos.append(group[player].iloc[-1])  # Last Elo for the day
 
-        # Generate Elo graph for the player
-        plt.figure(figsize=(8, 5))  # Adjusted size for smaller graph
+        graph_path = os.path.join(player_graphs_dir, f"{player}_elo_progression.png")
+        graph_digest = build_manifest.digest(code_digest, player, all_dates, all_elos, last_dates, last_elos)
+        if not build_manifest.needs_build(manifest, graph_path, graph_digest):
+            print(f"Elo graph for {player} is up to date")
+            continue
+        renders.append((graph_digest, (player, graph_path, all_dates, all_elos, last_dates, last_elos)))
 
-        # Plot all Elo points for the player in blue triangles
-        plt.plot(all_dates, all_elos, marker="^", linestyle="--", color="blue", label="All Races")
+    # Render the out-of-date graphs, fanned out over worker processes when there are several
+    if jobs > 1 and len(renders) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(renders))) as executor:
+            futures = [executor.submit(render_elo_graph, *render_args) for _, render_args in renders]
+            render_times = [future.result() for future in futures]
+    else:
+        render_times = [render_elo_graph(*render_args) for _, render_args in renders]
 
-        # Highlight the last Elo point of each day in red
-        plt.scatter(last_dates, last_elos, color="red", label="End of Day Rating", zorder=5)
+    for (graph_digest, (player, graph_path, *_)), seconds in zip(renders, render_times):
+        build_manifest.record(manifest, graph_path, graph_digest)
+        print(f"Saved Elo graph for {player} at {graph_path} ({seconds:.2f}s)")
 
-        # Add a red dotted line connecting the end-of-day ratings
-        plt.plot(last_dates, last_elos, linestyle=":", color="red", linewidth=2, label="Day-to-Day Progression")
-
-        plt.title(f"Elo Progression: {player}", fontsize=14, fontweight='bold', color='black')
-        plt.xlabel("Date", fontsize=12, fontweight='bold', color='black')
-        plt.ylabel("Elo Rating", fontsize=12, fontweight='bold', color='black')
-        plt.xticks(rotation=45, fontsize=10, color='black')
-        plt.yticks(fontsize=10, color='black')
-        plt.grid(True, linestyle="--", alpha=0.7)
-        plt.legend(loc="best")
-        plt.tight_layout()
-
-        # Save the graph to player_graphs directory
-        graph_path = os.path.join(player_graphs_dir, f"{player}_elo_progression.png")
-        plt.savefig(graph_path, dpi=150)  # High-resolution graph
-        plt.close()
-        print(f"Saved Elo graph for {player} at {graph_path}")
+    build_manifest.save_manifest("elo_graphs", manifest)
 
 
 
-def main():
-    process_races()
+def main(results=None, graph_jobs=1):
+    process_races(results, graph_jobs)
 
 if __name__ == "__main__":
-    main()
+    main(graph_jobs=os.cpu_count() or 1)
@@ -0,0 +1,158 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import results_store
+import elo_analysis
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+players_file = os.path.join(base_dir, "data/players.csv")
+sweep_report_file = os.path.join(base_dir, "output/elo_sweep.csv")
+
+# Proportional factor ladders to try, indexed by number of known players (see elo_analysis.proportional_factor)
+LADDERS = {
+    "current": elo_analysis.PROPORTIONAL_FACTORS,
+    "flat": np.ones(elo_analysis.MAX_RACERS + 1),
+    "linear": np.arange(elo_analysis.MAX_RACERS + 1) / elo_analysis.MAX_RACERS,
+}
+
+# Parameter sets replayed together in one worker task
+CHUNK_SIZE = 64
+
+def load_races(results=None):
+    """Load results and encode them for elo_analysis.replay_elo()."""
+    if results is None:
+        results = results_store.load_results(results_file)
+    players = elo_analysis.load_csv(players_file, default_columns=["Player Name"])
+    default_players = players["Player Name"].tolist()
+    slots, participated = elo_analysis.race_tensor(results, default_players)
+    return slots, participated, default_players
+
+def finishing_pairs(slots):
+    """
+    Every (winner, loser) pair of known players in every race.
+    :return: (race, winner, loser) int arrays, one entry per pair.
+    """
+    races, winners, losers = [], [], []
+    for ahead, behind in itertools.combinations(range(slots.shape[1]), 2):
+        both_known = (slots[:, ahead] >= 0) & (slots[:, behind] >= 0)
+        races.append(np.flatnonzero(both_known))
+        winners.append(slots[both_known, ahead])
+        losers.append(slots[both_known, behind])
+    return np.concatenate(races), np.concatenate(winners).astype(np.intp), np.concatenate(losers).astype(np.intp)
+
+def score_parameter_sets(slots, participated, parameter_sets, burn_in=0):
+    """
+    Replay history once for a batch of parameter sets and score each by how well the ratings
+    before every race predict that race's pairwise finishing order.
+    :param parameter_sets: List of dicts with k_factor_initial, k_factor_after, unknown_player_elo, ladder.
+    :param burn_in: Number of leading races that are replayed but not scored.
+    :return: List of dicts with the parameters, log_loss, accuracy and pairs scored.
+    """
+    num_players = participated.shape[1]
+    ratings = elo_analysis.replay_elo(
+        slots, np.zeros(num_players, dtype=np.int64), np.full(num_players, elo_analysis.BASE_ELO, dtype=np.float64),
+        participated,
+        k_factor_initial=np.array([params["k_factor_initial"] for params in parameter_sets]),
+        k_factor_after=np.array([params["k_factor_after"] for params in parameter_sets]),
+        unknown_player_elo=np.array([params["unknown_player_elo"] for params in parameter_sets]),
+        proportional_factors=np.array([LADDERS[params["ladder"]] for params in parameter_sets]),
+    )
+
+    # Ratings going into each race: the previous race's result, or BASE_ELO for the first
+    before = np.concatenate([np.full((1,) + ratings.shape[1:], elo_analysis.BASE_ELO, dtype=np.float64), ratings[:-1]])
+
+    races, winners, losers = finishing_pairs(slots)
+    scored = races >= burn_in
+    races, winners, losers = races[scored], winners[scored], losers[scored]
+
+    # (pairs x parameter sets) probability the actual winner was given
+    winner_elo = before[races, :, winners]
+    loser_elo = before[races, :, losers]
+    predicted = 1 / (1 + np.power(10.0, (loser_elo - winner_elo) / 400))
+    log_loss = -np.log(np.clip(predicted, 1e-15, 1)).mean(axis=0) if len(races) else np.full(len(parameter_sets), np.nan)
+    # Pairs between equally rated players count as half right
+    accuracy = ((predicted > 0.5) + 0.5 * (predicted == 0.5)).mean(axis=0) if len(races) else np.full(len(parameter_sets), np.nan)
+
+    return [
+        {**params, "log_loss": float(log_loss[index]), "accuracy": float(accuracy[index]), "pairs": len(races)}
+        for index, params in enumerate(parameter_sets)
+    ]
+
+def parameter_grid(k_factors_initial, k_factors_after, unknown_player_elos, ladders):
+    """Every combination of the given settings as a list of parameter dicts."""
+    return [
+        {"k_factor_initial": k_initial, "k_factor_after": k_after, "unknown_player_elo": unknown_elo, "ladder": ladder}
+        for k_initial, k_after, unknown_elo, ladder in itertools.product(
+            k_factors_initial, k_factors_after, unknown_player_elos, ladders)
+    ]
+
+def run_sweep(parameter_sets, results=None, jobs=1, burn_in=0):
+    """
+    Score every parameter set, spreading chunks of the grid over a process pool.
+    :return: DataFrame of parameter sets ranked by log loss (best first).
+    """
+    slots, participated, _ = load_races(results)
+    chunks = [parameter_sets[start:start + CHUNK_SIZE] for start in range(0, len(parameter_sets), CHUNK_SIZE)]
+
+    if jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(score_parameter_sets, slots, participated, chunk, burn_in) for chunk in chunks]
+            scores = [score for future in futures for score in future.result()]
+    else:
+        scores = [score for chunk in chunks for score in score_parameter_sets(slots, participated, chunk, burn_in)]
+
+    report = pd.DataFrame(scores)
+    report["current"] = (
+        (report["k_factor_initial"] == elo_analysis.K_FACTOR_INITIAL)
+        & (report["k_factor_after"] == elo_analysis.K_FACTOR_AFTER)
+        & (report["unknown_player_elo"] == elo_analysis.UNKNOWN_PLAYER_ELO)
+        & (report["ladder"] == "current")
+    )
+    report = report.sort_values(["log_loss", "accuracy"], ascending=[True, False], kind="stable", ignore_index=True)
+    report.insert(0, "rank", np.arange(1, len(report) + 1))
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep Elo settings and rank them by next-race pairwise log loss.")
+    parser.add_argument("--k-initial", type=float, nargs="+", default=[16, 24, 32, 40],
+                        help="K_FACTOR_INITIAL values to try.")
+    parser.add_argument("--k-after", type=float, nargs="+", default=[4, 8, 12, 16],
+                        help="K_FACTOR_AFTER values to try.")
+    parser.add_argument("--unknown-elo", type=float, nargs="+", default=[1000, 1500, 2000],
+                        help="UNKNOWN_PLAYER_ELO values to try.")
+    parser.add_argument("--ladders", nargs="+", choices=list(LADDERS), default=list(LADDERS),
+                        help="Proportional factor ladders to try.")
+    parser.add_argument("--burn-in", type=int, default=0, help="Leading races to replay without scoring.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count, 1 = sequential).")
+    parser.add_argument("--top", type=int, default=10, help="Rows of the ranked report to print.")
+    parser.add_argument("--output", default=sweep_report_file, help="Where to write the full ranked report (CSV).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    parameter_sets = parameter_grid(args.k_initial, args.k_after, args.unknown_elo, args.ladders)
+
+    start = time.perf_counter()
+    report = run_sweep(parameter_sets, jobs=args.jobs, burn_in=args.burn_in)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    report.to_csv(args.output, index=False)
+
+    print(f"Scored {len(report)} parameter sets on {report['pairs'].iloc[0]} pairs in {elapsed:.1f}s.")
+    print(report.head(args.top).to_string(index=False))
+    current = report[report["current"]]
+    if not current.empty and current.index[0] >= args.top:
+        print("Current settings:")
+        print(current.to_string(index=False))
+    print(f"Full report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+import results_store
+import racetime
+
+# Races stacked into one matrix product at a time (bounds memory to CHUNK_RACES x players^2)
+CHUNK_RACES = 4096
+
+# Per-pair totals, in the order they are stacked (see pairwise_totals)
+TOTALS = ["Races", "Wins", "Placement Delta", "Timed Races", "Time Delta ms"]
+
+def race_matrices(df, player_names):
+    """
+    (races x players) matrices for results given as a RaceStore or a wide results DataFrame.
+    :return: (placements, racetime_ms): placements are 0 where the player didn't finish,
+             racetime_ms is racetime.MISSING where there is no readable time.
+    """
+    store = results_store.as_store(df, player_names)
+    entries = store.entries
+    race_ids = entries["race_id"].to_numpy()
+    player_ids = entries["player_id"].to_numpy()
+
+    placements = np.zeros((store.num_races, len(player_names)), dtype=np.int64)
+    placements[race_ids, player_ids] = entries["placement"].to_numpy(dtype=np.int64)
+    racetime_ms = np.full(placements.shape, racetime.MISSING, dtype=np.int64)
+    racetime_ms[race_ids, player_ids] = entries["racetime_ms"].to_numpy(dtype=np.int64)
+    return placements, racetime_ms
+
+def pairwise_totals(placements, racetime_ms, group_codes, num_groups):
+    """
+    Sum every pair's head-to-head counts per group of races (e.g. per map) in one pass.
+    For each race the (players x players) matrices of TOTALS are built by broadcasting, then all
+    races are summed into their group with a single one-hot matrix product per chunk.
+    :param group_codes: Group of each race (0..num_groups-1); -1 leaves a race out.
+    :return: int64 array (num_groups, len(TOTALS), players, players); [g, k, i, j] is total k of
+             player i against player j, e.g. Wins[i, j] races where i finished ahead of j.
+    """
+    num_races, num_players = placements.shape
+    totals = np.zeros((num_groups, len(TOTALS) * num_players * num_players))
+    for start in range(0, num_races, CHUNK_RACES):
+        chunk = slice(start, start + CHUNK_RACES)
+        placement, ms = placements[chunk], racetime_ms[chunk]
+        finished = placement > 0
+        timed = finished & (ms != racetime.MISSING)
+
+        both = finished[:, :, None] & finished[:, None, :]
+        both_timed = timed[:, :, None] & timed[:, None, :]
+        placement_delta = placement[:, :, None] - placement[:, None, :]
+        time_delta = ms[:, :, None] - ms[:, None, :]
+        per_race = np.stack([
+            both,
+            both & (placement_delta < 0),
+            np.where(both, placement_delta, 0),
+            both_timed,
+            np.where(both_timed, time_delta, 0),
+        ], axis=1).reshape(len(placement), -1).astype(np.float64)
+
+        codes = group_codes[chunk]
+        one_hot = (codes[:, None] == np.arange(num_groups)).astype(np.float64)
+        totals += one_hot.T @ per_race
+
+    # Sums of integers well below 2**53, so the float products are exact
+    return np.rint(totals).astype(np.int64).reshape(num_groups, len(TOTALS), num_players, num_players)
+
+def _pair_stats(totals, i, j):
+    """JSON stats of player i against player j from one group's TOTALS."""
+    races, wins, placement_delta, timed_races, time_delta_ms = (int(total[i, j]) for total in totals)
+    return {
+        "Races": races,
+        "Wins": wins,
+        "Losses": int(totals[1][j, i]),
+        "Avg Placement Delta": round(placement_delta / races, 2),
+        "Avg Time Delta": round(time_delta_ms / timed_races / 1000, 2) if timed_races else None,
+    }
+
+def _stats_by_player(totals, player_names):
+    """{player: {opponent: stats}} for every pair that finished a race together."""
+    stats = {}
+    races = totals[0]
+    for i, player in enumerate(player_names):
+        opponents = {
+            opponent: _pair_stats(totals, i, j)
+            for j, opponent in enumerate(player_names) if j != i and races[i, j]
+        }
+        if opponents:
+            stats[player] = opponents
+    return stats
+
+def calculate_head_to_head(df, players, maps):
+    """
+    Every player's record against every other player, overall and per map. Deltas are the
+    player's placement/time minus the opponent's, so negative means the player usually finished
+    ahead; times are in seconds and only count races where both times were logged.
+    """
+    player_names = players["Player Name"].tolist()
+    map_names = maps["Map Name"].tolist()
+    store = results_store.as_store(df, player_names)
+    placements, racetime_ms = race_matrices(store, player_names)
+
+    # Group races by map (maps.csv order); races on unlisted maps only count towards Overall
+    map_codes = pd.Categorical(store.races["Map Name"].astype(str), categories=map_names).codes.astype(np.int64)
+    map_codes = np.where(map_codes < 0, len(map_names), map_codes)
+    totals = pairwise_totals(placements, racetime_ms, map_codes, len(map_names) + 1)
+
+    by_map = {}
+    for map_index, map_name in enumerate(map_names):
+        map_stats = _stats_by_player(totals[map_index], player_names)
+        if map_stats:
+            by_map[map_name] = map_stats
+
+    return {
+        "Overall": _stats_by_player(totals.sum(axis=0), player_names),
+        "By Map": by_map,
+    }
@@ -4,7 +4,11 @@ import json
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-from itertools import combinations
+import results_store
+import kart_stats
+import plackett_luce
+import racetime
+import build_manifest
 
 # Base directory and file paths
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -25,10 +29,39 @@ def load_csv(file_path, default_columns=None):
             return pd.DataFrame()
     return pd.read_csv(file_path)
 
-def generate_kart_racetime_box_plots():
+def kart_racetimes(results, maps_list, karts_list):
+    """
+    Race times in seconds for each listed kart on each map: {map: {kart: [seconds]}}.
+    Times are listed race by race, then in header player order.
+    """
+    store = results_store.as_store(results)
+    entries = store.entries.sort_values(["race_id", "player_id"], kind="stable")
+
+    # Skip entries without a kart from the kart list
+    kart_index = pd.Index(karts_list).get_indexer(store.karts)
+    kart_ids = entries["kart_id"].to_numpy()
+    karts = np.where(kart_ids == results_store.MISSING_ID, -1, kart_index[kart_ids])
+    racetime_ms = entries["racetime_ms"].to_numpy()
+    map_names = store.races["Map Name"].astype(str).to_numpy()[entries["race_id"].to_numpy()]
+
+    kart_times_by_map = {}
+    for map_name in maps_list:
+        kart_times = {kart: [] for kart in karts_list}
+        on_map = (map_names == map_name) & (karts >= 0)
+        unreadable = on_map & (racetime_ms == racetime.MISSING)
+        if unreadable.any():
+            print(f"Skipping {unreadable.sum()} unreadable race times on {map_name}")
+        on_map &= ~unreadable
+        for kart, kart_time_in_seconds in zip(karts[on_map], racetime.to_seconds(racetime_ms[on_map])):
+            kart_times[karts_list[kart]].append(kart_time_in_seconds)
+        kart_times_by_map[map_name] = kart_times
+    return kart_times_by_map
+
+def generate_kart_racetime_box_plots(results=None):
     """Generate box plots of kart race times for each map."""
     # Load necessary data
-    results = load_csv(results_file)
+    if results is None:
+        results = results_store.load_results(results_file)
     maps_data = load_csv(maps_file)
     karts_data = load_csv(karts_file)
     
@@ -40,35 +73,16 @@ def generate_kart_racetime_box_plots():
     kart_graphs_dir = os.path.join(base_dir, "output/kart_graphs")
     os.makedirs(kart_graphs_dir, exist_ok=True)
 
-    # Iterate through each map
-    for map_name in maps_list:
-        # Filter results for the current map
-        map_results = results[results["Map Name"] == map_name]
-        
-        # Initialize a dictionary to hold kart race times
-        kart_times = {kart: [] for kart in karts_list}
+    # Plots are only re-rendered when their data (or this script) changed
+    manifest = build_manifest.load_manifest("kart_graphs")
+    code_digest = build_manifest.file_digest(__file__)
 
-        # Parse race times for each kart
-        for _, race in map_results.iterrows():
-            for i in range(3, len(race), 3):  # Iterate over Placement, Kart, Racetime columns
-                kart_col = race.index[i + 1]  # Kart column
-                time_col = race.index[i + 2]  # Racetime column
-                
-                kart_name = race[kart_col]
-                racetime = race[time_col]
+    # Race times for every map, parsed in one pass
+    kart_times_by_map = kart_racetimes(results, maps_list, karts_list)
 
-                # Skip if the player didn't race or if the kart isn't in the kart list
-                if kart_name == "DNR" or racetime == "DNR" or kart_name not in karts_list:
-                    continue
-
-                try:
-                    # Convert time string (e.g., "2:58.18") to seconds
-                    time_parts = racetime.split(":")
-                    kart_time_in_seconds = float(time_parts[0]) * 60 + float(time_parts[1])
-                    kart_times[kart_name].append(kart_time_in_seconds)
-                except Exception as e:
-                    print(f"Error parsing time for kart {kart_name} in race: {race}")
-                    continue
+    # Iterate through each map
+    for map_name in maps_list:
+        kart_times = kart_times_by_map[map_name]
 
         # Prepare data for plotting
         plot_data = []
@@ -99,6 +113,11 @@ def generate_kart_racetime_box_plots():
         )
         plot_df["Kart"] = plot_df["Kart"].map(lambda kart: f"{kart} ({kart_counts[kart]})")
 
+        graph_path = os.path.join(kart_graphs_dir, f"{map_name}_kart_racetimes.png")
+        graph_digest = build_manifest.digest(code_digest, map_name, plot_df, kart_order)
+        if not build_manifest.needs_build(manifest, graph_path, graph_digest):
+            print(f"Kart performance box plot for {map_name} is up to date")
+            continue
 
         # Create a box plot with the sorted kart order
         plt.figure(figsize=(12, 8))
@@ -115,17 +134,71 @@ def generate_kart_racetime_box_plots():
         plt.grid(axis='x', linestyle='--', alpha=0.7)
 
         # Save the plot to the kart_graphs directory
-        graph_path = os.path.join(kart_graphs_dir, f"{map_name}_kart_racetimes.png")
         plt.tight_layout()
         plt.savefig(graph_path, dpi=150)
         plt.close()
+        build_manifest.record(manifest, graph_path, graph_digest)
         print(f"Saved kart performance box plot for {map_name} at {graph_path}")
 
-
-def generate_kart_pairwise_comparisons():
-    """Generate pairwise kart performance comparisons for each map and save as JSON."""
+    build_manifest.save_manifest("kart_graphs", manifest)
+
+
+def kart_pairwise_counts(results, maps_list, karts_list):
+    """
+    Count kart-vs-kart results for every map from every pair of players in the same race.
+    Pairs are generated per race from the long-format entries and scatter-added into
+    (maps x karts x karts) matrices, so the cost scales with the pairs actually raced.
+    :return: (wins, met) int32 arrays: wins[m, a, b] is how often a player in kart a finished ahead
+             of a player in kart b on map m; met[m, a, b] counts the ordered pairs of players in karts
+             a and b (nonzero iff the two karts ever raced each other there).
+    """
+    num_maps, num_karts = len(maps_list), len(karts_list)
+    store = results_store.as_store(results)
+    entries = store.entries
+
+    # Only entries with a listed kart on a listed map count
+    kart_index = pd.Index(karts_list).get_indexer(store.karts)
+    map_index = pd.Index(maps_list).get_indexer(store.races["Map Name"].astype(str))
+    kart_ids = entries["kart_id"].to_numpy()
+    race_ids = entries["race_id"].to_numpy()
+    karts = np.where(kart_ids == results_store.MISSING_ID, -1, kart_index[kart_ids])
+    maps = map_index[race_ids]
+    counted = (karts >= 0) & (maps >= 0)
+    race_ids, karts, maps = race_ids[counted], karts[counted], maps[counted]
+    placements = entries["placement"].to_numpy()[counted]
+
+    # Every ordered pair of players in the same race (entries are sorted by race)
+    left, right = results_store.entry_pairs(race_ids)
+
+    # Scatter-add each pair into its (map, kart a, kart b) cell
+    cells = (maps[left] * num_karts + karts[left]) * num_karts + karts[right]
+    size = num_maps * num_karts * num_karts
+    met = np.bincount(cells, minlength=size).astype(np.int32).reshape(num_maps, num_karts, num_karts)
+    ahead = placements[left] < placements[right]
+    wins = np.bincount(cells[ahead], minlength=size).astype(np.int32).reshape(num_maps, num_karts, num_karts)
+    return wins, met
+
+def kart_comparison_json(wins, met, maps_list, karts_list):
+    """{map: {kart a: {kart b: wins of a over b, or "DNR" if they never raced each other}}}."""
+    return {
+        map_name: {
+            kart_a: {
+                kart_b: int(wins[map_index, a, b]) if met[map_index, a, b] else "DNR"
+                for b, kart_b in enumerate(karts_list)
+            }
+            for a, kart_a in enumerate(karts_list)
+        }
+        for map_index, map_name in enumerate(maps_list)
+    }
+
+def generate_kart_pairwise_comparisons(results=None):
+    """
+    Generate pairwise kart performance comparisons for each map and save as JSON.
+    :return: (wins, met) count matrices (see kart_pairwise_counts), for the heatmaps.
+    """
     # Load data
-    results = load_csv(results_file)
+    if results is None:
+        results = results_store.load_results(results_file)
     maps_data = load_csv(maps_file)
     karts_data = load_csv(karts_file)
 
@@ -133,92 +206,61 @@ def generate_kart_pairwise_comparisons():
     karts_list = karts_data["Kart Name"].tolist()
     maps_list = maps_data["Map Name"].tolist()
 
-    # Initialize output dictionary
-    kart_comparison_data = {}
+    # Count every map at once, then emit JSON
+    wins, met = kart_pairwise_counts(results, maps_list, karts_list)
+    kart_comparison_data = kart_comparison_json(wins, met, maps_list, karts_list)
+
+    # Save to JSON file (skipped if nothing changed)
+    if build_manifest.write_text_if_changed(output_file, json.dumps(kart_comparison_data, indent=4)):
+        print(f"Kart pairwise performance analysis saved to {output_file}")
+    else:
+        print(f"{output_file} is already up to date.")
+
+    return wins, met
+
+
+def kart_win_rates(wins, met):
+    """
+    Win rate (0-100) of kart a against kart b on each map: wins / (wins + wins.T).
+    NaN where the karts never raced each other or no race between them had a winner.
+    """
+    totals = wins + np.swapaxes(wins, -1, -2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rates = (wins / totals) * 100
+    return np.where((met > 0) & (totals > 0), win_rates, np.nan)
+
+def generate_kart_win_rate_heatmaps(results=None, counts=None):
+    """
+    Generate heatmaps of kart win rates for each map based on pairwise comparisons.
+    :param counts: (wins, met) from generate_kart_pairwise_comparisons(); counted from results if omitted.
+    """
+    maps_list = load_csv(maps_file)["Map Name"].tolist()
+    karts_list = load_csv(karts_file)["Kart Name"].tolist()
+    if counts is None:
+        if results is None:
+            results = results_store.load_results(results_file)
+        counts = kart_pairwise_counts(results, maps_list, karts_list)
+    win_rates = kart_win_rates(*counts)
 
-    # Iterate through each map
-    for map_name in maps_list:
-        # Filter results for the current map
-        map_results = results[results["Map Name"] == map_name]
-
-        # Initialize adjacency list for kart comparisons
-        kart_wins = {kart: {other_kart: "DNR" for other_kart in karts_list} for kart in karts_list}
-
-        # Process each race
-        for _, race in map_results.iterrows():
-            # Collect all kart placements for this race
-            kart_placements = []
-            for i in range(3, len(race), 3):  # Placement, Kart, Racetime columns
-                kart_col = race.index[i + 1]  # Kart column
-                placement_col = race.index[i]  # Placement column
-                kart_name = race[kart_col]
-                placement = race[placement_col]
-
-                if kart_name != "DNR" and placement != "DNR":
-                    kart_placements.append((kart_name, int(placement)))
-
-            # Only consider races with 2 or more karts
-            if len(kart_placements) < 2:
-                continue
-
-            # Compare pairwise karts: every combination of kart placements
-            for (kart_a, placement_a), (kart_b, placement_b) in combinations(kart_placements, 2):
-                #print(kart_a, placement_a) for testing
-                #print(kart_b, placement_b) for testing
-                # Initialize wins if they don't exist
-                if kart_wins[kart_a][kart_b] == "DNR":
-                    kart_wins[kart_a][kart_b] = 0
-                if kart_wins[kart_b][kart_a] == "DNR":
-                    kart_wins[kart_b][kart_a] = 0
-
-                # Update wins based on placement
-                if placement_a < placement_b:
-                    kart_wins[kart_a][kart_b] += 1
-                elif placement_b < placement_a:
-                    kart_wins[kart_b][kart_a] += 1
-
-        # Store the comparison results for this map
-        kart_comparison_data[map_name] = kart_wins
-
-    # Save to JSON file
-    with open(output_file, "w") as json_file:
-        json.dump(kart_comparison_data, json_file, indent=4)
-
-    print(f"Kart pairwise performance analysis saved to {output_file}")
-
-
-def generate_kart_win_rate_heatmaps():
-    """Generate heatmaps of kart win rates for each map based on pairwise comparisons."""
-    # Load the kart_post_analysis.json
-    with open(output_file, "r") as json_file:
-        kart_comparison_data = json.load(json_file)
-    
     # Directory for saving heatmaps
     kart_graphs_dir = os.path.join(base_dir, "output/kart_graphs")
     os.makedirs(kart_graphs_dir, exist_ok=True)
 
-    # Iterate through each map
-    for map_name, kart_wins in kart_comparison_data.items():
-        # Create a DataFrame for the win rates
-        karts = list(kart_wins.keys())
-        win_rate_matrix = []
-
-        for kart_a in karts:
-            row = []
-            for kart_b in karts:
-                if kart_wins[kart_a][kart_b] == "DNR":
-                    row.append(np.nan)  # Use NaN for DNR
-                else:
-                    wins_a = kart_wins[kart_a][kart_b]
-                    wins_b = kart_wins[kart_b][kart_a]
-                    total_races = wins_a + wins_b
-                    win_rate = (wins_a / total_races) * 100 if total_races > 0 else np.nan
-                    row.append(win_rate)
-            win_rate_matrix.append(row)
+    # Heatmaps are only re-rendered when their data (or this script) changed
+    manifest = build_manifest.load_manifest("kart_graphs")
+    code_digest = build_manifest.file_digest(__file__)
 
+    # Iterate through each map
+    for map_index, map_name in enumerate(maps_list):
         # Convert to DataFrame for heatmap
-        win_rate_df = pd.DataFrame(win_rate_matrix, index=karts, columns=karts)
-        
+        win_rate_df = pd.DataFrame(win_rates[map_index], index=karts_list, columns=karts_list)
+
+        heatmap_path = os.path.join(kart_graphs_dir, f"{map_name}_win_rate_heatmap.png")
+        heatmap_digest = build_manifest.digest(code_digest, map_name, win_rate_df)
+        if not build_manifest.needs_build(manifest, heatmap_path, heatmap_digest):
+            print(f"Kart win rate heatmap for {map_name} is up to date")
+            continue
+
         # Plot the heatmap
         plt.figure(figsize=(12, 10))
         sns.heatmap(
@@ -239,17 +281,24 @@ def generate_kart_win_rate_heatmaps():
         plt.tight_layout()
 
         # Save the heatmap
-        heatmap_path = os.path.join(kart_graphs_dir, f"{map_name}_win_rate_heatmap.png")
         plt.savefig(heatmap_path, dpi=150)
         plt.close()
+        build_manifest.record(manifest, heatmap_path, heatmap_digest)
         print(f"Saved kart win rate heatmap for {map_name} at {heatmap_path}")
 
+    build_manifest.save_manifest("kart_graphs", manifest)
+
 
 
-def main():
-    generate_kart_racetime_box_plots()
-    generate_kart_pairwise_comparisons()
-    generate_kart_win_rate_heatmaps()
+def main(results=None):
+    # Parse results once and share them between the stages
+    if results is None:
+        results = results_store.load_results(results_file)
+    generate_kart_racetime_box_plots(results)
+    counts = generate_kart_pairwise_comparisons(results)
+    generate_kart_win_rate_heatmaps(results, counts)
+    kart_stats.main(results)
+    plackett_luce.main(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import results_store
+import racetime
+import build_manifest
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+maps_file = os.path.join(base_dir, "data/maps.csv")
+karts_file = os.path.join(base_dir, "data/karts.csv")
+kart_stats_file = os.path.join(base_dir, "output/kart_stats.json")
+
+# Bootstrap settings
+REPLICATES = 2000  # Resamples of each map's races
+REPLICATE_CHUNK = 250  # Replicates drawn at a time (bounds memory to REPLICATE_CHUNK x races)
+CONFIDENCE_LEVEL = 0.95
+SEED = 0  # Fixed so reruns give the same intervals
+
+# Bradley-Terry settings: every kart also gets one drawn game against a virtual kart of strength 1,
+# which keeps strengths finite for karts that never (or always) won and puts them on a common scale
+PRIOR_GAMES = 1.0
+BT_MAX_ITERATIONS = 100
+BT_MAX_STEP = 2.0
+BT_TOLERANCE = 1e-10  # Largest log-strength change of a converged fit
+
+def load_csv(file_path, default_columns=None):
+    """Load a CSV file, creating a new DataFrame if it doesn't exist."""
+    if not os.path.exists(file_path):
+        return pd.DataFrame(columns=default_columns or [])
+    return pd.read_csv(file_path)
+
+def resample_weights(num_races, replicates, rng):
+    """
+    Bootstrap the races: a (replicates x num_races) index matrix of races drawn with replacement,
+    turned into how many times each race was drawn in each replicate.
+    """
+    draws = rng.integers(0, num_races, size=(replicates, num_races))
+    cells = (np.arange(replicates)[:, None] * num_races + draws).ravel()
+    return np.bincount(cells, minlength=replicates * num_races).reshape(replicates, num_races)
+
+def weighted_medians(values, weights):
+    """
+    Median of values repeated weights times, for every column of weights at once.
+    :param values: Sorted 1-D array.
+    :param weights: (len(values) x columns) integer counts.
+    :return: One median per column, NaN where a column's weights are all 0.
+    """
+    cumulative = np.cumsum(weights, axis=0, dtype=np.int32)
+    total = cumulative[-1] if len(values) else np.zeros(weights.shape[1], dtype=np.int32)
+    medians = np.full(weights.shape[1], np.nan)
+    has_values = total > 0
+    if has_values.any():
+        # The middle one or two of the total values, as 0-based positions in the expanded sorted list
+        cumulative, total = cumulative[:, has_values], total[has_values]
+        lower = np.argmax(cumulative > (total - 1) // 2, axis=0)
+        upper = np.argmax(cumulative > total // 2, axis=0)
+        medians[has_values] = (values[lower] + values[upper]) / 2
+    return medians
+
+def bradley_terry(wins, initial=None):
+    """
+    Bradley-Terry strengths from kart-vs-kart win counts, for any number of win matrices at once.
+    Newton steps on the log-strengths (the prior games make the log-likelihood strictly concave),
+    solved as one batched linear system per iteration; a matrix stops updating once it converged.
+    :param wins: (..., karts x karts) array; wins[..., a, b] is how often kart a beat kart b.
+    :param initial: Starting strengths (broadcast to (..., karts)), e.g. the fit of the full data
+                    when fitting its bootstrap replicates; defaults to 1 for every kart.
+    :return: (..., karts) strengths; a kart with strength s beats one with strength t with
+             probability s / (s + t). 1 is the strength of the virtual prior kart.
+    """
+    batch_shape, num_karts = wins.shape[:-2], wins.shape[-1]
+    wins = np.where(np.eye(num_karts, dtype=bool), 0, wins).astype(np.float64).reshape(-1, num_karts, num_karts)
+    games = wins + np.swapaxes(wins, -1, -2)
+    total_wins = wins.sum(axis=-1) + PRIOR_GAMES / 2
+
+    strength = np.ones(batch_shape + (num_karts,)) if initial is None else initial
+    log_strength = np.log(np.broadcast_to(strength, batch_shape + (num_karts,))).reshape(-1, num_karts).copy()
+    active = np.arange(len(log_strength))
+    for _ in range(BT_MAX_ITERATIONS):
+        theta = log_strength[active]
+        # Probability that kart i beats kart j (and the prior kart), from the current strengths
+        beats = 1 / (1 + np.exp(theta[:, None, :] - theta[:, :, None]))
+        beats_prior = 1 / (1 + np.exp(-theta))
+        gradient = total_wins[active] - (games[active] * beats).sum(axis=-1) - PRIOR_GAMES * beats_prior
+        curvature = games[active] * beats * np.swapaxes(beats, -1, -2)
+        hessian = curvature - np.eye(num_karts) * (curvature.sum(axis=-1) + PRIOR_GAMES * beats_prior * (1 - beats_prior))[:, :, None]
+        step = np.linalg.solve(hessian, gradient[:, :, None])[:, :, 0]
+        # Newton can overshoot far from the optimum, so no strength moves more than BT_MAX_STEP (log) at once
+        step = np.clip(step, -BT_MAX_STEP, BT_MAX_STEP)
+        log_strength[active] = theta - step
+        active = active[np.max(np.abs(step), axis=-1, initial=0) >= BT_TOLERANCE]
+        if not len(active):
+            break
+    return np.exp(log_strength).reshape(batch_shape + (num_karts,))
+
+def win_rates(wins):
+    """Share of games against other karts that each kart won (..., karts), NaN without any games."""
+    num_karts = wins.shape[-1]
+    wins = np.where(np.eye(num_karts, dtype=bool), 0, wins)
+    games = (wins + np.swapaxes(wins, -1, -2)).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(games > 0, wins.sum(axis=-1) / games, np.nan)
+
+def _interval(estimate, replicates, digits):
+    """[estimate, lower, upper] for JSON, rounded; None if there is no estimate."""
+    if np.isnan(estimate):
+        return None
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    replicates = replicates[~np.isnan(replicates)]
+    lower, upper = np.percentile(replicates, [tail, 100 - tail]) if len(replicates) else (np.nan, np.nan)
+    return [round(float(value), digits) if not np.isnan(value) else None for value in (estimate, lower, upper)]
+
+def map_kart_stats(race_codes, karts, placements, racetime_ms, karts_list, rng, replicates=REPLICATES):
+    """
+    Median time, win rate and Bradley-Terry strength per kart for one map, with bootstrap intervals.
+    Every replicate resamples the map's races, so the pairs and times of a race stay together.
+    :param race_codes: Race of each entry as 0..races-1, sorted.
+    :param karts: Index in karts_list of each entry's kart.
+    :return: {kart: stats} for the karts raced on the map, in karts_list order.
+    """
+    num_races = race_codes.max() + 1 if len(race_codes) else 0
+    num_karts = len(karts_list)
+
+    # Kart-vs-kart wins per race, so each replicate's totals are one weighted sum over races
+    left, right = results_store.entry_pairs(race_codes)
+    ahead = placements[left] < placements[right]
+    cells = (race_codes[left][ahead] * num_karts + karts[left][ahead]) * num_karts + karts[right][ahead]
+    race_wins = np.bincount(cells, minlength=num_races * num_karts * num_karts).reshape(num_races, -1)
+    wins = race_wins.sum(axis=0).reshape(num_karts, num_karts)
+    race_wins = race_wins.astype(np.float64)  # Counts well below 2**53, so the products are exact
+
+    # Games against other karts (a kart meeting itself is neither a win nor a loss)
+    decided = np.where(np.eye(num_karts, dtype=bool), 0, wins)
+    games = (decided + decided.T).sum(axis=1)
+    rates, strengths = win_rates(wins), bradley_terry(wins)
+
+    # Each kart's timed entries, fastest first
+    timed = racetime_ms != racetime.MISSING
+    kart_timed = []
+    for kart_index in range(num_karts):
+        entries = np.flatnonzero((karts == kart_index) & timed)
+        kart_timed.append(entries[np.argsort(racetime_ms[entries], kind="stable")])
+    times = [racetime.to_seconds(racetime_ms[entries]) for entries in kart_timed]
+
+    replicate_rates = np.empty((replicates, num_karts))
+    replicate_strengths = np.empty((replicates, num_karts))
+    replicate_medians = np.empty((replicates, num_karts))
+    for start in range(0, replicates, REPLICATE_CHUNK):
+        chunk = slice(start, min(start + REPLICATE_CHUNK, replicates))
+        weights = resample_weights(num_races, chunk.stop - chunk.start, rng)
+        replicate_wins = np.rint(weights @ race_wins).reshape(-1, num_karts, num_karts)
+        race_weights = np.ascontiguousarray(weights.T, dtype=np.int32)  # Row per race, for the medians
+        replicate_rates[chunk] = win_rates(replicate_wins)
+        replicate_strengths[chunk] = bradley_terry(replicate_wins, initial=strengths)
+        for kart_index, entries in enumerate(kart_timed):
+            replicate_medians[chunk, kart_index] = weighted_medians(times[kart_index], race_weights[race_codes[entries]])
+
+    strengths = np.where(games > 0, strengths, np.nan)
+    replicate_strengths[:, games == 0] = np.nan
+
+    stats = {}
+    for kart_index, kart in enumerate(karts_list):
+        if not (karts == kart_index).any():
+            continue
+        kart_times = times[kart_index]
+        median = np.median(kart_times) if len(kart_times) else np.nan
+        stats[kart] = {
+            "Times": len(kart_times),
+            "Median Time": _interval(median, replicate_medians[:, kart_index], 2),
+            "Games": int(games[kart_index]),
+            "Win Rate": _interval(rates[kart_index], replicate_rates[:, kart_index], 3),
+            "Strength": _interval(strengths[kart_index], replicate_strengths[:, kart_index], 3),
+        }
+    return stats
+
+def calculate_kart_stats(results, maps_list, karts_list, replicates=REPLICATES, seed=SEED):
+    """Kart stats with bootstrap confidence intervals for every map."""
+    store = results_store.as_store(results)
+    entries = store.entries
+
+    # Only entries with a listed kart on a listed map count
+    kart_index = pd.Index(karts_list).get_indexer(store.karts)
+    map_index = pd.Index(maps_list).get_indexer(store.races["Map Name"].astype(str))
+    kart_ids = entries["kart_id"].to_numpy()
+    race_ids = entries["race_id"].to_numpy()
+    karts = np.where(kart_ids == results_store.MISSING_ID, -1, kart_index[kart_ids])
+    maps = map_index[race_ids]
+    placements = entries["placement"].to_numpy()
+    racetime_ms = entries["racetime_ms"].to_numpy()
+
+    stats = {}
+    for map_number, map_name in enumerate(maps_list):
+        on_map = (maps == map_number) & (karts >= 0)
+        if not on_map.any():
+            continue
+        race_codes, _ = pd.factorize(race_ids[on_map])
+        rng = np.random.default_rng([seed, map_number])
+        stats[map_name] = map_kart_stats(race_codes, karts[on_map], placements[on_map], racetime_ms[on_map],
+                                         karts_list, rng, replicates)
+
+    return {
+        "Replicates": replicates,
+        "Confidence Level": CONFIDENCE_LEVEL,
+        "Maps": stats,
+    }
+
+def main(results=None):
+    if results is None:
+        results = results_store.load_results(results_file)
+    maps_list = load_csv(maps_file, default_columns=["Map Name"])["Map Name"].tolist()
+    karts_list = load_csv(karts_file, default_columns=["Kart Name"])["Kart Name"].tolist()
+
+    # Compact: this file is downloaded by the kart stats page
+    kart_stats = calculate_kart_stats(results, maps_list, karts_list)
+    if build_manifest.write_text_if_changed(kart_stats_file, json.dumps(kart_stats, separators=(",", ":"))):
+        print(f"Kart stats saved to {kart_stats_file}")
+    else:
+        print(f"{kart_stats_file} is already up to date.")
+
+if __name__ == "__main__":
+    main()
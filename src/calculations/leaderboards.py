@@ -0,0 +1,159 @@
+import os
+import json
+import heapq
+import numpy as np
+import pandas as pd
+import results_store
+import racetime
+import build_manifest
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+leaderboard_checkpoint_file = os.path.join(base_dir, "output/cache/leaderboards.json")
+
+# Constants
+TOP_TIMES = 10  # Entries per map in "Best Race Times"
+DNR = "DNR"
+PREFIX_CHECK_BYTES = 4096  # Bytes before the checkpoint's end of results.csv that must be unchanged to resume
+
+class TopK:
+    """
+    The k fastest entries seen so far. Entries are kept in a bounded heap with the slowest at
+    the root, so each new time costs O(log k). Equal times keep the entry that came first,
+    where order is (race_id, player index) like the row-then-player scan of results.csv.
+    """
+    def __init__(self, k, entries=()):
+        self.k = k
+        self._heap = []  # (-racetime_ms, -race_id, -player_index, record): root is the slowest kept
+        for racetime_ms, race_id, player_index, record in entries:
+            self.push(racetime_ms, (race_id, player_index), record)
+
+    def push(self, racetime_ms, order, record):
+        """Offer an entry. Returns True if it made the top k."""
+        key = (-racetime_ms, -order[0], -order[1], record)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, key)
+            return True
+        if key > self._heap[0]:
+            heapq.heapreplace(self._heap, key)
+            return True
+        return False
+
+    def entries(self):
+        """Kept entries as (racetime_ms, race_id, player_index, record), fastest first."""
+        return sorted((-racetime_ms, -race_id, -player_index, record)
+                      for racetime_ms, race_id, player_index, record in self._heap)
+
+    def records(self):
+        return [entry[-1] for entry in self.entries()]
+
+class Leaderboards:
+    """"Best Race Times" for every map, updated race by race."""
+    def __init__(self, map_list, races_processed=0, best_times=None):
+        self.races_processed = races_processed
+        best_times = best_times or {}
+        self.best_times = {map_name: TopK(TOP_TIMES, best_times.get(map_name, ())) for map_name in map_list}
+
+    def add_races(self, results, players):
+        """
+        Push the races after races_processed onto the leaderboards. Only the entries of those
+        races are read, so a refresh costs O(new races).
+        :param results: RaceStore (or wide results DataFrame).
+        :param players: Player names in players.csv order.
+        """
+        store = results if isinstance(results, results_store.RaceStore) else results_store.to_long(results, players)
+        entries = store.entries
+        first_new = np.searchsorted(entries["race_id"].to_numpy(), self.races_processed)
+        new_entries = entries.iloc[first_new:]
+        new_entries = new_entries[new_entries["racetime_ms"].to_numpy() != results_store.MISSING_ID]
+
+        race_ids = new_entries["race_id"].to_numpy()
+        player_index = pd.Index(players).get_indexer(store.players)[new_entries["player_id"].to_numpy()]
+        map_names = store.races["Map Name"].to_numpy()[race_ids]
+        kart_lookup = np.array(list(store.karts) + [DNR], dtype=object)
+        kart_ids = new_entries["kart_id"].to_numpy()
+        karts = kart_lookup[np.where(kart_ids == results_store.MISSING_ID, len(store.karts), kart_ids)]
+        racetime_ms = new_entries["racetime_ms"].to_numpy()
+        racetime_text = racetime.format_ms(racetime_ms)
+
+        for race_id, index, map_name, kart, milliseconds, text in zip(
+                race_ids, player_index, map_names, karts, racetime_ms, racetime_text):
+            if index < 0 or map_name not in self.best_times:
+                continue
+            record = f"{text} by {players[index]} in {kart}"
+            self.best_times[map_name].push(int(milliseconds), (int(race_id), int(index)), record)
+
+        self.races_processed = store.num_races
+
+    def best_race_times(self):
+        return {map_name: top.records() for map_name, top in self.best_times.items()}
+
+    def to_json(self):
+        return {
+            "races_processed": self.races_processed,
+            "best_times": {map_name: top.entries() for map_name, top in self.best_times.items()},
+        }
+
+def results_key(results_file):
+    """
+    Cheap check that results_file still starts with the races a checkpoint was built from:
+    its size, modification time and a digest of its last PREFIX_CHECK_BYTES bytes.
+    """
+    stat = os.stat(results_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "tail": _tail_digest(results_file, stat.st_size)}
+
+def _tail_digest(results_file, offset):
+    """Digest of the PREFIX_CHECK_BYTES bytes of results_file before offset."""
+    start = max(0, offset - PREFIX_CHECK_BYTES)
+    with open(results_file, "rb") as file:
+        file.seek(start)
+        return build_manifest.digest(file.read(offset - start))
+
+def is_prefix(key, results_file):
+    """
+    True if results_file is the file key was taken from, possibly with races appended since.
+    Rewriting the file (edits, a git checkout, truncation) changes its size, modification time
+    or the bytes before the old end. Only the last PREFIX_CHECK_BYTES bytes are compared, so an
+    edit further back that keeps the size, made along with an append, is missed; --force rebuilds.
+    """
+    current = os.stat(results_file)
+    if current.st_size < key["size"] or (current.st_size == key["size"] and current.st_mtime_ns != key["mtime_ns"]):
+        return False
+    return _tail_digest(results_file, key["size"]) == key["tail"]
+
+def _checkpoint_settings(players, map_list):
+    return {"TOP_TIMES": TOP_TIMES, "code": build_manifest.file_digest(__file__), "players": players, "maps": map_list}
+
+def load_leaderboards(results, players, map_list, results_file=results_file):
+    """
+    Leaderboards for results (a RaceStore loaded from results_file). Resumes from the saved
+    checkpoint when races were only appended to results_file since, so just the new races are
+    read; otherwise rebuilds from every race. The updated checkpoint is saved.
+    """
+    players, map_list = list(players), list(map_list)
+    leaderboards = None
+    if not build_manifest.forced() and os.path.exists(results_file) and os.path.exists(leaderboard_checkpoint_file):
+        try:
+            with open(leaderboard_checkpoint_file, "r") as json_file:
+                checkpoint = json.load(json_file)
+            state = checkpoint["state"]
+            if checkpoint["settings"] == _checkpoint_settings(players, map_list) \
+                    and state["races_processed"] <= results_store.num_races(results) \
+                    and is_prefix(checkpoint["results"], results_file):
+                leaderboards = Leaderboards(map_list, **state)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable leaderboard checkpoint: {e}")
+
+    if leaderboards is None:
+        leaderboards = Leaderboards(map_list)
+    leaderboards.add_races(results, players)
+
+    if os.path.exists(results_file):
+        checkpoint = {
+            "settings": _checkpoint_settings(players, map_list),
+            "results": results_key(results_file),
+            "state": leaderboards.to_json(),
+        }
+        build_manifest.write_text_if_changed(leaderboard_checkpoint_file, json.dumps(checkpoint))
+    return leaderboards
@@ -0,0 +1,177 @@
+import os
+import json
+import tempfile
+import pandas as pd
+import results_store
+import racetime
+import atomic_file
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+
+# Constants
+DNR = "DNR"
+
+def index_paths(results_file):
+    """
+    The PB index lives next to results.csv (personal_bests.json, published to the website);
+    the size/mtime of results.csv it was last in sync with is kept in cache/.
+    """
+    output_dir = os.path.dirname(os.path.abspath(results_file))
+    return (os.path.join(output_dir, "personal_bests.json"),
+            os.path.join(output_dir, "cache", "personal_bests_sync.json"))
+
+def empty_index():
+    return {"Races Processed": 0, "Personal Bests": {}}
+
+def add_entry(index, player, map_name, kart, racetime_ms, date, race_id):
+    """
+    Fold one finished race into the index: O(1) per (player, map) and (player, map, kart).
+    Equal times keep the earlier race. Maps and karts are listed in the order first raced.
+    :param kart: Kart name, or None if it wasn't logged (counts for the map best only).
+    """
+    record = {
+        "Racetime": racetime.to_text(racetime_ms),
+        "Racetime ms": int(racetime_ms),
+        "Kart": kart if kart is not None else DNR,
+        "Date": date,
+        "Race": int(race_id),
+    }
+    player_maps = index["Personal Bests"].setdefault(player, {})
+    best = player_maps.get(map_name)
+    if best is None:
+        player_maps[map_name] = best = {**record, "First Race": int(race_id), "Karts": {}}
+    elif racetime_ms < best["Racetime ms"]:
+        best.update(record)
+
+    if kart is not None:
+        kart_best = best["Karts"].get(kart)
+        if kart_best is None or racetime_ms < kart_best["Racetime ms"]:
+            best["Karts"][kart] = {key: value for key, value in record.items() if key != "Kart"}
+
+def _order_players(index, players):
+    """Keep players in players.csv order (players no longer listed go last)."""
+    bests = index["Personal Bests"]
+    ordered = {player: bests[player] for player in players if player in bests}
+    ordered.update({player: maps for player, maps in bests.items() if player not in ordered})
+    index["Personal Bests"] = ordered
+
+def build_index(results, players):
+    """
+    Build the PB index from every race in results (a RaceStore or a wide results DataFrame).
+    :param players: Player names in players.csv order.
+    """
+    index = empty_index()
+    named = results_store.entries_with_names(results_store.as_store(results, players))
+    named = named[named["racetime_ms"] != results_store.MISSING_ID]
+    for race_id, player, map_name, kart, racetime_ms, date in zip(
+            named["race_id"], named["Player"], named["Map Name"], named["Kart"], named["racetime_ms"], named["Date"]):
+        add_entry(index, player, map_name, None if pd.isna(kart) else kart, racetime_ms, date, race_id)
+    index["Races Processed"] = results_store.num_races(results)
+    _order_players(index, players)
+    return index
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable {path}: {e}")
+        return None
+
+def _write_json(path, data, indent=None):
+    """Write JSON through a temporary file so readers never see half a file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as json_file:
+            json.dump(data, json_file, indent=indent)
+        atomic_file.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _file_key(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def save_index(index, results_file):
+    """Save the index and remember which version of results_file it matches."""
+    index_file, sync_file = index_paths(results_file)
+    existing = _read_json(index_file)
+    if existing != index:
+        _write_json(index_file, index, indent=4)
+    _write_json(sync_file, {"results": _file_key(results_file)})
+
+def record_race(results_file, row_data, players, results_key_before):
+    """
+    Fold a race that was just appended to results_file into the PB index (called by race_log).
+    The index is only touched if it was in sync with results_file before the append;
+    otherwise it is left for analysis.py to rebuild.
+    :param row_data: Dict of column name -> value for the race, as logged.
+    :param results_key_before: [size, mtime_ns] of results_file before the append.
+    :return: True if the index was updated.
+    """
+    index_file, sync_file = index_paths(results_file)
+    index = _read_json(index_file)
+    sync = _read_json(sync_file)
+    if index is None or sync is None or sync.get("results") != list(results_key_before):
+        return False
+
+    race_id = index["Races Processed"]
+    for player in players:
+        placement = row_data.get(f"{player} Placement", DNR)
+        racetime_text = row_data.get(f"{player} Racetime", DNR)
+        if placement in (DNR, "") or racetime_text in (DNR, ""):
+            continue
+        racetime_ms = racetime.to_ms(racetime_text)
+        if racetime_ms == racetime.MISSING:
+            continue
+        kart = row_data.get(f"{player} Kart", DNR)
+        add_entry(index, player, row_data.get("Map Name"), kart if kart not in (DNR, "") else None,
+                  racetime_ms, row_data.get("Date"), race_id)
+
+    index["Races Processed"] = race_id + 1
+    _order_players(index, players)
+    save_index(index, results_file)
+    return True
+
+def load_index(results, players, results_file=results_file, force=False):
+    """
+    Return the PB index for results. When the loggers kept it in sync with results_file it is
+    used as is; otherwise (edits, new checkout, force) it is rebuilt from every race and saved.
+    """
+    index_file, sync_file = index_paths(results_file)
+    if not force and os.path.exists(results_file):
+        index = _read_json(index_file)
+        sync = _read_json(sync_file)
+        if index is not None and sync is not None and sync.get("results") == _file_key(results_file) \
+                and index.get("Races Processed") == results_store.num_races(results):
+            return index
+
+    index = build_index(results, players)
+    if os.path.exists(results_file):
+        save_index(index, results_file)
+    return index
+
+def individual_best_times(index, map_list, players):
+    """
+    "Individual Player Best Times": each player's best on each map, best first.
+    Players with equal times are listed in the order they first raced the map.
+    """
+    bests = index["Personal Bests"]
+    individual_best_times = {}
+    for map_name in map_list:
+        map_bests = []
+        for player_index, player in enumerate(players):
+            best = bests.get(player, {}).get(map_name)
+            if best is not None:
+                map_bests.append((best["Racetime ms"], best["First Race"], player_index,
+                                  f"{best['Racetime']} by {player} in {best['Kart']}"))
+        individual_best_times[map_name] = [record for *_, record in sorted(map_bests)]
+    return individual_best_times
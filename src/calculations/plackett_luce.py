@@ -0,0 +1,390 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import tempfile
+import zipfile
+from dataclasses import dataclass
+import results_store
+import build_manifest
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+maps_file = os.path.join(base_dir, "data/maps.csv")
+karts_file = os.path.join(base_dir, "data/karts.csv")
+strengths_file = os.path.join(base_dir, "output/kart_player_strengths.json")
+fit_state_file = os.path.join(base_dir, "output/cache/kart_player_strengths.npz")
+
+# Fit settings: like kart_stats, every strength also gets one drawn game against a virtual
+# competitor of strength 1, so players and karts that never (or always) won stay finite
+PRIOR_GAMES = 1.0
+MAX_ITERATIONS = 5000
+RESCALE_ITERATIONS = 50
+NEWTON_THRESHOLD = 1e-2  # MM steps this small switch the fit over to Newton steps
+NEWTON_HALVINGS = 30  # Step halvings before a Newton step is given up on
+TOLERANCE = 1e-10  # Largest log-strength change of a converged fit
+
+# Bump when the saved fit state changes shape/meaning so old states are ignored
+FIT_STATE_VERSION = 1
+
+@dataclass
+class Orderings:
+    """
+    Finishing orders of every race as a (races x max racers) matrix of entries.
+    entry:  Entry index per race and finishing position, -1 after the race's last finisher.
+    player: Player id of each entry.
+    kart:   Map-specific kart of each entry, map index * len(karts_list) + kart index.
+    kart_map: Map index of every map-specific kart.
+    """
+    entry: np.ndarray
+    player: np.ndarray
+    kart: np.ndarray
+    kart_map: np.ndarray
+
+    @property
+    def finished(self):
+        return self.entry >= 0
+
+    @property
+    def stage_winners(self):
+        """Entries picked at some stage of the ordering: everyone except each race's last finisher."""
+        finished = self.finished
+        return finished & np.c_[finished[:, 1:], np.zeros(len(finished), dtype=bool)]
+
+def load_csv(file_path, default_columns=None):
+    """Load a CSV file, creating a new DataFrame if it doesn't exist."""
+    if not os.path.exists(file_path):
+        return pd.DataFrame(columns=default_columns or [])
+    return pd.read_csv(file_path)
+
+def race_orderings(store, maps_list, karts_list):
+    """
+    The finishing order of every race from a RaceStore, keeping entries with a listed kart on a
+    listed map. Dropping an entry leaves a valid ordering of the rest, so races stay usable.
+    """
+    entries = store.entries
+    kart_index = pd.Index(karts_list).get_indexer(store.karts)
+    map_index = pd.Index(maps_list).get_indexer(store.races["Map Name"].astype(str))
+    kart_ids = entries["kart_id"].to_numpy()
+    race_ids = entries["race_id"].to_numpy()
+    karts = np.where(kart_ids == results_store.MISSING_ID, -1, kart_index[kart_ids])
+    maps = map_index[race_ids]
+    kept = (karts >= 0) & (maps >= 0)
+
+    # Entries are sorted by race and placement, so a race's entries are its finishing order
+    race_codes, _ = pd.factorize(race_ids[kept])
+    race_starts = np.searchsorted(race_codes, np.arange(race_codes.max() + 1 if len(race_codes) else 0))
+    positions = np.arange(len(race_codes)) - race_starts[race_codes]
+    entry = np.full((len(race_starts), positions.max() + 1 if len(positions) else 0), -1, dtype=np.intp)
+    entry[race_codes, positions] = np.arange(len(race_codes))
+    return Orderings(
+        entry=entry,
+        player=entries["player_id"].to_numpy()[kept].astype(np.intp),
+        kart=(maps[kept] * len(karts_list) + karts[kept]).astype(np.intp),
+        kart_map=np.repeat(np.arange(len(maps_list)), len(karts_list)),
+    )
+
+def _exposures(orderings, entry_strength):
+    """
+    Sum over the stages of its race that an entry took part in of 1 / (total strength left in
+    the race at that stage), the denominator of the minorization-maximization update.
+    """
+    finished = orderings.finished
+    strength = np.where(finished, entry_strength[orderings.entry], 0)
+    remaining = np.cumsum(strength[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(divide="ignore"):
+        stage_terms = np.where(orderings.stage_winners, 1 / remaining, 0)
+    return np.cumsum(stage_terms, axis=1)[finished], remaining
+
+def log_likelihood(orderings, player_strength, kart_strength):
+    """Log-likelihood of every race's finishing order under the Plackett-Luce model (without the prior)."""
+    entry_strength = player_strength[orderings.player] * kart_strength[orderings.kart]
+    _, remaining = _exposures(orderings, entry_strength)
+    winners = orderings.stage_winners
+    return float(np.sum(np.log(entry_strength[orderings.entry[winners]]) - np.log(remaining[winners])))
+
+def _rescale(log_strength, groups, num_groups):
+    """
+    Scale every group of strengths by the factor that maximizes the prior. A race's finishing
+    order only depends on the ratios of its entries' strengths, so scaling all players, or all
+    karts of one map, leaves the likelihood unchanged: only the prior pins these scales, and plain
+    MM updates crawl along them. Each factor solves sum(s / (s + 1)) = n / 2 over its group (Newton).
+    :param groups: Group of each strength, -1 to leave it as it is.
+    """
+    in_group = groups >= 0
+    groups, group_size = groups[in_group], np.bincount(groups[in_group], minlength=num_groups)
+    shift = np.zeros(num_groups)
+    for _ in range(RESCALE_ITERATIONS):
+        beats_prior = 1 / (1 + np.exp(-(log_strength[in_group] + shift[groups])))
+        excess = np.bincount(groups, weights=beats_prior, minlength=num_groups) - group_size / 2
+        slope = np.bincount(groups, weights=beats_prior * (1 - beats_prior), minlength=num_groups)
+        step = np.clip(np.divide(excess, slope, out=np.zeros(num_groups), where=slope > 0), -2, 2)
+        shift -= step
+        if np.max(np.abs(step), initial=0) < TOLERANCE:
+            break
+    log_strength = log_strength.copy()
+    log_strength[in_group] += shift[groups]
+    return log_strength
+
+def _hessian_layout(orderings, num_players):
+    """
+    Where the Newton step's sums go, fixed for a fit: the player and kart parameter (index into
+    the concatenated player and kart log-strengths, padding one past the end) of the entry at each
+    finishing position, and the cell of the (parameters x parameters) curvature matrix of every
+    pair of positions in a race, for each of the player/kart combinations.
+    """
+    num_params = num_players + len(orderings.kart_map) + 1
+    finished = orderings.finished
+    entry = np.where(finished, orderings.entry, 0)
+    player_param = np.where(finished, orderings.player[entry], num_params - 1)
+    kart_param = np.where(finished, num_players + orderings.kart[entry], num_params - 1)
+    cells = [(rows[:, :, None] * num_params + columns[:, None, :]).ravel()
+             for rows in (player_param, kart_param) for columns in (player_param, kart_param)]
+    return player_param, kart_param, cells
+
+def objective(orderings, log_strength, num_players):
+    """Log-likelihood plus the prior, the function the fit maximizes."""
+    strength = np.exp(log_strength)
+    prior = PRIOR_GAMES * np.sum(log_strength / 2 - np.logaddexp(0, log_strength))
+    return log_likelihood(orderings, strength[:num_players], strength[num_players:]) + prior
+
+def _newton_step(orderings, log_strength, layout):
+    """
+    Newton step on every log-strength at once. The objective is concave in the log-strengths;
+    at each stage of a race the entries left form a softmax, so the curvature is the sum over
+    stages of diag(p) - p p^T (p: pick probabilities), mapped onto the players and karts.
+    """
+    player_param, kart_param, cells = layout
+    num_params = len(log_strength) + 1
+    padded = np.r_[log_strength, 0.0]
+    strength = np.where(orderings.finished, np.exp(padded[player_param] + padded[kart_param]), 0)
+    remaining = np.cumsum(strength[:, ::-1], axis=1)[:, ::-1]
+    stages = orderings.stage_winners
+    with np.errstate(divide="ignore"):
+        pick = np.where(stages, 1 / remaining, 0)
+
+    # The entries at positions i and j are both left up to stage min(i, j), so the sum over stages
+    # of p_i * p_j is s_i * s_j * (sum of pick^2 up to min(i, j)); p_i summed over stages is s_i * sum of pick
+    positions = np.arange(strength.shape[1])
+    expected = strength * np.cumsum(pick, axis=1)
+    shared = np.cumsum(pick ** 2, axis=1)[:, np.minimum.outer(positions, positions)]
+    curvature = -(strength[:, :, None] * strength[:, None, :] * shared)
+    curvature[:, positions, positions] += expected
+
+    gradient = np.zeros(num_params)
+    for rows in (player_param, kart_param):
+        gradient += np.bincount(rows.ravel(), weights=(stages - expected).ravel(), minlength=num_params)
+    information = np.zeros(num_params * num_params)
+    for pair_cells in cells:
+        information += np.bincount(pair_cells, weights=curvature.ravel(), minlength=num_params * num_params)
+    gradient = gradient[:-1]
+    information = information.reshape(num_params, num_params)[:-1, :-1]
+
+    # The prior: one game against strength 1, half won
+    beats_prior = 1 / (1 + np.exp(-log_strength))
+    gradient += PRIOR_GAMES * (0.5 - beats_prior)
+    information[np.diag_indices(len(log_strength))] += PRIOR_GAMES * beats_prior * (1 - beats_prior)
+    return np.linalg.solve(information, gradient)
+
+def _newton_update(orderings, log_strength, num_players, layout):
+    """Log-strengths after a Newton step, halved until it doesn't lower the objective. None if no step helps."""
+    step = _newton_step(orderings, log_strength, layout)
+    current = objective(orderings, log_strength, num_players)
+    slack = 1e-12 * (1 + abs(current))  # Rounding noise of the objective near its maximum
+    for _ in range(NEWTON_HALVINGS):
+        candidate = log_strength + step
+        if objective(orderings, candidate, num_players) >= current - slack:
+            return candidate
+        step /= 2
+    return None
+
+def fit(orderings, num_players, initial=None):
+    """
+    Fit player and kart strengths jointly by minorization-maximization: an entry's strength is its
+    player's strength times its kart's, and a race's finishing order is picked one finisher at a
+    time with probability proportional to strength among those left (Plackett-Luce).
+    Players and karts are updated in turn; each update is a pair of scatter-adds over the entries
+    (the entry-player and entry-kart incidence matrices), so an iteration is linear in the entries.
+    MM only converges linearly, so once its steps are small the fit finishes with Newton steps,
+    which converge quadratically; a warm start begins with them (a refit after a few new races
+    takes a handful of iterations, a cold fit a few dozen).
+    :param initial: (player_strength, kart_strength) to start from, e.g. the previous fit; new
+                    players and karts can be given 1. Defaults to 1 for everything.
+    :return: (player_strength, kart_strength, iterations).
+    """
+    num_karts = len(orderings.kart_map)
+    if initial is None:
+        player_strength, kart_strength = np.ones(num_players), np.ones(num_karts)
+    else:
+        player_strength, kart_strength = (np.array(strength, dtype=np.float64) for strength in initial)
+
+    # Stages won, plus the half win against the virtual competitor
+    winners = orderings.entry[orderings.stage_winners]
+    player_wins = np.bincount(orderings.player[winners], minlength=num_players) + PRIOR_GAMES / 2
+    kart_wins = np.bincount(orderings.kart[winners], minlength=num_karts) + PRIOR_GAMES / 2
+    entries = orderings.entry[orderings.finished]
+    players, karts = orderings.player[entries], orderings.kart[entries]
+
+    # Scale groups: the players who raced, and the karts raced on each map
+    raced_players = np.bincount(players, minlength=num_players) > 0
+    raced_karts = np.bincount(karts, minlength=num_karts) > 0
+    groups = np.r_[np.where(raced_players, 0, -1), np.where(raced_karts, orderings.kart_map + 1, -1)]
+    num_groups = orderings.kart_map.max() + 2 if num_karts else 1
+
+    newton = initial is not None  # A warm start is already close to the optimum
+    layout = None
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        previous = np.log(np.r_[player_strength, kart_strength])
+        log_strength = None
+        if newton:
+            layout = layout or _hessian_layout(orderings, num_players)
+            log_strength = _newton_update(orderings, previous, num_players, layout)
+
+        if log_strength is None:
+            exposure, _ = _exposures(orderings, player_strength[orderings.player] * kart_strength[orderings.kart])
+            player_exposure = np.bincount(players, weights=kart_strength[karts] * exposure, minlength=num_players)
+            player_strength = player_wins / (player_exposure + PRIOR_GAMES / (player_strength + 1))
+
+            exposure, _ = _exposures(orderings, player_strength[orderings.player] * kart_strength[orderings.kart])
+            kart_exposure = np.bincount(karts, weights=player_strength[players] * exposure, minlength=num_karts)
+            kart_strength = kart_wins / (kart_exposure + PRIOR_GAMES / (kart_strength + 1))
+
+            log_strength = _rescale(np.log(np.r_[player_strength, kart_strength]), groups, num_groups)
+
+        strength = np.exp(log_strength)
+        player_strength, kart_strength = strength[:num_players], strength[num_players:]
+        change = np.max(np.abs(log_strength - previous), initial=0)
+        if change < TOLERANCE:
+            break
+        newton = change < NEWTON_THRESHOLD
+    return player_strength, kart_strength, iteration
+
+def _initial_strengths(previous, players, maps_list, karts_list):
+    """Starting strengths from a previous fit state, 1 for anything it doesn't have."""
+    player_log_strength = np.zeros(len(players))
+    player_index = pd.Index(previous["players"]).get_indexer(players)
+    known = player_index >= 0
+    player_log_strength[known] = previous["player_log_strength"][player_index[known]]
+
+    kart_log_strength = np.zeros((len(maps_list), len(karts_list)))
+    map_index = pd.Index(previous["maps"]).get_indexer(maps_list)
+    kart_index = pd.Index(previous["karts"]).get_indexer(karts_list)
+    known = (map_index[:, None] >= 0) & (kart_index[None, :] >= 0)
+    if known.any():
+        previous_grid = previous["kart_log_strength"][np.ix_(np.maximum(map_index, 0), np.maximum(kart_index, 0))]
+        kart_log_strength[known] = previous_grid[known]
+    return np.exp(player_log_strength), np.exp(kart_log_strength).ravel()
+
+def save_fit_state(state, state_file=fit_state_file):
+    """Save the unrounded log-strengths of a fit (the warm start of the next one) as an .npz (atomically)."""
+    os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+    arrays = {
+        "version": np.array(FIT_STATE_VERSION),
+        "prior_games": np.array(PRIOR_GAMES),
+        "players": np.array(state["players"], dtype=str),
+        "maps": np.array(state["maps"], dtype=str),
+        "karts": np.array(state["karts"], dtype=str),
+        "player_log_strength": np.asarray(state["player_log_strength"], dtype=np.float64),
+        "kart_log_strength": np.asarray(state["kart_log_strength"], dtype=np.float64),
+    }
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(state_file)), suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, state_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_fit_state(state_file=fit_state_file):
+    """Load a saved fit state. Returns None if there is none or it is unusable (then the fit starts cold)."""
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with np.load(state_file, allow_pickle=False) as saved:
+            if int(saved["version"]) != FIT_STATE_VERSION or float(saved["prior_games"]) != PRIOR_GAMES:
+                return None
+            state = {
+                "players": saved["players"].tolist(),
+                "maps": saved["maps"].tolist(),
+                "karts": saved["karts"].tolist(),
+                "player_log_strength": saved["player_log_strength"],
+                "kart_log_strength": saved["kart_log_strength"],
+            }
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"Ignoring unreadable {state_file}: {e}")
+        return None
+    if state["player_log_strength"].shape != (len(state["players"]),) or \
+            state["kart_log_strength"].shape != (len(state["maps"]), len(state["karts"])):
+        print(f"Ignoring {state_file}: its strengths don't match its names")
+        return None
+    return state
+
+def calculate_strengths(results, maps_list, karts_list, previous=None):
+    """
+    Player and per-map kart strengths from every race's finishing order.
+    :param previous: The fit state of an earlier fit to warm-start from, so results with a few
+                     new races refit in a handful of iterations.
+    :return: (strengths JSON, fit state, iterations). The JSON's strengths are rounded for display;
+             the fit state keeps the exact log-strengths (see save_fit_state).
+    """
+    store = results_store.as_store(results)
+    players = store.players
+    orderings = race_orderings(store, maps_list, karts_list)
+    initial = _initial_strengths(previous, players, maps_list, karts_list) if previous is not None else None
+    player_strength, kart_strength, iterations = fit(orderings, len(players), initial)
+    state = {
+        "players": list(players),
+        "maps": list(maps_list),
+        "karts": list(karts_list),
+        "player_log_strength": np.log(player_strength),
+        "kart_log_strength": np.log(kart_strength).reshape(len(maps_list), len(karts_list)),
+    }
+
+    entries = orderings.entry[orderings.finished]
+    player_races = np.bincount(orderings.player[entries], minlength=len(players))
+    kart_races = np.bincount(orderings.kart[entries], minlength=len(maps_list) * len(karts_list))
+
+    # Strongest first; only players and karts that raced
+    player_stats = {
+        players[i]: {"Strength": round(float(player_strength[i]), 4), "Races": int(player_races[i])}
+        for i in np.argsort(-player_strength, kind="stable") if player_races[i]
+    }
+    kart_stats = {}
+    for map_index, map_name in enumerate(maps_list):
+        slots = map_index * len(karts_list) + np.argsort(-kart_strength[map_index * len(karts_list):(map_index + 1) * len(karts_list)], kind="stable")
+        map_karts = {
+            karts_list[slot % len(karts_list)]: {"Strength": round(float(kart_strength[slot]), 4), "Races": int(kart_races[slot])}
+            for slot in slots if kart_races[slot]
+        }
+        if map_karts:
+            kart_stats[map_name] = map_karts
+
+    strengths = {
+        "Log Likelihood": round(log_likelihood(orderings, player_strength, kart_strength), 4),
+        "Players": player_stats,
+        "Karts": kart_stats,
+    }
+    return strengths, state, iterations
+
+def main(results=None):
+    if results is None:
+        results = results_store.load_results(results_file)
+    maps_list = load_csv(maps_file, default_columns=["Map Name"])["Map Name"].tolist()
+    karts_list = load_csv(karts_file, default_columns=["Kart Name"])["Kart Name"].tolist()
+
+    # Warm-start from the last fit, which already accounts for every race but the newest ones
+    previous = None if build_manifest.forced() else load_fit_state(fit_state_file)
+
+    strengths, state, iterations = calculate_strengths(results, maps_list, karts_list, previous)
+    save_fit_state(state, fit_state_file)
+    start = "warm start" if previous is not None else "cold start"
+    if build_manifest.write_text_if_changed(strengths_file, json.dumps(strengths, indent=4)):
+        print(f"Kart and player strengths saved to {strengths_file} ({iterations} iterations, {start})")
+    else:
+        print(f"{strengths_file} is already up to date ({iterations} iterations, {start}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import csv
+import os
+import tempfile
+import personal_bests
+import atomic_file
+
+# Constants
+STATIC_COLUMNS = ["Date", "Time", "Map Name"]
+DNR = "DNR"
+LINE_TERMINATOR = os.linesep  # For a new race log; matches pandas.DataFrame.to_csv
+
+def expected_columns(players):
+    """Return the results.csv header for the given players list."""
+    columns = list(STATIC_COLUMNS)
+    for player in players:
+        columns.extend([
+            f"{player} Placement",
+            f"{player} Kart",
+            f"{player} Racetime"
+        ])
+    return columns
+
+def read_header(output_file):
+    """Read only the header row of the race log. Returns [] if the file is missing or empty."""
+    if not os.path.exists(output_file) or os.stat(output_file).st_size == 0:
+        return []
+    with open(output_file, "r", newline="", encoding="utf-8") as file:
+        return next(csv.reader(file), [])
+
+def _fsync_write(file):
+    """Flush a file object all the way to disk."""
+    file.flush()
+    os.fsync(file.fileno())
+
+def _atomic_rewrite(output_file, write_contents):
+    """
+    Rewrite the race log through a temporary file in the same directory and swap it in
+    with os.replace, so a crash mid-write leaves either the old or the new file, never half of one.
+    """
+    directory = os.path.dirname(os.path.abspath(output_file))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".results_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as temp_file:
+            write_contents(temp_file)
+            _fsync_write(temp_file)
+        atomic_file.replace(temp_path, output_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def initialize_csv(output_file, players):
+    """
+    Create the race log if needed and make sure it has columns for every player.
+    The file is only rewritten when new player columns have to be added (filled with "DNR").
+    :param output_file: Path to results.csv.
+    :param players: Current player names from players.csv.
+    :return: The header of the race log after initialization (list).
+    """
+    columns = expected_columns(players)
+    header = read_header(output_file)
+
+    if not header:
+        # If the file doesn't exist, create it with the correct columns
+        _atomic_rewrite(output_file, lambda file: csv.writer(file, lineterminator=LINE_TERMINATOR).writerow(columns))
+        return columns
+
+    # Check for missing columns
+    missing_columns = [col for col in columns if col not in header]
+    if not missing_columns:
+        return header
+
+    # Stream the existing rows into a new file, padding the new columns with "DNR"
+    new_header = header + missing_columns
+    padding = [DNR] * len(missing_columns)
+
+    # Keep the file's own line endings (the committed results.csv is CRLF)
+    lineterminator = atomic_file.line_terminator(output_file)
+
+    def migrate(temp_file):
+        writer = csv.writer(temp_file, lineterminator=lineterminator)
+        writer.writerow(new_header)
+        with open(output_file, "r", newline="", encoding="utf-8") as source:
+            reader = csv.reader(source)
+            next(reader, None)  # Skip the old header
+            for row in reader:
+                if row:
+                    writer.writerow(row + padding)
+
+    _atomic_rewrite(output_file, migrate)
+    print(f"Added columns to {output_file}: {missing_columns}")
+    return new_header
+
+def append_race(output_file, row_data, players):
+    """
+    Append a single race to the race log without reading the existing rows.
+    :param output_file: Path to results.csv.
+    :param row_data: Dict of column name -> value for the race. Missing columns are written as "DNR".
+    :param players: Current player names, used to migrate the header if new players were added.
+    The personal-best index next to the race log is updated with the new race.
+    """
+    header = initialize_csv(output_file, players)
+    unknown_columns = [col for col in row_data if col not in header]
+    if unknown_columns:
+        raise ValueError(f"Columns not in {output_file}: {unknown_columns}")
+
+    row = [row_data.get(col, DNR) for col in header]
+
+    # Make sure a previous interrupted write didn't leave the last line unterminated
+    with open(output_file, "rb") as file:
+        file.seek(-1, os.SEEK_END)
+        needs_newline = file.read(1) != b"\n"
+
+    # End the row like the existing lines, so the file never mixes line endings
+    lineterminator = atomic_file.line_terminator(output_file)
+
+    results_key_before = [os.stat(output_file).st_size, os.stat(output_file).st_mtime_ns]
+    with open(output_file, "a", newline="", encoding="utf-8") as file:
+        if needs_newline:
+            file.write(lineterminator)
+        csv.writer(file, lineterminator=lineterminator).writerow(row)
+        _fsync_write(file)
+
+    # The race is safely logged; a failed index update only means analysis.py rebuilds it
+    try:
+        personal_bests.record_race(output_file, row_data, players, results_key_before)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not update the personal-best index: {e}")
@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import filecmp
+import argparse
+import tempfile
+import results_store
+import build_manifest
+import atomic_file
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+results_json_file = os.path.join(base_dir, "output/results.json")
+
+# Constants
+DNR = "DNR"
+CHUNK_ROWS = 2000  # Rows of results.csv read and written at a time
+FORMATS = {
+    "indented": "One object per race, indented like json.dumps(indent=4)",
+    "compact": "One object per race without whitespace (same keys as indented)",
+    "columnar": "Race and entry arrays (one entry per player per race, placements and times as integers)",
+}
+
+def _cell_fragments(column, key_prefix):
+    """
+    '"key": value' for every cell of a results column, or "" where the cell is DNR or empty.
+    Each distinct value is JSON-encoded once, so a chunk costs one factorize per column.
+    """
+    codes, uniques = pd.factorize(column.to_numpy())
+    fragments = np.array([f"{key_prefix}{json.dumps(value)}" for value in uniques] + [""], dtype=object)
+    dropped = pd.Series(uniques).isin([DNR, ""]).to_numpy()
+    fragments[:-1][dropped] = ""
+    return fragments[codes]
+
+def _record_texts(chunk, indent):
+    """Encode every race in chunk as a JSON object string, without DNR fields."""
+    if indent:
+        key_prefix, field_separator = " " * 8, ",\n"
+    else:
+        key_prefix, field_separator = "", ","
+    key_separator = ": " if indent else ":"
+    fragments = np.column_stack([
+        _cell_fragments(chunk[column], f"{key_prefix}{json.dumps(column)}{key_separator}") for column in chunk.columns
+    ]) if len(chunk.columns) else np.empty((len(chunk), 0), dtype=object)
+
+    records = []
+    for row in fragments:
+        fields = field_separator.join(fragment for fragment in row if fragment)
+        if not fields:
+            records.append("    {}" if indent else "{}")
+        elif indent:
+            records.append(f"    {{\n{fields}\n    }}")
+        else:
+            records.append(f"{{{fields}}}")
+    return records
+
+def write_records(results_file, json_file, indent=True):
+    """
+    Stream results.csv into a JSON array of races, CHUNK_ROWS at a time.
+    Cells are read as text, so values come out exactly as logged.
+    """
+    separator = ",\n" if indent else ","
+    written = 0
+    with open(json_file, "w") as output:
+        output.write("[")
+        for chunk in pd.read_csv(results_file, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+            records = _record_texts(chunk, indent)
+            if records:
+                output.write(separator if written else ("\n" if indent else ""))
+                output.write(separator.join(records))
+                written += len(records)
+        output.write("\n]" if indent and written else "]")
+    return written
+
+def write_columnar(results_file, json_file):
+    """
+    Write the long-format store as parallel arrays: races (Date, Time, Map) and one entry per
+    player per race. Kart, player and map names are given once and referenced by index.
+    """
+    store = results_store.load_results(results_file)
+    map_codes, map_names = pd.factorize(store.races["Map Name"].astype(str))
+    entries = store.entries
+    with open(json_file, "w") as output:
+        output.write("{")
+        sections = [
+            ("Players", store.players),
+            ("Maps", map_names.tolist()),
+            ("Karts", store.karts),
+            ("Date", store.races["Date"].tolist()),
+            ("Time", store.races["Time"].tolist()),
+            ("Map", map_codes.tolist()),
+            ("Race", entries["race_id"].tolist()),
+            ("Player", entries["player_id"].tolist()),
+            ("Placement", entries["placement"].tolist()),
+            ("Kart", entries["kart_id"].tolist()),
+            ("Racetime ms", entries["racetime_ms"].tolist()),
+        ]
+        for index, (key, values) in enumerate(sections):
+            output.write(("," if index else "") + json.dumps(key) + ":" + json.dumps(values, separators=(",", ":")))
+        output.write("}")
+    return store.num_races
+
+def convert_results_to_json(results_file=results_file, json_file=results_json_file, results_format="indented"):
+    """
+    Convert results.csv to results.json in the given format (see FORMATS).
+    The file is written next to json_file first and only replaces it if the content changed.
+    :return: True if json_file was (re)written.
+    """
+    if results_format not in FORMATS:
+        raise ValueError(f"Unknown results.json format {results_format!r} (expected one of {', '.join(FORMATS)})")
+    directory = os.path.dirname(os.path.abspath(json_file))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        if results_format == "columnar":
+            write_columnar(results_file, temp_path)
+        else:
+            write_records(results_file, temp_path, indent=results_format == "indented")
+        if not build_manifest.forced() and os.path.exists(json_file) and filecmp.cmp(temp_path, json_file, shallow=False):
+            os.remove(temp_path)
+            return False
+        atomic_file.replace(temp_path, json_file)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert results.csv to JSON.")
+    parser.add_argument("--format", choices=list(FORMATS), default="indented",
+                        help="; ".join(f"{name}: {description}" for name, description in FORMATS.items()))
+    parser.add_argument("--output", default=results_json_file, help="Where to write the JSON.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if convert_results_to_json(results_file, args.output, args.format):
+        print(f"Results saved to {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        print(f"{args.output} is already up to date.")
+
+if __name__ == "__main__":
+    main()
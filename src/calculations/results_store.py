@@ -0,0 +1,297 @@
+import pandas as pd
+import numpy as np
+import os
+import hashlib
+import tempfile
+from dataclasses import dataclass
+import racetime
+
+# Base directory and file paths
+base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+results_file = os.path.join(base_dir, "output/results.csv")
+
+# Constants
+RACE_COLUMNS = ["Date", "Time", "Map Name"]
+PLAYER_FIELDS = ["Placement", "Kart", "Racetime"]
+DNR = "DNR"
+MISSING_ID = racetime.MISSING  # kart_id / racetime_ms when a player raced but the cell is empty or unreadable
+
+# Entry columns and their storage types
+ENTRY_DTYPES = {
+    "race_id": np.int32,
+    "player_id": np.int16,
+    "placement": np.int8,
+    "kart_id": np.int16,
+    "racetime_ms": np.int32,
+}
+
+# Bump when the cached arrays change shape/meaning so old caches are ignored
+CACHE_VERSION = 1
+
+@dataclass
+class RaceStore:
+    """
+    Long-format race results: one row in `entries` per player per race, instead of
+    one "{player} Placement/Kart/Racetime" triplet per player per race.
+    races:   DataFrame indexed by race_id with Date, Time, Map Name (row order of results.csv).
+    entries: DataFrame of race_id, player_id, placement, kart_id, racetime_ms (see ENTRY_DTYPES).
+    players: Player names, indexed by player_id (results.csv column order).
+    karts:   Kart names, indexed by kart_id.
+    """
+    races: pd.DataFrame
+    entries: pd.DataFrame
+    players: list
+    karts: list
+
+    @property
+    def num_races(self):
+        return len(self.races)
+
+def players_in_header(columns):
+    """Return the players that have a Placement column, in column order."""
+    suffix = " Placement"
+    return [col[:-len(suffix)] for col in columns if col.endswith(suffix)]
+
+def to_long(results, players=None):
+    """
+    Convert a wide results DataFrame (as read from results.csv) into a RaceStore.
+    :param results: Wide results DataFrame.
+    :param players: Optional player order; defaults to the players found in the header.
+    :return: RaceStore.
+    """
+    if players is None:
+        players = players_in_header(results.columns)
+    players = list(players)
+
+    races = results[RACE_COLUMNS].copy() if len(results.columns) else pd.DataFrame(columns=RACE_COLUMNS)
+    races.index = pd.RangeIndex(len(races), name="race_id")
+    races["Map Name"] = races["Map Name"].astype("category")
+
+    frames = []
+    for player_id, player in enumerate(players):
+        placement_col = f"{player} Placement"
+        if placement_col not in results.columns:
+            continue
+        placements = results[placement_col]
+        raced = (placements.notna() & ~placements.astype(str).isin([DNR, ""])).to_numpy()
+        if not raced.any():
+            continue
+        frames.append(pd.DataFrame({
+            "race_id": np.flatnonzero(raced),
+            "player_id": player_id,
+            "placement": placements[raced].astype(int).to_numpy(),
+            "kart": results[f"{player} Kart"][raced].to_numpy(),
+            "racetime_ms": racetime.parse_ms(results[f"{player} Racetime"][raced]),
+        }))
+
+    if frames:
+        entries = pd.concat(frames, ignore_index=True)
+    else:
+        entries = pd.DataFrame({"race_id": [], "player_id": [], "placement": [], "kart": [], "racetime_ms": []})
+
+    # Encode karts as ids in order of first appearance
+    kart_names = entries["kart"].where(~entries["kart"].isin([DNR, ""]))
+    kart_codes, karts = pd.factorize(kart_names)
+    entries = entries.drop(columns="kart")
+    entries["kart_id"] = kart_codes
+
+    # Race order first, then finishing order within a race
+    entries = entries.sort_values(["race_id", "placement"], kind="stable", ignore_index=True)
+    entries = entries[list(ENTRY_DTYPES)].astype(ENTRY_DTYPES)
+
+    return RaceStore(races=races, entries=entries, players=players, karts=list(karts))
+
+def to_wide(store):
+    """
+    Rebuild the legacy wide DataFrame ("DNR" for players who didn't race) from a RaceStore.
+    Placements and racetimes come back as strings, as they are in results.csv.
+    """
+    num_races = store.num_races
+    entries = store.entries
+    race_ids = entries["race_id"].to_numpy()
+    player_ids = entries["player_id"].to_numpy()
+
+    placements = entries["placement"].astype(str).to_numpy(dtype=object)
+    kart_ids = entries["kart_id"].to_numpy()
+    kart_lookup = np.array(list(store.karts) + [DNR], dtype=object)
+    karts = kart_lookup[np.where(kart_ids == MISSING_ID, len(store.karts), kart_ids)]
+    racetime_ms = entries["racetime_ms"].to_numpy()
+    racetimes = np.where(racetime_ms == MISSING_ID, DNR, racetime.format_ms(racetime_ms))
+
+    wide = {col: store.races[col].to_numpy(dtype=object) for col in RACE_COLUMNS}
+    for player_id, player in enumerate(store.players):
+        mine = player_ids == player_id
+        for field, values in zip(PLAYER_FIELDS, (placements, karts, racetimes)):
+            column = np.full(num_races, DNR, dtype=object)
+            column[race_ids[mine]] = values[mine]
+            wide[f"{player} {field}"] = column
+
+    return pd.DataFrame(wide)
+
+def select_players(store, players):
+    """
+    The same races with player ids renumbered to the given player order, like to_long(results, players):
+    entries of players not in the list are dropped.
+    """
+    players = list(players)
+    if players == store.players:
+        return store
+    player_ids = pd.Index(players).get_indexer(store.players)[store.entries["player_id"].to_numpy()]
+    listed = player_ids >= 0
+    entries = store.entries[listed].assign(player_id=player_ids[listed].astype(ENTRY_DTYPES["player_id"]))
+    entries = entries.sort_values(["race_id", "placement", "player_id"], kind="stable", ignore_index=True)
+    return RaceStore(races=store.races, entries=entries, players=players, karts=store.karts)
+
+def as_store(results, players=None):
+    """
+    A RaceStore for results given either as a RaceStore (shared between stages, nothing is parsed)
+    or as a wide results DataFrame.
+    :param players: Optional player order for the ids; defaults to the store's / header's players.
+    """
+    if isinstance(results, RaceStore):
+        return results if players is None else select_players(results, players)
+    return to_long(results, players)
+
+def num_races(results):
+    """Number of races in a RaceStore or a wide results DataFrame."""
+    return results.num_races if isinstance(results, RaceStore) else len(results)
+
+def entry_pairs(race_ids):
+    """
+    Every ordered pair (left, right) of different entries in the same race, without a loop over races.
+    :param race_ids: Race of each entry, sorted (as in RaceStore.entries).
+    :return: (left, right) int arrays of positions in race_ids.
+    """
+    race_ids = np.asarray(race_ids)
+    if not len(race_ids):
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+    race_starts = np.flatnonzero(np.r_[True, race_ids[1:] != race_ids[:-1]])
+    race_sizes = np.diff(np.r_[race_starts, len(race_ids)])
+    entry_race = np.repeat(np.arange(len(race_starts)), race_sizes)
+
+    # Each entry is paired with every entry of its race: repeat it race-size times, then count through the race
+    pairs_per_entry = race_sizes[entry_race]
+    left = np.repeat(np.arange(len(race_ids)), pairs_per_entry)
+    block_starts = np.repeat(np.cumsum(pairs_per_entry) - pairs_per_entry, pairs_per_entry)
+    right = race_starts[entry_race[left]] + (np.arange(len(left)) - block_starts)
+    different = left != right
+    return left[different], right[different]
+
+def write_wide_csv(store, output_file):
+    """Write a RaceStore out in the legacy results.csv layout."""
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    to_wide(store).to_csv(output_file, index=False)
+
+def read_results(results_file, players=None):
+    """Parse results.csv into a RaceStore."""
+    if not os.path.exists(results_file) or os.stat(results_file).st_size == 0:
+        return to_long(pd.DataFrame(columns=RACE_COLUMNS), players)
+    return to_long(pd.read_csv(results_file, dtype=str, keep_default_na=False), players)
+
+def entries_with_names(store):
+    """Return the entries joined with race info and player/kart names, for groupby-style analysis."""
+    entries = store.entries
+    named = entries.copy()
+    named["Player"] = pd.Categorical.from_codes(entries["player_id"], categories=store.players)
+    named["Kart"] = pd.Categorical.from_codes(entries["kart_id"], categories=store.karts)
+    named["Date"] = store.races["Date"].to_numpy()[entries["race_id"].to_numpy()]
+    named["Map Name"] = store.races["Map Name"].to_numpy()[entries["race_id"].to_numpy()]
+    return named
+
+def _file_key(path):
+    """Cheap change detection: size and modification time of a file."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+def _file_hash(path):
+    """SHA-1 of a file's contents, used when size matches but mtime doesn't (e.g. after a git checkout)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cache_path(results_file):
+    name = os.path.splitext(os.path.basename(results_file))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(results_file)), "cache", f"{name}_store.npz")
+
+def _write_cache(store, cache_file, size, mtime_ns, file_hash):
+    """Save a RaceStore's typed columns as an .npz next to results.csv (atomically)."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    races = store.races
+    map_names = races["Map Name"].astype("category")
+    arrays = {
+        "version": np.array(CACHE_VERSION),
+        "size": np.array(size, dtype=np.int64),
+        "mtime_ns": np.array(mtime_ns, dtype=np.int64),
+        "hash": np.array(file_hash),
+        "date": races["Date"].to_numpy(dtype=str),
+        "time": races["Time"].to_numpy(dtype=str),
+        "map_codes": map_names.cat.codes.to_numpy(),
+        "map_names": np.array(list(map_names.cat.categories), dtype=str),
+        "players": np.array(store.players, dtype=str),
+        "karts": np.array(store.karts, dtype=str),
+    }
+    for col in ENTRY_DTYPES:
+        arrays[col] = store.entries[col].to_numpy()
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, cache_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _read_cache(cache_file):
+    """Load a cached RaceStore plus its (size, mtime_ns, hash) key. Returns (None, None) if unusable."""
+    if not os.path.exists(cache_file):
+        return None, None
+    try:
+        with np.load(cache_file, allow_pickle=False) as cached:
+            if int(cached["version"]) != CACHE_VERSION:
+                return None, None
+            key = (int(cached["size"]), int(cached["mtime_ns"]), str(cached["hash"]))
+            races = pd.DataFrame({
+                "Date": cached["date"].astype(object),
+                "Time": cached["time"].astype(object),
+                "Map Name": pd.Categorical.from_codes(cached["map_codes"], categories=cached["map_names"].tolist()),
+            })
+            races.index = pd.RangeIndex(len(races), name="race_id")
+            entries = pd.DataFrame({col: cached[col].astype(dtype) for col, dtype in ENTRY_DTYPES.items()})
+            store = RaceStore(races=races, entries=entries,
+                              players=cached["players"].tolist(), karts=cached["karts"].tolist())
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Ignoring unreadable results cache {cache_file}: {e}")
+        return None, None
+    return store, key
+
+def load_results(results_file=results_file, cache_file=None):
+    """
+    Load results.csv as a RaceStore, parsing the CSV only when it changed since the last load.
+    The parsed store is cached as an .npz keyed on the CSV's size, mtime and SHA-1.
+    :param results_file: Path to results.csv.
+    :param cache_file: Path of the .npz cache; defaults to output/cache/<name>_store.npz.
+    :return: RaceStore (players in results.csv column order).
+    """
+    if not os.path.exists(results_file) or os.stat(results_file).st_size == 0:
+        return read_results(results_file)
+    if cache_file is None:
+        cache_file = _cache_path(results_file)
+
+    size, mtime_ns = _file_key(results_file)
+    store, key = _read_cache(cache_file)
+    if store is not None and key[:2] == (size, mtime_ns):
+        return store
+
+    # Same size but touched: only re-parse if the contents really changed
+    file_hash = _file_hash(results_file)
+    if store is not None and key[0] == size and key[2] == file_hash:
+        _write_cache(store, cache_file, size, mtime_ns, file_hash)
+        return store
+
+    store = read_results(results_file)
+    _write_cache(store, cache_file, size, mtime_ns, file_hash)
+    return store
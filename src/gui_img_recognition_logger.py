@@ -21,6 +21,11 @@ MAX_RACERS=8
 # Get the directory of the current script
 script_dir = os.path.dirname(__file__)
 
+# Shared race log writer lives alongside the analysis scripts
+sys.path.append(os.path.join(script_dir, "calculations"))
+import race_log
+import racetime
+
 # Add the `yolov5` directory to `sys.path` as a root for its submodules
 yolov5_path = os.path.join(script_dir, "model/yolov5")
 sys.path.append(yolov5_path)
@@ -185,34 +190,7 @@ maps_with_empty = ["-- Select --"] + maps
 
 # Initialize output CSV and ensure columns are aligned with the players list
 def initialize_csv():
-    # Define the expected columns based on the current players.csv file
-    expected_columns = ["Date", "Time", "Map Name"]  # Start with static columns
-    
-    # Add player-specific columns in the desired order
-    for player in players:
-        expected_columns.extend([
-            f"{player} Placement",
-            f"{player} Kart",
-            f"{player} Racetime"
-        ])
-
-    if not os.path.exists(output_file) or os.stat(output_file).st_size == 0:
-        # If the file doesn't exist, create it with the correct columns
-        pd.DataFrame(columns=expected_columns).to_csv(output_file, index=False)
-    else:
-        # Read the existing file
-        existing_df = pd.read_csv(output_file)
-
-        # Check for missing columns
-        missing_columns = [col for col in expected_columns if col not in existing_df.columns]
-
-        # Add missing columns with default "DNR" values
-        if missing_columns:
-            for col in missing_columns:
-                existing_df[col] = "DNR"
-
-            # Save the updated DataFrame back to the file
-            existing_df.to_csv(output_file, index=False)
+    race_log.initialize_csv(output_file, players)
 
 initialize_csv()
 
@@ -286,8 +264,7 @@ def save_data():
     # Construct a list of placement and race time objects
     for player, data in selected_players.items():
         placement = int(data["Placement"])
-        race_time_parts = data["Racetime"].split(":")
-        current_time = float(race_time_parts[0]) * 60 + float(race_time_parts[1])
+        current_time = racetime.to_ms(data["Racetime"]) / 1000
 
         race_data.append({"Placement": placement, "Race Time": current_time})
 
@@ -316,27 +293,8 @@ def save_data():
             row_data[f"{player} Kart"] = "DNR"
             row_data[f"{player} Racetime"] = "DNR"
 
-    # Append data to results CSV
-    try:
-        results_df = pd.read_csv(output_file)
-    except pd.errors.EmptyDataError:
-        results_df = pd.DataFrame()
-
-    # Ensure columns are updated with any new players
-    expected_columns = ["Date", "Time", "Map Name"] + \
-                       [f"{player} Placement" for player in players] + \
-                       [f"{player} Kart" for player in players] + \
-                       [f"{player} Racetime" for player in players]
-
-    for col in expected_columns:
-        if col not in results_df.columns:
-            results_df[col] = "DNR"
-
-    new_row_df = pd.DataFrame([row_data])
-    results_df = pd.concat([results_df, new_row_df], ignore_index=True)
-
-    # Save back to file
-    results_df.to_csv(output_file, index=False)
+    # Append data to results CSV (migrates the header first if new players were added)
+    race_log.append_race(output_file, row_data, players)
     status_label.config(text="Race logged successfully!", fg="green")
 
     # Reset inputs
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Make the analysis modules importable
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+
+import race_log
+import elo_analysis
+import leaderboards
+import racetime
+import results_json
+import kart_analysis
+import kart_stats
+import plackett_luce
+import results_store
+from itertools import combinations
+
+# ANSI escape codes for colors
+GREEN = "\033[32m"
+RESET = "\033[0m"
+
+# Synthetic data settings
+PLAYERS = [f"Player{i}" for i in range(13)]
+MAPS = ["Shanghai", "Shanghai by Night", "Snowville", "Formula Wild"]
+KARTS = ["The Kart", "Puppy", "Monstro", "Minecart", "Snowmobile", "Bat Kart"]
+MAX_RACERS = 8
+
+def generate_results(num_races, seed=0, ranked=False):
+    """
+    Build a synthetic results DataFrame with num_races rows in the logger's wide format.
+    :param ranked: Order each race by Plackett-Luce draws from fixed player and kart skills
+                   instead of at random, so the races carry strengths to fit.
+    """
+    rng = np.random.default_rng(seed)
+    player_skill = np.linspace(-1.5, 1.5, len(PLAYERS))
+    kart_skill = np.linspace(-1.0, 1.0, len(KARTS))
+    columns = race_log.expected_columns(PLAYERS)
+    data = {col: np.full(num_races, "DNR", dtype=object) for col in columns}
+    data["Date"] = pd.date_range("2024-10-27", periods=num_races, freq="15min").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    data["Time"] = pd.date_range("2024-10-27", periods=num_races, freq="15min").strftime("%H:%M:%S").to_numpy(dtype=object)
+    data["Map Name"] = rng.choice(MAPS, size=num_races).astype(object)
+
+    for race in range(num_races):
+        num_known = rng.integers(1, MAX_RACERS + 1)
+        racers = rng.choice(len(PLAYERS), size=num_known, replace=False)
+        placements = np.sort(rng.choice(np.arange(1, MAX_RACERS + 1), size=num_known, replace=False))
+        if ranked:
+            karts = rng.integers(len(KARTS), size=num_known)
+            order = np.argsort(-(player_skill[racers] + kart_skill[karts] + rng.gumbel(size=num_known)))
+            racers, karts = racers[order], karts[order]
+        for index, (player_idx, placement) in enumerate(zip(racers, placements)):
+            player = PLAYERS[player_idx]
+            seconds = 110 + placement * 1.5 + rng.random() * 5
+            data[f"{player} Placement"][race] = str(placement)
+            data[f"{player} Kart"][race] = KARTS[karts[index] if ranked else rng.integers(len(KARTS))]
+            data[f"{player} Racetime"][race] = f"{int(seconds // 60)}:{seconds % 60:05.2f}"
+
+    return pd.DataFrame(data, columns=columns)
+
+def generate_results_csv(path, num_races, seed=0):
+    """Write a synthetic results.csv with num_races rows."""
+    generate_results(num_races, seed).to_csv(path, index=False)
+
+def _sample_row():
+    return {"Date": "2025-01-01", "Time": "12:00:00", "Map Name": "Shanghai",
+            "Player0 Placement": "1", "Player0 Kart": "The Kart", "Player0 Racetime": "1:55.00"}
+
+def _legacy_save(output_file, row_data):
+    """The read/concat/rewrite that save_data() used to do on every logged race."""
+    results_df = pd.read_csv(output_file)
+    results_df = pd.concat([results_df, pd.DataFrame([row_data])], ignore_index=True)
+    results_df.to_csv(output_file, index=False)
+
+def benchmark_race_log(history_sizes=(1_000, 10_000, 100_000), appends=20):
+    """Time logging one race against histories of increasing size."""
+    print(f"\n{GREEN}Race log append ({appends} appends per history size){RESET}")
+    print(f"{'History':>10} {'append_race (ms)':>18} {'legacy save (ms)':>18}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for num_races in history_sizes:
+            output_file = os.path.join(temp_dir, f"results_{num_races}.csv")
+            generate_results_csv(output_file, num_races)
+
+            start = time.perf_counter()
+            for _ in range(appends):
+                race_log.append_race(output_file, _sample_row(), PLAYERS)
+            append_ms = (time.perf_counter() - start) / appends * 1000
+
+            # The legacy path is linear in history, so time a single save
+            start = time.perf_counter()
+            _legacy_save(output_file, _sample_row())
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{num_races:>10} {append_ms:>18.2f} {legacy_ms:>18.2f}")
+
+def _legacy_tracker(results, players):
+    """The per-race pd.concat that process_races() used to build the Elo tracker with."""
+    elo_tracker = pd.DataFrame(columns=["Date", "Time", "Map Name"] + players)
+    for _, race in results.iterrows():
+        new_row = {"Date": race["Date"], "Time": race["Time"], "Map Name": race["Map Name"],
+                   **{player: 1000.0 for player in players}}
+        if elo_tracker.empty:
+            elo_tracker = pd.DataFrame([new_row])
+        else:
+            elo_tracker = pd.concat([elo_tracker, pd.DataFrame([new_row])], ignore_index=True)
+    return elo_tracker
+
+def benchmark_elo_replay(sizes=(1_000, 10_000, 100_000), legacy_max=10_000):
+    """Time a full Elo replay over synthetic histories; flat time per race means linear scaling."""
+    print(f"\n{GREEN}Elo replay (full history){RESET}")
+    print(f"{'Races':>10} {'replay (s)':>12} {'us/race':>10} {'legacy tracker concat (s)':>27}")
+    for num_races in sizes:
+        results = generate_results(num_races)
+        state = elo_analysis.initial_elo_state(PLAYERS)
+
+        start = time.perf_counter()
+        elo_analysis.replay_races(results, PLAYERS, state)
+        seconds = time.perf_counter() - start
+
+        legacy = ""
+        if num_races <= legacy_max:
+            start = time.perf_counter()
+            _legacy_tracker(results, PLAYERS)
+            legacy = f"{time.perf_counter() - start:.2f}"
+
+        print(f"{num_races:>10} {seconds:>12.2f} {seconds / num_races * 1e6:>10.1f} {legacy:>27}")
+
+def benchmark_leaderboards(sizes=(1_000, 10_000, 100_000)):
+    """Time building the race-time leaderboards from scratch vs. resuming the checkpoint after one newly logged race."""
+    print(f"\n{GREEN}Leaderboards (full build vs checkpoint refresh after one new race){RESET}")
+    print(f"{'Races':>10} {'full build (s)':>16} {'refresh (ms)':>14}")
+    checkpoint_file = leaderboards.leaderboard_checkpoint_file
+    with tempfile.TemporaryDirectory() as temp_dir:
+        leaderboards.leaderboard_checkpoint_file = os.path.join(temp_dir, "leaderboards.json")
+        try:
+            for num_races in sizes:
+                results_file = os.path.join(temp_dir, f"results_{num_races}.csv")
+                generate_results_csv(results_file, num_races)
+                if os.path.exists(leaderboards.leaderboard_checkpoint_file):
+                    os.remove(leaderboards.leaderboard_checkpoint_file)
+
+                history = results_store.read_results(results_file, PLAYERS)
+                start = time.perf_counter()
+                leaderboards.load_leaderboards(history, PLAYERS, MAPS, results_file)
+                full_seconds = time.perf_counter() - start
+
+                race_log.append_race(results_file, _sample_row(), PLAYERS)
+                store = results_store.read_results(results_file, PLAYERS)
+                start = time.perf_counter()
+                boards = leaderboards.load_leaderboards(store, PLAYERS, MAPS, results_file)
+                refresh_ms = (time.perf_counter() - start) * 1000
+                assert boards.races_processed == num_races + 1
+
+                print(f"{num_races:>10} {full_seconds:>16.2f} {refresh_ms:>14.2f}")
+        finally:
+            leaderboards.leaderboard_checkpoint_file = checkpoint_file
+
+def _legacy_parse_seconds(racetimes):
+    """The per-cell split(":") parse that the loggers and kart_analysis used to do."""
+    seconds = []
+    for text in racetimes:
+        if text == "DNR":
+            continue
+        time_parts = text.split(":")
+        seconds.append(float(time_parts[0]) * 60 + float(time_parts[1]))
+    return seconds
+
+def benchmark_racetime_parsing(sizes=(10_000, 100_000, 1_000_000)):
+    """Time parsing a column of racetimes with racetime.parse_ms() vs. the per-cell split."""
+    print(f"\n{GREEN}Racetime parsing (one column){RESET}")
+    print(f"{'Cells':>10} {'parse_ms (ms)':>15} {'per-cell split (ms)':>21}")
+    rng = np.random.default_rng(0)
+    for num_cells in sizes:
+        seconds = 110 + rng.random(num_cells) * 60
+        racetimes = pd.Series([f"{int(s // 60)}:{s % 60:05.2f}" for s in seconds], dtype=object)
+        racetimes[rng.random(num_cells) < 0.4] = "DNR"
+
+        start = time.perf_counter()
+        racetime.parse_ms(racetimes)
+        vectorized_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        _legacy_parse_seconds(racetimes)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{num_cells:>10} {vectorized_ms:>15.1f} {legacy_ms:>21.1f}")
+
+def _legacy_results_json(results_file, json_file):
+    """The read/to_dict/dumps(indent=4) that convert_results_to_json() used to do."""
+    results_df = pd.read_csv(results_file)
+    filtered = [{key: value for key, value in row.items() if not (isinstance(value, str) and value == "DNR")}
+                for row in results_df.to_dict(orient="records")]
+    with open(json_file, "w") as output:
+        output.write(json.dumps(filtered, indent=4))
+
+def benchmark_results_json(sizes=(1_000, 10_000, 100_000)):
+    """Size and generation time of results.json in each format vs. the legacy writer."""
+    names = ["legacy"] + list(results_json.FORMATS)
+    print(f"\n{GREEN}results.json (size in KB, time in s){RESET}")
+    print(f"{'Races':>10}" + "".join(f" {name:>16}" for name in names))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for num_races in sizes:
+            results_file = os.path.join(temp_dir, f"results_{num_races}.csv")
+            generate_results_csv(results_file, num_races)
+            row = f"{num_races:>10}"
+            writers = [("legacy", lambda path: _legacy_results_json(results_file, path))] + [
+                (results_format, lambda path, results_format=results_format:
+                    results_json.convert_results_to_json(results_file, path, results_format))
+                for results_format in results_json.FORMATS
+            ]
+            for name, writer in writers:
+                json_file = os.path.join(temp_dir, f"{name}.json")
+                start = time.perf_counter()
+                writer(json_file)
+                seconds = time.perf_counter() - start
+                row += f" {os.path.getsize(json_file) / 1024:>9.0f} {seconds:>6.2f}"
+                os.remove(json_file)
+            print(row)
+
+def _legacy_kart_pairwise(results, maps_list, karts_list):
+    """The iterrows()/combinations() dict-of-dicts that generate_kart_pairwise_comparisons() used to fill."""
+    kart_comparison_data = {}
+    for map_name in maps_list:
+        kart_wins = {kart: {other_kart: "DNR" for other_kart in karts_list} for kart in karts_list}
+        for _, race in results[results["Map Name"] == map_name].iterrows():
+            kart_placements = []
+            for i in range(3, len(race), 3):
+                kart_name, placement = race[race.index[i + 1]], race[race.index[i]]
+                if kart_name != "DNR" and placement != "DNR":
+                    kart_placements.append((kart_name, int(placement)))
+            for (kart_a, placement_a), (kart_b, placement_b) in combinations(kart_placements, 2):
+                if kart_wins[kart_a][kart_b] == "DNR":
+                    kart_wins[kart_a][kart_b] = 0
+                if kart_wins[kart_b][kart_a] == "DNR":
+                    kart_wins[kart_b][kart_a] = 0
+                if placement_a < placement_b:
+                    kart_wins[kart_a][kart_b] += 1
+                elif placement_b < placement_a:
+                    kart_wins[kart_b][kart_a] += 1
+        kart_comparison_data[map_name] = kart_wins
+    return kart_comparison_data
+
+def benchmark_kart_pairwise(sizes=(1_000, 10_000, 100_000), legacy_max=10_000):
+    """Time the kart pairwise count matrices (and their JSON) against the legacy dict-of-dicts loop."""
+    print(f"\n{GREEN}Kart pairwise comparisons{RESET}")
+    print(f"{'Races':>10} {'count matrices + JSON (s)':>27} {'legacy loop (s)':>17}")
+    for num_races in sizes:
+        results = generate_results(num_races)
+
+        start = time.perf_counter()
+        wins, met = kart_analysis.kart_pairwise_counts(results, MAPS, KARTS)
+        data = kart_analysis.kart_comparison_json(wins, met, MAPS, KARTS)
+        seconds = time.perf_counter() - start
+
+        legacy = ""
+        if num_races <= legacy_max:
+            start = time.perf_counter()
+            assert _legacy_kart_pairwise(results, MAPS, KARTS) == data
+            legacy = f"{time.perf_counter() - start:.2f}"
+
+        print(f"{num_races:>10} {seconds:>27.3f} {legacy:>17}")
+
+def _loop_bootstrap_win_rates(results, map_name, replicates, seed=0):
+    """Win rate intervals one replicate at a time: resample the map's races and recount the pairs."""
+    races = results[results["Map Name"] == map_name]
+    rng = np.random.default_rng(seed)
+    replicate_rates = []
+    for _ in range(replicates):
+        resampled = races.iloc[rng.integers(0, len(races), size=len(races))]
+        wins, _ = kart_analysis.kart_pairwise_counts(resampled, [map_name], KARTS)
+        replicate_rates.append(kart_stats.win_rates(wins[0]))
+    return np.nanpercentile(replicate_rates, [2.5, 97.5], axis=0)
+
+def benchmark_kart_stats(sizes=(1_000, 10_000, 100_000), replicates=kart_stats.REPLICATES, loop_replicates=10):
+    """Time the batched kart bootstrap against resampling and recounting one replicate at a time."""
+    print(f"\n{GREEN}Kart stats bootstrap ({replicates} replicates){RESET}")
+    print(f"{'Races':>10} {'batched (s)':>13} {f'loop, {loop_replicates} replicates (s)':>28}")
+    for num_races in sizes:
+        results = generate_results(num_races)
+
+        start = time.perf_counter()
+        kart_stats.calculate_kart_stats(results, MAPS, KARTS, replicates=replicates)
+        seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _loop_bootstrap_win_rates(results, MAPS[0], loop_replicates)
+        loop_seconds = (time.perf_counter() - start) * len(MAPS)
+
+        print(f"{num_races:>10} {seconds:>13.3f} {loop_seconds:>28.2f}")
+
+def benchmark_plackett_luce(sizes=(1_000, 10_000, 100_000), session=20):
+    """
+    Time a cold Plackett-Luce fit against refits warm-started from the saved fit state after
+    0 new races, 1 new race and a session of new races.
+    """
+    print(f"\n{GREEN}Plackett-Luce strengths (cold fit, then warm refits after 0, 1 and {session} new races){RESET}")
+    print(f"{'Races':>10} {'cold (s)':>10} {'iterations':>11}" + "".join(f" {f'+{new} (s)':>10} {'iterations':>11}" for new in (0, 1, session)))
+    for num_races in sizes:
+        store = results_store.to_long(generate_results(num_races, ranked=True))
+
+        start = time.perf_counter()
+        cold, cold_state, cold_iterations = plackett_luce.calculate_strengths(store, MAPS, KARTS)
+        row = f"{num_races:>10} {time.perf_counter() - start:>10.3f} {cold_iterations:>11}"
+
+        for new_races in (0, 1, session):
+            earlier = results_store.RaceStore(
+                races=store.races.iloc[:num_races - new_races],
+                entries=store.entries[store.entries["race_id"] < num_races - new_races],
+                players=store.players, karts=store.karts,
+            )
+            _, previous, _ = plackett_luce.calculate_strengths(earlier, MAPS, KARTS) if new_races else (None, cold_state, None)
+
+            start = time.perf_counter()
+            warm, _, warm_iterations = plackett_luce.calculate_strengths(store, MAPS, KARTS, previous)
+            row += f" {time.perf_counter() - start:>10.3f} {warm_iterations:>11}"
+            assert warm == cold
+            if new_races <= 1:
+                assert warm_iterations * 4 <= cold_iterations
+        print(row)
+
+if __name__ == "__main__":
+    benchmark_race_log()
+    benchmark_elo_replay()
+    benchmark_leaderboards()
+    benchmark_racetime_parsing()
+    benchmark_results_json()
+    benchmark_kart_pairwise()
+    benchmark_kart_stats()
+    benchmark_plackett_luce()
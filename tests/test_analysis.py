@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import analysis
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+post_analysis_file = os.path.join(base_dir, "output", "post_analysis.json")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    players = pd.read_csv(os.path.join(base_dir, "data", "players.csv"))
+    with open(post_analysis_file, "r") as json_file:
+        committed = json.load(json_file)
+    return results, players, committed
+
+def _as_json(value):
+    return json.loads(json.dumps(value, default=lambda obj: obj.item()))
+
+def test_daily_stats_match_committed_post_analysis():
+    results, players, committed = _load()
+    daily_stats = analysis.calculate_daily_stats(results, players)
+    assert list(daily_stats) == list(committed["Daily Stats"])
+    assert _as_json(daily_stats) == committed["Daily Stats"]
+
+def test_placement_points_matches_calculate_points():
+    placements = np.arange(-1, 11)
+    assert analysis.placement_points(placements).tolist() == [analysis.calculate_points(p) for p in placements]
+
+def _races_together_from_race_log(races, group):
+    """What main.js used to compute in the browser from results.json for a group of players."""
+    together = [race for race in races if all(race.get(f"{player} Placement", "DNR") != "DNR" for player in group)]
+    stats = {}
+    for player in group:
+        placements = [int(race[f"{player} Placement"]) for race in together]
+        stats[player] = (len(placements), sum(analysis.calculate_points(p) for p in placements), sum(placements))
+    return len(together), stats
+
+def _races_together_from_groups(data, group):
+    """What main.js computes from races_together.json."""
+    indexes = [data["Players"].index(player) for player in group]
+    count, stats = 0, {player: (0, 0, 0) for player in group}
+    for lineup in data["Groups"]:
+        if not all(index in lineup["Players"] for index in indexes):
+            continue
+        count += lineup["Races"]
+        for player, index in zip(group, indexes):
+            position = lineup["Players"].index(index)
+            races, points, placements = stats[player]
+            stats[player] = (races + lineup["Races"], points + lineup["Points"][position],
+                             placements + lineup["Positions"][position])
+    return count, stats
+
+def test_races_together_matches_race_log():
+    results, players, _ = _load()
+    races = [{key: value for key, value in race.items() if value != "DNR"} for race in results.to_dict(orient="records")]
+    data = json.loads(json.dumps(analysis.calculate_races_together(results, players)))
+    names = data["Players"]
+
+    for i, a in enumerate(names):
+        for j, b in enumerate(names):
+            both = [race for race in races if f"{a} Placement" in race and f"{b} Placement" in race]
+            assert data["Races Together"][i][j] == len(both)
+            assert data["Wins"][i][j] == sum(int(race[f"{a} Placement"]) < int(race[f"{b} Placement"]) for race in both)
+
+    # Every pair, plus the largest lineup and each player group inside it
+    largest = max(data["Groups"], key=lambda lineup: len(lineup["Players"]))["Players"]
+    groups = [(a, b) for a in names for b in names if a < b] + [
+        tuple(names[index] for index in largest[:size]) for size in range(3, len(largest) + 1)]
+    for group in groups:
+        assert _races_together_from_groups(data, group) == _races_together_from_race_log(races, group)
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import pytest
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src"))
+import analyze_all
+import build_manifest
+
+def test_stage_dependencies_follow_inputs_and_outputs():
+    assert analyze_all.stage_dependencies() == {
+        "update_js": [],
+        "analysis": [],
+        "publish_analysis": ["analysis"],
+        "elo": [],
+        "publish_elo": ["elo"],
+        "kart": [],
+        "publish_kart": ["kart"],
+    }
+
+def test_selected_stages_include_everything_downstream_in_declaration_order():
+    assert analyze_all.select_stages(["elo"]) == ["elo", "publish_elo"]
+    assert analyze_all.select_stages(["publish_kart", "analysis"]) == ["analysis", "publish_analysis", "publish_kart"]
+    assert analyze_all.select_stages(["update_js"]) == ["update_js"]
+    assert analyze_all.select_stages(list(reversed(analyze_all.STAGES))) == list(analyze_all.STAGES)
+
+def test_parse_args():
+    args = analyze_all.parse_args(["--stages", "kart", "elo", "--jobs", "3", "--force"])
+    assert (args.stages, args.jobs, args.force, args.profile) == (["kart", "elo"], 3, True, False)
+    assert analyze_all.parse_args([]).stages == list(analyze_all.STAGES)
+    with pytest.raises(SystemExit):
+        analyze_all.parse_args(["--stages", "nope"])
+    with pytest.raises(ValueError):
+        analyze_all.run_pipeline(["nope"])
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """
+    A small pipeline: "build" turns source.txt into data.txt plus a graph (through the build manifest,
+    like the graph writers), "publish" copies both, and "other" is independent of them.
+    """
+    monkeypatch.setattr(build_manifest, "manifest_dir", str(tmp_path / "manifest"))
+    monkeypatch.setattr(build_manifest, "_force", False)
+    paths = {name: tmp_path / name for name in ("source.txt", "data.txt", "graphs", "published", "other.txt", "other_out.txt")}
+    paths["graph"] = paths["graphs"] / "graph.png"
+    paths["source.txt"].write_text("race data")
+    paths["other.txt"].write_text("other data")
+    runs = []
+
+    def build():
+        runs.append("build")
+        data = paths["source.txt"].read_text().upper()
+        paths["data.txt"].write_text(data)
+        paths["graphs"].mkdir(exist_ok=True)
+        manifest = build_manifest.load_manifest("test_graphs")
+        if build_manifest.needs_build(manifest, str(paths["graph"]), build_manifest.digest(data)):
+            paths["graph"].write_text(f"graph of {data}")
+            build_manifest.record(manifest, str(paths["graph"]), build_manifest.digest(data))
+        build_manifest.save_manifest("test_graphs", manifest)
+
+    def publish():
+        runs.append("publish")
+        paths["published"].mkdir(exist_ok=True)
+        analyze_all.copy_file(str(paths["data.txt"]), str(paths["published"] / "data.txt"))
+        analyze_all.copy_directory(str(paths["graphs"]), str(paths["published"] / "graphs"))
+
+    def other():
+        runs.append("other")
+        paths["other_out.txt"].write_text(paths["other.txt"].read_text())
+
+    stages = {
+        "build": {"run": build, "inputs": [str(paths["source.txt"])],
+                  "outputs": [str(paths["data.txt"]), str(paths["graphs"])]},
+        "publish": {"run": publish, "inputs": [str(paths["data.txt"]), str(paths["graphs"])],
+                    "outputs": [str(paths["published"])]},
+        "other": {"run": other, "inputs": [str(paths["other.txt"])], "outputs": [str(paths["other_out.txt"])]},
+    }
+    monkeypatch.setattr(analyze_all, "STAGES", stages)
+    return paths, runs
+
+def _run(runs, names=("build", "publish", "other"), force=False):
+    runs.clear()
+    analyze_all.run_stages(list(names), jobs=1, force=force)
+    return list(runs)
+
+def test_second_run_skips_every_stage(pipeline, capsys):
+    paths, runs = pipeline
+    assert analyze_all.select_stages(["build"]) == ["build", "publish"]
+    # Ready stages run before the ones that wait for them
+    assert _run(runs) == ["build", "other", "publish"]
+    capsys.readouterr()
+
+    assert _run(runs) == []
+    assert capsys.readouterr().out.count("inputs unchanged since the last build") == 3
+    assert _run(runs, force=True) == ["build", "other", "publish"]
+
+def test_edited_input_reruns_the_stage_and_its_dependents(pipeline):
+    paths, runs = pipeline
+    _run(runs)
+    paths["source.txt"].write_text("more race data")
+    assert _run(runs) == ["build", "publish"]
+    assert (paths["published"] / "graphs" / "graph.png").read_text() == "graph of MORE RACE DATA"
+
+def test_edited_output_reruns_the_stage(pipeline):
+    paths, runs = pipeline
+    _run(runs)
+    paths["other_out.txt"].write_text("edited")
+    assert _run(runs) == ["other"]
+    assert paths["other_out.txt"].read_text() == "other data"
+
+    # Rebuilding data.txt restores what "publish" last read, so it stays skipped
+    paths["data.txt"].write_text("edited")
+    assert _run(runs) == ["build"]
+    assert paths["data.txt"].read_text() == "RACE DATA"
+
+def test_corrupted_artifact_is_rebuilt(pipeline):
+    paths, runs = pipeline
+    _run(runs)
+    paths["graph"].write_text("garbage")
+    assert _run(runs) == ["build"]
+    assert paths["graph"].read_text() == "graph of RACE DATA"
+    assert (paths["published"] / "graphs" / "graph.png").read_text() == "graph of RACE DATA"
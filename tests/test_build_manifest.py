@@ -0,0 +1,65 @@
+import os
+import sys
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import build_manifest
+
+def _build(manifest, artifact, input_digest, content):
+    """Build the artifact like the graph writers do: only when needs_build says so."""
+    if not build_manifest.needs_build(manifest, str(artifact), input_digest):
+        return False
+    artifact.write_bytes(content)
+    build_manifest.record(manifest, str(artifact), input_digest)
+    return True
+
+def test_artifact_is_rebuilt_only_when_inputs_or_file_change(tmp_path):
+    manifest = {}
+    graph = tmp_path / "graph.png"
+    inputs = build_manifest.digest("code", [1.0, 2.0])
+
+    assert _build(manifest, graph, inputs, b"graph v1")
+    assert not _build(manifest, graph, inputs, b"graph v1")
+
+    # New inputs
+    new_inputs = build_manifest.digest("code", [1.0, 3.0])
+    assert _build(manifest, graph, new_inputs, b"graph v2")
+    assert not _build(manifest, graph, new_inputs, b"graph v2")
+
+    # Overwritten on disk (or an older copy checked out from git)
+    graph.write_bytes(b"garbage")
+    assert _build(manifest, graph, new_inputs, b"graph v2")
+    assert graph.read_bytes() == b"graph v2"
+
+    # Deleted
+    graph.unlink()
+    assert _build(manifest, graph, new_inputs, b"graph v2")
+
+def test_force_and_old_manifest_entries_rebuild(tmp_path, monkeypatch):
+    graph = tmp_path / "graph.png"
+    graph.write_bytes(b"graph")
+    inputs = build_manifest.digest("inputs")
+
+    # Entries from before the file digest was recorded
+    assert build_manifest.needs_build({build_manifest._artifact_key(str(graph)): inputs}, str(graph), inputs)
+
+    manifest = {}
+    build_manifest.record(manifest, str(graph), inputs)
+    assert not build_manifest.needs_build(manifest, str(graph), inputs)
+    monkeypatch.setattr(build_manifest, "_force", True)
+    assert build_manifest.needs_build(manifest, str(graph), inputs)
+
+def test_manifest_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_manifest, "manifest_dir", str(tmp_path / "manifest"))
+    assert build_manifest.load_manifest("graphs") == {}
+
+    graph = tmp_path / "graph.png"
+    graph.write_bytes(b"graph")
+    manifest = {}
+    build_manifest.record(manifest, str(graph), "digest")
+    build_manifest.save_manifest("graphs", manifest)
+    assert not build_manifest.needs_build(build_manifest.load_manifest("graphs"), str(graph), "digest")
+
+    # An unreadable manifest means everything is rebuilt
+    (tmp_path / "manifest" / "graphs.json").write_text("{")
+    assert build_manifest.load_manifest("graphs") == {}
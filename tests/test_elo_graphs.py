@@ -0,0 +1,24 @@
+import os
+import sys
+
+import matplotlib.image as mpimg
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import elo_analysis
+
+def _render(path, player, days, ratings):
+    dates = list(pd.to_datetime(days))
+    elo_analysis.render_elo_graph(player, str(path), dates, ratings, dates[-1:], ratings[-1:])
+    return mpimg.imread(str(path))
+
+def test_reused_figure_renders_like_a_fresh_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(elo_analysis, "_elo_figure", None)
+    _render(tmp_path / "first.png", "A Much Longer Player Name", ["2024-12-01", "2025-03-01"], [900.0, 2400.0])
+    reused = _render(tmp_path / "reused.png", "Raj", ["2025-01-01", "2025-01-02"], [1000.0, 1010.0])
+
+    monkeypatch.setattr(elo_analysis, "_elo_figure", None)
+    fresh = _render(tmp_path / "fresh.png", "Raj", ["2025-01-01", "2025-01-02"], [1000.0, 1010.0])
+    assert np.array_equal(reused, fresh)
@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import elo_analysis
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+players_file = os.path.join(base_dir, "data", "players.csv")
+elo_tracker_file = os.path.join(base_dir, "output", "elo_tracker.csv")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    players = pd.read_csv(players_file)["Player Name"].tolist()
+    return results, players
+
+def test_replay_matches_committed_elo_tracker():
+    results, players = _load()
+    tracker = elo_analysis.replay_races(results, players, elo_analysis.initial_elo_state(players))
+    committed = pd.read_csv(elo_tracker_file, dtype={"Date": str, "Time": str}, float_precision="round_trip")
+
+    assert list(tracker.columns) == list(committed.columns)
+    assert tracker[["Date", "Time", "Map Name"]].equals(committed[["Date", "Time", "Map Name"]])
+    # Bit-for-bit, not approximately
+    assert np.array_equal(tracker[players].to_numpy(), committed[players].to_numpy())
+
+def test_resumed_replay_matches_full_replay():
+    results, players = _load()
+    full = elo_analysis.replay_races(results, players, elo_analysis.initial_elo_state(players))
+
+    state = elo_analysis.initial_elo_state(players)
+    first = elo_analysis.replay_races(results.iloc[:300], players, state)
+    rest = elo_analysis.replay_races(results, players, state)
+    resumed = pd.concat([first, rest], ignore_index=True)
+
+    assert np.array_equal(resumed[players].to_numpy(), full[players].to_numpy())
+
+def test_appended_rows_keep_the_tracker_line_endings(tmp_path):
+    results, players = _load()
+    state = elo_analysis.initial_elo_state(players)
+    first = elo_analysis.replay_races(results.iloc[:300], players, state)
+    rest = elo_analysis.replay_races(results, players, state)
+
+    for line_ending in ("\r\n", "\n"):
+        tracker_file = str(tmp_path / "elo_tracker.csv")
+        with open(tracker_file, "w", newline="") as file:
+            file.write(first.to_csv(index=False, lineterminator=line_ending))
+        elo_analysis.append_tracker_rows(tracker_file, rest)
+
+        with open(tracker_file, "rb") as file:
+            lines = file.read().split(b"\n")
+        assert lines[-1] == b""
+        assert all(line.endswith(b"\r") == (line_ending == "\r\n") for line in lines[:-1])
+        assert len(lines) - 2 == len(first) + len(rest)
+
+def _scalar_changes(slot_elos, slot_scales):
+    """The original per-pair loop over calculate_expected_score."""
+    changes = [0] * len(slot_elos)
+    for i, elo_a in enumerate(slot_elos):
+        for j, elo_b in enumerate(slot_elos):
+            if i != j and slot_scales[i]:
+                actual_a = 1 if i < j else 0
+                changes[i] += slot_scales[i] * (actual_a - elo_analysis.calculate_expected_score(elo_a, elo_b))
+    return changes
+
+def test_kernel_matches_scalar_loop():
+    rng = np.random.default_rng(0)
+    slot_elos = rng.uniform(800, 1400, size=(200, elo_analysis.MAX_RACERS))
+    slot_scales = rng.choice([0.0, 0.3 * 24, 0.997 * 8], size=(200, elo_analysis.MAX_RACERS))
+
+    batched = elo_analysis.pairwise_elo_changes(slot_elos, slot_scales)
+    expected = np.array([_scalar_changes(e.tolist(), s.tolist()) for e, s in zip(slot_elos, slot_scales)], dtype=float)
+    assert np.array_equal(batched, expected)
+    assert np.array_equal(elo_analysis.pairwise_elo_changes(slot_elos[0], slot_scales[0]), expected[0])
+
+def test_batched_settings_match_separate_replays():
+    results, players = _load()
+    slots, participated = elo_analysis.race_tensor(results.iloc[:150], players)
+    start_elo = np.full(len(players), elo_analysis.BASE_ELO, dtype=float)
+    k_factors = np.array([16, 24, 32])
+
+    batched = elo_analysis.replay_elo(slots, np.zeros(len(players), dtype=np.int64), start_elo,
+                                      participated, k_factor_initial=k_factors)
+    assert batched.shape == (150, len(k_factors), len(players))
+    for index, k_factor in enumerate(k_factors):
+        separate = elo_analysis.replay_elo(slots, np.zeros(len(players), dtype=np.int64), start_elo,
+                                           participated, k_factor_initial=k_factor)
+        assert np.array_equal(batched[:, index], separate)
+
+def test_kart_usage_matches_committed_elo_post_analysis():
+    results, players = _load()
+    with open(os.path.join(base_dir, "output", "elo_post_analysis.json"), "r") as json_file:
+        committed = json.load(json_file)["Player Ratings"]
+
+    kart_usage = elo_analysis.process_kart_usage(results, players)
+    assert kart_usage == {player: committed[player]["Kart Usage"] for player in players}
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import elo_analysis
+import elo_sweep
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _results(num_races):
+    return pd.read_csv(results_file, dtype=str, keep_default_na=False).iloc[:num_races]
+
+def test_current_settings_score_matches_replay_races():
+    results = _results(120)
+    slots, participated, players = elo_sweep.load_races(results)
+    current = {"k_factor_initial": elo_analysis.K_FACTOR_INITIAL, "k_factor_after": elo_analysis.K_FACTOR_AFTER,
+               "unknown_player_elo": elo_analysis.UNKNOWN_PLAYER_ELO, "ladder": "current"}
+    score = elo_sweep.score_parameter_sets(slots, participated, [current])[0]
+
+    # Same score from the tracker rows, one race at a time
+    tracker = elo_analysis.replay_races(results, players, elo_analysis.initial_elo_state(players))
+    losses = []
+    for race in range(len(slots)):
+        before = tracker.loc[race - 1, players].to_numpy(dtype=float) if race else np.full(len(players), 1000.0)
+        known = [player_id for player_id in slots[race] if player_id >= 0]
+        for ahead, winner in enumerate(known):
+            for loser in known[ahead + 1:]:
+                losses.append(-np.log(1 / (1 + 10 ** ((before[loser] - before[winner]) / 400))))
+    assert score["pairs"] == len(losses)
+    assert np.isclose(score["log_loss"], np.mean(losses))
+
+def test_sweep_ranks_every_parameter_set(monkeypatch):
+    grid = elo_sweep.parameter_grid([16, 24], [8], [1500, 2000], ["current", "flat"])
+    single_chunk = elo_sweep.run_sweep(grid, results=_results(120))
+    monkeypatch.setattr(elo_sweep, "CHUNK_SIZE", 3)
+    chunked = elo_sweep.run_sweep(grid, results=_results(120))
+
+    assert len(single_chunk) == len(grid)
+    assert single_chunk["log_loss"].is_monotonic_increasing
+    assert single_chunk["current"].sum() == 1
+    pd.testing.assert_frame_equal(single_chunk, chunked)
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import head_to_head
+import racetime
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    players = pd.read_csv(os.path.join(base_dir, "data", "players.csv"))
+    maps = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))
+    return results, players, maps
+
+def _loop_head_to_head(races, player, opponent):
+    """A player's record against an opponent, race by race."""
+    together = [race for race in races if race[f"{player} Placement"] != "DNR" and race[f"{opponent} Placement"] != "DNR"]
+    placement_deltas = [int(race[f"{player} Placement"]) - int(race[f"{opponent} Placement"]) for race in together]
+    time_deltas = []
+    for race in together:
+        player_ms = racetime.to_ms(race[f"{player} Racetime"])
+        opponent_ms = racetime.to_ms(race[f"{opponent} Racetime"])
+        if racetime.MISSING not in (player_ms, opponent_ms):
+            time_deltas.append(player_ms - opponent_ms)
+    if not together:
+        return None
+    return {
+        "Races": len(together),
+        "Wins": sum(delta < 0 for delta in placement_deltas),
+        "Losses": sum(delta > 0 for delta in placement_deltas),
+        "Avg Placement Delta": round(sum(placement_deltas) / len(together), 2),
+        "Avg Time Delta": round(sum(time_deltas) / len(time_deltas) / 1000, 2) if time_deltas else None,
+    }
+
+def test_head_to_head_matches_race_by_race_loop():
+    results, players, maps = _load()
+    stats = head_to_head.calculate_head_to_head(results, players, maps)
+    races = results.to_dict(orient="records")
+    names = players["Player Name"].tolist()
+
+    groups = [("Overall", races)] + [
+        (map_name, [race for race in races if race["Map Name"] == map_name]) for map_name in maps["Map Name"]
+    ]
+    for group, group_races in groups:
+        group_stats = stats["Overall"] if group == "Overall" else stats["By Map"].get(group, {})
+        for player in names:
+            for opponent in names:
+                if opponent == player:
+                    continue
+                expected = _loop_head_to_head(group_races, player, opponent)
+                assert group_stats.get(player, {}).get(opponent) == expected, (group, player, opponent)
+
+def test_chunked_totals_match_single_pass(monkeypatch):
+    results, players, maps = _load()
+    single_pass = head_to_head.calculate_head_to_head(results, players, maps)
+    monkeypatch.setattr(head_to_head, "CHUNK_RACES", 50)
+    assert head_to_head.calculate_head_to_head(results, players, maps) == single_pass
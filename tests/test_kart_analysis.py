@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import kart_analysis
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+kart_post_analysis_file = os.path.join(base_dir, "output", "kart_post_analysis.json")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    maps_list = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))["Map Name"].tolist()
+    karts_list = pd.read_csv(os.path.join(base_dir, "data", "karts.csv"))["Kart Name"].tolist()
+    return results, maps_list, karts_list
+
+def test_pairwise_counts_match_committed_kart_post_analysis():
+    results, maps_list, karts_list = _load()
+    wins, met = kart_analysis.kart_pairwise_counts(results, maps_list, karts_list)
+    assert wins.dtype == np.int32 and wins.shape == (len(maps_list), len(karts_list), len(karts_list))
+
+    with open(kart_post_analysis_file, "r") as json_file:
+        committed_text = json_file.read()
+    data = kart_analysis.kart_comparison_json(wins, met, maps_list, karts_list)
+    assert json.dumps(data, indent=4) == committed_text.replace("\r\n", "\n")
+
+def test_pairwise_counts_small_race():
+    results = pd.DataFrame([{
+        "Date": "2025-01-01", "Time": "12:00:00", "Map Name": "Snowville",
+        "A Placement": "1", "A Kart": "Puppy", "A Racetime": "2:00.00",
+        "B Placement": "2", "B Kart": "Puppy", "B Racetime": "2:01.00",
+        "C Placement": "3", "C Kart": "Monstro", "C Racetime": "2:02.00",
+        "D Placement": "4", "D Kart": "DNR", "D Racetime": "2:03.00",
+        "E Placement": "5", "E Kart": "Unlisted Kart", "E Racetime": "2:04.00",
+    }])
+    wins, met = kart_analysis.kart_pairwise_counts(results, ["Shanghai", "Snowville"], ["Puppy", "Monstro"])
+
+    assert not met[0].any()
+    # Both Puppy players beat the Monstro; the Puppy-vs-Puppy pair counts once for Puppy
+    assert wins[1].tolist() == [[1, 2], [0, 0]]
+    assert met[1].tolist() == [[2, 2], [2, 0]]
+
+def test_pairwise_counts_without_races():
+    results, maps_list, karts_list = _load()
+    wins, met = kart_analysis.kart_pairwise_counts(results.iloc[:0], maps_list, karts_list)
+    assert not wins.any() and not met.any()
+
+def test_win_rates_match_rates_from_exported_json():
+    results, maps_list, karts_list = _load()
+    win_rates = kart_analysis.kart_win_rates(*kart_analysis.kart_pairwise_counts(results, maps_list, karts_list))
+    with open(kart_post_analysis_file, "r") as json_file:
+        kart_comparison_data = json.load(json_file)
+
+    # The cell-by-cell computation the heatmaps used to do on kart_post_analysis.json
+    for map_index, (map_name, kart_wins) in enumerate(kart_comparison_data.items()):
+        for a, kart_a in enumerate(karts_list):
+            for b, kart_b in enumerate(karts_list):
+                if kart_wins[kart_a][kart_b] == "DNR":
+                    expected = np.nan
+                else:
+                    total_races = kart_wins[kart_a][kart_b] + kart_wins[kart_b][kart_a]
+                    expected = (kart_wins[kart_a][kart_b] / total_races) * 100 if total_races > 0 else np.nan
+                assert np.array_equal(win_rates[map_index, a, b], expected, equal_nan=True), (map_name, kart_a, kart_b)
+
+def test_kart_analysis_does_not_depend_on_column_order():
+    results, maps_list, karts_list = _load()
+    player_columns = list(results.columns[3:])
+    regrouped = results[list(results.columns[:3]) + player_columns[1::3] + player_columns[2::3] + player_columns[0::3]]
+
+    assert kart_analysis.kart_racetimes(regrouped, maps_list, karts_list) == \
+        kart_analysis.kart_racetimes(results, maps_list, karts_list)
+    for regrouped_counts, counts in zip(kart_analysis.kart_pairwise_counts(regrouped, maps_list, karts_list),
+                                        kart_analysis.kart_pairwise_counts(results, maps_list, karts_list)):
+        assert np.array_equal(regrouped_counts, counts)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import kart_stats
+import kart_analysis
+import racetime
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    maps_list = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))["Map Name"].tolist()
+    karts_list = pd.read_csv(os.path.join(base_dir, "data", "karts.csv"))["Kart Name"].tolist()
+    return results, maps_list, karts_list
+
+def test_point_estimates_match_simple_computations():
+    results, maps_list, karts_list = _load()
+    stats = kart_stats.calculate_kart_stats(results, maps_list, karts_list, replicates=50)
+    wins, _ = kart_analysis.kart_pairwise_counts(results, maps_list, karts_list)
+    players = [column[:-len(" Kart")] for column in results.columns if column.endswith(" Kart")]
+
+    for map_index, map_name in enumerate(maps_list):
+        races = results[results["Map Name"] == map_name]
+        map_wins = np.where(np.eye(len(karts_list), dtype=bool), 0, wins[map_index])
+        for kart_index, kart in enumerate(karts_list):
+            times = [racetime.to_ms(race[f"{player} Racetime"]) for _, race in races.iterrows() for player in players
+                     if race[f"{player} Kart"] == kart and race[f"{player} Placement"] != "DNR"]
+            kart_stat = stats["Maps"].get(map_name, {}).get(kart)
+            if not times:
+                assert kart_stat is None, (map_name, kart)
+                continue
+            times = [ms / 1000 for ms in times if ms != racetime.MISSING]
+            games = map_wins[kart_index].sum() + map_wins[:, kart_index].sum()
+
+            assert kart_stat["Times"] == len(times)
+            assert kart_stat["Games"] == games
+            if times:
+                assert kart_stat["Median Time"][0] == round(float(np.median(times)), 2)
+            if games:
+                assert kart_stat["Win Rate"][0] == round(map_wins[kart_index].sum() / games, 3)
+            else:
+                assert kart_stat["Win Rate"] is None and kart_stat["Strength"] is None
+
+def test_bootstrap_is_reproducible_and_intervals_are_ordered():
+    results, maps_list, karts_list = _load()
+    stats = kart_stats.calculate_kart_stats(results, maps_list, karts_list, replicates=200)
+    assert stats == kart_stats.calculate_kart_stats(results, maps_list, karts_list, replicates=200)
+    assert stats != kart_stats.calculate_kart_stats(results, maps_list, karts_list, replicates=200, seed=1)
+
+    for map_stats in stats["Maps"].values():
+        for kart_stat in map_stats.values():
+            for key in ("Median Time", "Win Rate", "Strength"):
+                if kart_stat[key] is not None:
+                    _, lower, upper = kart_stat[key]
+                    assert lower <= upper
+
+def test_weighted_medians_match_repeated_values():
+    rng = np.random.default_rng(0)
+    values = np.sort(rng.normal(size=9))
+    weights = rng.integers(0, 3, size=(9, 100))
+    weights[:, 0] = 0
+    medians = kart_stats.weighted_medians(values, weights)
+    assert np.isnan(medians[0])
+    for column, median in zip(weights.T[1:], medians[1:]):
+        assert median == np.median(np.repeat(values, column))
+
+def test_bradley_terry_solves_the_likelihood_equations():
+    rng = np.random.default_rng(0)
+    wins = rng.integers(0, 5, size=(30, 6, 6))
+    wins[:, 0, :] = 0  # A kart that never wins
+    wins[:, :, 1] = 0  # A kart that never loses
+    strength = kart_stats.bradley_terry(wins)
+    assert np.all(np.isfinite(strength)) and np.all(strength > 0)
+    assert np.all(strength[:, 0] < 1) and np.all(strength[:, 1] > 1)
+
+    # Expected wins (including the half win against the prior kart) equal the observed wins
+    decided = np.where(np.eye(6, dtype=bool), 0, wins)
+    games = decided + np.swapaxes(decided, 1, 2)
+    beats = strength[:, :, None] / (strength[:, :, None] + strength[:, None, :])
+    expected = (games * beats).sum(axis=2) + kart_stats.PRIOR_GAMES * strength / (strength + 1)
+    assert np.allclose(expected, decided.sum(axis=2) + kart_stats.PRIOR_GAMES / 2)
+
+    # Warm-starting from the fit converges to the same strengths
+    assert np.allclose(kart_stats.bradley_terry(wins, initial=strength[0]), strength)
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import leaderboards
+import results_store
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    players = pd.read_csv(os.path.join(base_dir, "data", "players.csv"))["Player Name"].tolist()
+    map_list = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))["Map Name"].tolist()
+    return results, players, map_list
+
+def test_leaderboards_match_committed_post_analysis():
+    results, players, map_list = _load()
+    with open(os.path.join(base_dir, "output", "post_analysis.json"), "r") as json_file:
+        committed = json.load(json_file)
+
+    boards = leaderboards.Leaderboards(map_list)
+    boards.add_races(results, players)
+    assert boards.best_race_times() == committed["Best Race Times"]
+
+    from_store = leaderboards.Leaderboards(map_list)
+    from_store.add_races(results_store.read_results(results_file, players), players)
+    assert from_store.best_race_times() == committed["Best Race Times"]
+
+def test_top_k_is_bounded_and_keeps_earlier_ties():
+    top = leaderboards.TopK(2)
+    assert top.push(61000, (0, 1), "1:01.00 first")
+    assert top.push(61000, (1, 0), "1:01.00 second")
+    assert not top.push(61000, (2, 0), "1:01.00 third")
+    assert top.push(60000, (3, 0), "1:00.00")
+    assert top.records() == ["1:00.00", "1:01.00 first"]
+
+def test_checkpoint_resumes_only_while_races_are_appended(tmp_path, monkeypatch):
+    monkeypatch.setattr(leaderboards, "leaderboard_checkpoint_file", str(tmp_path / "leaderboards.json"))
+    results, players, map_list = _load()
+    full = leaderboards.Leaderboards(map_list)
+    full.add_races(results, players)
+
+    resumed_from = []
+    add_races = leaderboards.Leaderboards.add_races
+    def spy(self, results, players):
+        resumed_from.append(self.races_processed)
+        add_races(self, results, players)
+    monkeypatch.setattr(leaderboards.Leaderboards, "add_races", spy)
+
+    def load(path):
+        return leaderboards.load_leaderboards(results_store.read_results(str(path)), players, map_list, str(path))
+
+    with open(results_file, "rb") as csv_file:
+        lines = csv_file.read().splitlines(keepends=True)
+    log = tmp_path / "results.csv"
+    log.write_bytes(b"".join(lines[:301]))
+    load(log)
+    with open(log, "ab") as csv_file:
+        csv_file.write(b"".join(lines[301:]))
+    resumed = load(log)
+    assert resumed_from == [0, 300]
+    assert json.dumps(resumed.to_json()) == json.dumps(full.to_json())
+    assert load(log).best_race_times() == full.best_race_times() and resumed_from[-1] == len(results)
+
+    # Editing an already processed race invalidates the checkpoint
+    edited = results.copy()
+    racetime_col = next(col for col in edited.columns if col.endswith("Racetime") and edited.at[0, col] != "DNR")
+    edited.at[0, racetime_col] = "0:59.99"
+    edited.to_csv(log, index=False)
+    rebuilt = load(log)
+    assert resumed_from[-1] == 0
+    assert rebuilt.best_race_times()[edited.at[0, "Map Name"]][0].startswith("0:59.99")
+
+    # So does dropping races
+    log.write_bytes(b"".join(lines[:301]))
+    load(log)
+    assert resumed_from[-1] == 0
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import personal_bests
+import race_log
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _players():
+    return pd.read_csv(os.path.join(base_dir, "data", "players.csv"))["Player Name"].tolist()
+
+def _results(path=results_file):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+def test_index_matches_committed_individual_best_times():
+    players = _players()
+    map_list = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))["Map Name"].tolist()
+    with open(os.path.join(base_dir, "output", "post_analysis.json"), "r") as json_file:
+        committed = json.load(json_file)["Individual Player Best Times"]
+
+    index = personal_bests.build_index(_results(), players)
+    assert personal_bests.individual_best_times(index, map_list, players) == committed
+
+    raj_shanghai = index["Personal Bests"]["Raj"]["Shanghai"]
+    assert raj_shanghai["Racetime"] == "2:23.80"
+    assert raj_shanghai["Karts"]["Puppy"]["Racetime"] == "2:23.80"
+    assert all(kart["Racetime ms"] >= raj_shanghai["Racetime ms"] for kart in raj_shanghai["Karts"].values())
+
+def test_logged_races_keep_the_index_in_sync(tmp_path):
+    players = _players()
+    log_file = str(tmp_path / "results.csv")
+    shutil.copy(results_file, log_file)
+    personal_bests.load_index(_results(log_file), players, log_file)
+
+    race = {"Date": "2025-06-01", "Time": "20:00:00", "Map Name": "Shanghai",
+            "Raj Placement": "1", "Raj Kart": "Monstro", "Raj Racetime": "2:20.00",
+            "Azhan Placement": "2", "Azhan Kart": "Puppy", "Azhan Racetime": "2:40.00"}
+    race_log.append_race(log_file, race, players)
+
+    index_file, _ = personal_bests.index_paths(log_file)
+    with open(index_file, "r") as json_file:
+        logged = json.load(json_file)
+    assert logged == personal_bests.build_index(_results(log_file), players)
+    assert logged["Personal Bests"]["Raj"]["Shanghai"]["Kart"] == "Monstro"
+    # Analysis picks the logged index up as is
+    assert personal_bests.load_index(_results(log_file), players, log_file) == logged
+
+def test_out_of_sync_index_is_rebuilt(tmp_path):
+    players = _players()
+    log_file = str(tmp_path / "results.csv")
+    shutil.copy(results_file, log_file)
+    personal_bests.load_index(_results(log_file), players, log_file)
+
+    # Edited behind the loggers' back: the append doesn't touch the index, analysis rebuilds it
+    with open(log_file, "a", newline="") as file:
+        file.write("2025-06-01,20:00:00,Shanghai" + ",DNR" * 3 * len(players) + "\r\n")
+    race = {"Date": "2025-06-02", "Time": "20:00:00", "Map Name": "Shanghai",
+            "Raj Placement": "1", "Raj Kart": "Monstro", "Raj Racetime": "2:20.00"}
+    race_log.append_race(log_file, race, players)
+
+    index_file, _ = personal_bests.index_paths(log_file)
+    with open(index_file, "r") as json_file:
+        assert json.load(json_file)["Races Processed"] == len(_results())
+    rebuilt = personal_bests.load_index(_results(log_file), players, log_file)
+    assert rebuilt["Races Processed"] == len(_results()) + 2
+    assert rebuilt["Personal Bests"]["Raj"]["Shanghai"]["Race"] == len(_results()) + 1
+
+def test_rewritten_index_keeps_file_mode(tmp_path):
+    index_file = str(tmp_path / "personal_bests.json")
+    personal_bests._write_json(index_file, {})
+    os.chmod(index_file, 0o644)
+
+    personal_bests._write_json(index_file, {"Races Processed": 1})
+    assert os.stat(index_file).st_mode & 0o777 == 0o644
@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import plackett_luce
+import results_store
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _load():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    maps_list = pd.read_csv(os.path.join(base_dir, "data", "maps.csv"))["Map Name"].tolist()
+    karts_list = pd.read_csv(os.path.join(base_dir, "data", "karts.csv"))["Kart Name"].tolist()
+    return results, maps_list, karts_list
+
+def test_fit_solves_the_likelihood_equations():
+    results, maps_list, karts_list = _load()
+    store = results_store.to_long(results)
+    orderings = plackett_luce.race_orderings(store, maps_list, karts_list)
+    player_strength, kart_strength, _ = plackett_luce.fit(orderings, len(store.players))
+
+    # Stage by stage, race by race: expected stage wins of every player and kart
+    expected_players, expected_karts = np.zeros(len(player_strength)), np.zeros(len(kart_strength))
+    observed_players, observed_karts = np.zeros(len(player_strength)), np.zeros(len(kart_strength))
+    for race in orderings.entry:
+        order = [entry for entry in race if entry >= 0]
+        for stage, winner in enumerate(order[:-1]):
+            left = order[stage:]
+            strengths = [player_strength[orderings.player[entry]] * kart_strength[orderings.kart[entry]] for entry in left]
+            for entry, strength in zip(left, strengths):
+                expected_players[orderings.player[entry]] += strength / sum(strengths)
+                expected_karts[orderings.kart[entry]] += strength / sum(strengths)
+            observed_players[orderings.player[winner]] += 1
+            observed_karts[orderings.kart[winner]] += 1
+
+    # Plus the prior's half win against a strength-1 competitor
+    prior = plackett_luce.PRIOR_GAMES
+    assert np.allclose(expected_players + prior * player_strength / (player_strength + 1), observed_players + prior / 2)
+    assert np.allclose(expected_karts + prior * kart_strength / (kart_strength + 1), observed_karts + prior / 2)
+
+def test_warm_start_refit_matches_cold_fit():
+    results, maps_list, karts_list = _load()
+    cold, state, cold_iterations = plackett_luce.calculate_strengths(results, maps_list, karts_list)
+
+    # No new races: the saved state is already the optimum
+    warm, _, warm_iterations = plackett_luce.calculate_strengths(results, maps_list, karts_list, state)
+    assert warm == cold and warm_iterations == 1
+
+    last_session = results["Date"] == results["Date"].iloc[-1]
+    for earlier in (results.iloc[:-1], results[~last_session]):
+        _, previous, _ = plackett_luce.calculate_strengths(earlier, maps_list, karts_list)
+        warm, _, warm_iterations = plackett_luce.calculate_strengths(results, maps_list, karts_list, previous)
+        assert warm == cold
+        assert warm_iterations * 4 <= cold_iterations
+
+    # A player's strength is shared by every map, karts are rated per map
+    assert set(warm["Karts"]) <= set(maps_list)
+    assert sum(stats["Races"] for stats in warm["Players"].values()) == sum(
+        stats["Races"] for map_karts in warm["Karts"].values() for stats in map_karts.values()
+    )
+
+def _race(winner, winner_kart, loser, loser_kart):
+    return {"Date": "2024-01-01", "Time": "12:00", "Map Name": "Shanghai",
+            f"{winner} Placement": "1", f"{winner} Kart": winner_kart, f"{winner} Racetime": "2:40.00",
+            f"{loser} Placement": "2", f"{loser} Kart": loser_kart, f"{loser} Racetime": "2:45.00"}
+
+def test_better_finishers_get_higher_strengths():
+    # A wins 5 of 6 races against B, the Fast kart wins 4 of 6 against the Slow one
+    races = [_race("A", "Fast", "B", "Slow")] * 3 + [_race("A", "Slow", "B", "Fast")] * 2 + [_race("B", "Fast", "A", "Slow")]
+    results = pd.DataFrame(races)[["Date", "Time", "Map Name"] + [f"{player} {field}" for player in "AB"
+                                                                  for field in ("Placement", "Kart", "Racetime")]]
+    strengths, _, _ = plackett_luce.calculate_strengths(results, ["Shanghai"], ["Slow", "Fast"])
+
+    assert list(strengths["Karts"]["Shanghai"]) == ["Fast", "Slow"]
+    assert list(strengths["Players"]) == ["A", "B"]
+    assert strengths["Players"]["A"]["Races"] == strengths["Karts"]["Shanghai"]["Fast"]["Races"] == 6
+
+def test_no_races():
+    results, maps_list, karts_list = _load()
+    strengths, _, _ = plackett_luce.calculate_strengths(results.iloc[:0], maps_list, karts_list)
+    assert strengths == {"Log Likelihood": 0.0, "Players": {}, "Karts": {}}
+
+def test_main_warm_starts_from_the_saved_fit_state(tmp_path, monkeypatch, capsys):
+    results, _, _ = _load()
+    monkeypatch.setattr(plackett_luce, "strengths_file", str(tmp_path / "kart_player_strengths.json"))
+    monkeypatch.setattr(plackett_luce, "fit_state_file", str(tmp_path / "cache" / "kart_player_strengths.npz"))
+
+    plackett_luce.main(results)
+    assert "cold start" in capsys.readouterr().out
+    with open(os.path.join(base_dir, "output", "kart_player_strengths.json"), "r") as file:
+        assert json.load(file) == json.loads((tmp_path / "kart_player_strengths.json").read_text())
+
+    plackett_luce.main(results)
+    assert "(1 iterations, warm start)" in capsys.readouterr().out
+
+    # A state cut off mid-write means a cold start
+    (tmp_path / "cache" / "kart_player_strengths.npz").write_bytes(b"PK\x03\x04")
+    plackett_luce.main(results)
+    output = capsys.readouterr().out
+    assert "Ignoring unreadable" in output and "cold start" in output
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "calculations"))
+import race_log
+
+def test_append_race_keeps_existing_rows(tmp_path):
+    output_file = str(tmp_path / "results.csv")
+    players = ["Raj", "Azhan"]
+    race_log.initialize_csv(output_file, players)
+
+    race_log.append_race(output_file, {"Date": "2024-10-27", "Time": "03:17:01", "Map Name": "Shanghai",
+                                       "Raj Placement": "1", "Raj Kart": "The Kart", "Raj Racetime": "2:58.18"}, players)
+    race_log.append_race(output_file, {"Date": "2024-10-27", "Time": "03:20:00", "Map Name": "Snowville",
+                                       "Azhan Placement": "2", "Azhan Kart": "Puppy", "Azhan Racetime": "1:57.16"}, players)
+
+    results = pd.read_csv(output_file, dtype=str)
+    assert list(results.columns) == race_log.expected_columns(players)
+    assert results["Raj Racetime"].tolist() == ["2:58.18", "DNR"]
+    assert results["Azhan Kart"].tolist() == ["DNR", "Puppy"]
+
+def test_new_players_migrate_header(tmp_path):
+    output_file = str(tmp_path / "results.csv")
+    race_log.append_race(output_file, {"Date": "2024-10-27", "Time": "03:17:01", "Map Name": "Shanghai",
+                                       "Raj Placement": "1", "Raj Kart": "The Kart", "Raj Racetime": "2:58.18"}, ["Raj"])
+
+    header = race_log.initialize_csv(output_file, ["Raj", "Tejas"])
+    assert header[-3:] == ["Tejas Placement", "Tejas Kart", "Tejas Racetime"]
+
+    results = pd.read_csv(output_file, dtype=str)
+    assert results.loc[0, "Raj Racetime"] == "2:58.18"
+    assert results.loc[0, "Tejas Placement"] == "DNR"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_append_repairs_unterminated_last_line(tmp_path):
+    output_file = str(tmp_path / "results.csv")
+    with open(output_file, "w", newline="") as file:
+        file.write("Date,Time,Map Name,Raj Placement,Raj Kart,Raj Racetime\n2024-10-27,03:17:01,Shanghai,1,The Kart,2:58.18")
+
+    race_log.append_race(output_file, {"Date": "2024-10-28", "Time": "01:00:00", "Map Name": "Snowville"}, ["Raj"])
+
+    results = pd.read_csv(output_file, dtype=str)
+    assert len(results) == 2
+    assert results.loc[1, "Raj Placement"] == "DNR"
+
+def test_header_migration_keeps_file_mode(tmp_path):
+    output_file = str(tmp_path / "results.csv")
+    race_log.initialize_csv(output_file, ["Raj"])
+    os.chmod(output_file, 0o644)
+
+    race_log.initialize_csv(output_file, ["Raj", "Tejas"])
+    assert os.stat(output_file).st_mode & 0o777 == 0o644
+
+def test_crlf_race_log_keeps_its_line_endings(tmp_path):
+    output_file = str(tmp_path / "results.csv")
+    with open(output_file, "w", newline="") as file:
+        file.write("Date,Time,Map Name,Raj Placement,Raj Kart,Raj Racetime\r\n2024-10-27,03:17:01,Shanghai,1,The Kart,2:58.18\r\n")
+
+    race_log.append_race(output_file, {"Date": "2024-10-28", "Time": "01:00:00", "Map Name": "Snowville",
+                                       "Raj Placement": "2", "Raj Kart": "Puppy", "Raj Racetime": "1:57.16"}, ["Raj"])
+    race_log.initialize_csv(output_file, ["Raj", "Tejas"])  # Header migration rewrites every row
+    race_log.append_race(output_file, {"Date": "2024-10-28", "Time": "01:05:00", "Map Name": "Shanghai"}, ["Raj", "Tejas"])
+
+    with open(output_file, "rb") as file:
+        lines = file.read().split(b"\n")
+    assert lines[-1] == b"" and len(lines) == 5
+    assert all(line.endswith(b"\r") for line in lines[:-1])
+    assert pd.read_csv(output_file, dtype=str)["Raj Racetime"].tolist() == ["2:58.18", "1:57.16", "DNR"]
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import racetime
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def _split_parse_ms(text):
+    """The per-cell split(":") parse the loggers and kart_analysis used to do."""
+    minutes, seconds = text.split(":", 1)
+    return round((float(minutes) * 60 + float(seconds.replace(":", "."))) * 1000)
+
+def test_parse_matches_per_cell_parsing_of_results_csv():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    racetimes = results[[col for col in results.columns if col.endswith(" Racetime")]].to_numpy().ravel()
+    logged = racetimes[racetimes != "DNR"]
+
+    parsed = racetime.parse_ms(racetimes)
+    assert parsed.dtype == np.int32
+    assert (parsed[racetimes == "DNR"] == racetime.MISSING).all()
+    assert parsed[racetimes != "DNR"].tolist() == [_split_parse_ms(text) for text in logged]
+
+def test_unreadable_racetimes_are_missing():
+    values = ["1:23.45", "2:54:54", "123:59.99", "DNR", "12345:00.00", "", None, np.nan, 95.3,
+              "1:2.34", "a:23.45", "1:23.4", "1:23.456", " 1:23.45", "1:23,45", ":23.45"]
+    assert racetime.parse_ms(values).tolist() == [83450, 174540, 7439990] + [racetime.MISSING] * 13
+    assert racetime.parse_ms(pd.Series(values, dtype=object)).tolist() == racetime.parse_ms(values).tolist()
+    assert racetime.parse_ms([]).tolist() == []
+    assert racetime.format_ms([]).tolist() == []
+    assert racetime.to_ms("2:01.10") == 121100
+
+def test_format_round_trips():
+    ms = np.array([0, 5000, 83450, 121100, 600000, 7439990])
+    texts = racetime.format_ms(ms)
+    assert texts.tolist() == ["0:00.00", "0:05.00", "1:23.45", "2:01.10", "10:00.00", "123:59.99"]
+    assert [racetime.to_text(value) for value in ms] == texts.tolist()
+    assert racetime.parse_ms(texts).tolist() == ms.tolist()
+
+def test_seconds_match_the_old_box_plot_floats():
+    results = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    racetimes = results[[col for col in results.columns if col.endswith(" Racetime")]].to_numpy().ravel()
+    racetimes = [text for text in racetimes if text not in ("DNR", "") and text.count(":") == 1]
+    seconds = racetime.to_seconds(racetime.parse_ms(racetimes))
+
+    # Bit-for-bit what kart_analysis computed per cell with split(":")
+    expected = [float(text.split(":")[0]) * 60 + float(text.split(":")[1]) for text in racetimes]
+    assert np.array_equal(seconds, expected)
+    assert np.isnan(racetime.to_seconds([racetime.MISSING])).all()
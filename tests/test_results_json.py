@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import results_json
+import racetime
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+committed_json_file = os.path.join(base_dir, "output", "results.json")
+
+def _convert(tmp_path, results_format):
+    json_file = tmp_path / f"results_{results_format}.json"
+    results_json.convert_results_to_json(results_file, str(json_file), results_format)
+    return json_file.read_text()
+
+def test_record_formats_match_json_dumps(tmp_path):
+    with open(committed_json_file, "r") as json_file:
+        committed_text = json_file.read()
+    records = json.loads(committed_text)
+    assert all("DNR" not in record.values() for record in records)
+
+    assert _convert(tmp_path, "compact") == committed_text
+    assert _convert(tmp_path, "compact") == json.dumps(records, separators=(",", ":"))
+    assert _convert(tmp_path, "indented") == json.dumps(records, indent=4)
+
+def test_chunk_boundaries_do_not_change_output(tmp_path, monkeypatch):
+    expected = {results_format: _convert(tmp_path, results_format) for results_format in ("indented", "compact")}
+    monkeypatch.setattr(results_json, "CHUNK_ROWS", 97)
+    for results_format, text in expected.items():
+        assert _convert(tmp_path, results_format) == text
+
+def test_columnar_rebuilds_the_records(tmp_path):
+    records = json.loads(_convert(tmp_path, "compact"))
+    columns = json.loads(_convert(tmp_path, "columnar"))
+
+    rebuilt = [{"Date": date, "Time": time, "Map Name": columns["Maps"][map_code]}
+               for date, time, map_code in zip(columns["Date"], columns["Time"], columns["Map"])]
+    entries = zip(columns["Race"], columns["Player"], columns["Placement"], columns["Kart"], columns["Racetime ms"])
+    for race_id, player_id, placement, kart_id, racetime_ms in entries:
+        player = columns["Players"][player_id]
+        rebuilt[race_id][f"{player} Placement"] = str(placement)
+        rebuilt[race_id][f"{player} Kart"] = columns["Karts"][kart_id]
+        rebuilt[race_id][f"{player} Racetime"] = racetime.to_text(racetime_ms)
+
+    # The store reads the one "2:54:54" racetime as 2:54.54
+    for record in records:
+        for key, value in record.items():
+            if value == "2:54:54":
+                record[key] = "2:54.54"
+    assert rebuilt == records
+
+def test_unchanged_output_is_not_rewritten(tmp_path):
+    json_file = tmp_path / "results.json"
+    assert results_json.convert_results_to_json(results_file, str(json_file), "compact")
+    assert not results_json.convert_results_to_json(results_file, str(json_file), "compact")
+    assert sorted(os.listdir(tmp_path)) == ["results.json"]
+
+def test_rewritten_output_keeps_file_mode(tmp_path):
+    json_file = tmp_path / "results.json"
+    json_file.write_text("[]")
+    os.chmod(json_file, 0o644)
+
+    assert results_json.convert_results_to_json(results_file, str(json_file), "compact")
+    assert os.stat(json_file).st_mode & 0o777 == 0o644
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pandas as pd
+
+base_dir = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(os.path.join(base_dir, "src", "calculations"))
+import results_store
+
+results_file = os.path.join(base_dir, "output", "results.csv")
+
+def test_long_store_only_holds_participations():
+    store = results_store.read_results(results_file)
+    wide = pd.read_csv(results_file, dtype=str)
+
+    placement_cols = [f"{player} Placement" for player in store.players]
+    assert len(store.entries) == (wide[placement_cols] != "DNR").sum().sum()
+    assert store.entries["placement"].between(1, 8).all()
+    assert {col: str(dtype) for col, dtype in store.entries.dtypes.items()} == {
+        col: dtype.__name__ for col, dtype in results_store.ENTRY_DTYPES.items()
+    }
+
+def test_wide_view_round_trips_results_csv():
+    store = results_store.read_results(results_file)
+    original = pd.read_csv(results_file, dtype=str)
+    rebuilt = results_store.to_wide(store)
+
+    assert list(rebuilt.columns) == list(original.columns)
+    mismatched = rebuilt.values != original.values
+    # The only difference is a racetime logged as "2:54:54" coming back as "2:54.54"
+    assert original.values[mismatched].tolist() == ["2:54:54"]
+    assert rebuilt.values[mismatched].tolist() == ["2:54.54"]
+
+def test_empty_results(tmp_path):
+    empty_file = str(tmp_path / "results.csv")
+    open(empty_file, "w").close()
+    store = results_store.read_results(empty_file, players=["Raj"])
+    assert store.num_races == 0
+    assert store.entries.empty
+    assert list(results_store.to_wide(store).columns) == ["Date", "Time", "Map Name", "Raj Placement", "Raj Kart", "Raj Racetime"]
+
+def test_cache_reused_until_results_change(tmp_path):
+    results_copy = str(tmp_path / "results.csv")
+    with open(results_file, "rb") as src, open(results_copy, "wb") as dest:
+        dest.write(src.read())
+    cache_file = str(tmp_path / "cache" / "results_store.npz")
+
+    first = results_store.load_results(results_copy, cache_file=cache_file)
+    assert os.path.exists(cache_file)
+    cached = results_store.load_results(results_copy, cache_file=cache_file)
+    assert cached.entries.equals(first.entries)
+    assert cached.players == first.players and cached.karts == first.karts
+
+    # Appending a race invalidates the cache
+    with open(results_copy, "a") as file:
+        file.write("2025-01-01,12:00:00,Snowville,1,Puppy,1:55.00" + ",DNR" * (3 * len(first.players) - 3) + "\n")
+    updated = results_store.load_results(results_copy, cache_file=cache_file)
+    assert updated.num_races == first.num_races + 1
+    assert updated.entries.iloc[-1]["racetime_ms"] == 115000
+
+def test_selecting_players_from_a_store_matches_parsing_for_them():
+    store = results_store.read_results(results_file)
+    wide = pd.read_csv(results_file, dtype=str, keep_default_na=False)
+    players = store.players[::-2] + ["Nobody"]
+
+    selected = results_store.as_store(store, players)
+    parsed = results_store.to_long(wide, players)
+    assert selected.players == players
+    assert selected.entries[["race_id", "player_id", "placement"]].equals(parsed.entries[["race_id", "player_id", "placement"]])
+    assert results_store.as_store(store) is store